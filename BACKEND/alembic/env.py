@@ -17,6 +17,10 @@ from models import *       # Importa tus modelos para que Alembic los detecte
 # 🔧 Configuración de Alembic
 config = context.config
 
+# 🔧 Si hay DATABASE_URL en el entorno, tiene prioridad sobre alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # ✅ Configuración de logging
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,45 @@
+"""add tareas table for the background job queue
+
+Revision ID: 5c1d8e7a2f90
+Revises: e3a91f5c7d28
+Create Date: 2026-10-18 15:40:12.227804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d8e7a2f90'
+down_revision: Union[str, Sequence[str], None] = 'e3a91f5c7d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tareas',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('datos', sa.Text(), nullable=False),
+    sa.Column('estado', sa.Enum('pendiente', 'en_curso', 'hecha', 'fallida', name='estadotareaenum'), nullable=False),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('max_intentos', sa.Integer(), nullable=False),
+    sa.Column('disponible_desde', sa.DateTime(), nullable=False),
+    sa.Column('creada', sa.DateTime(), nullable=False),
+    sa.Column('actualizada', sa.DateTime(), nullable=False),
+    sa.Column('resultado', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tareas_id'), 'tareas', ['id'], unique=False)
+    op.create_index('ix_tareas_estado_disponible', 'tareas', ['estado', 'disponible_desde'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tareas_estado_disponible', table_name='tareas')
+    op.drop_index(op.f('ix_tareas_id'), table_name='tareas')
+    op.drop_table('tareas')
@@ -0,0 +1,36 @@
+"""add fotos table for the content-addressed photo store
+
+Revision ID: 9a4e6b3c1d57
+Revises: 5c1d8e7a2f90
+Create Date: 2026-10-18 17:05:48.610392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b3c1d57'
+down_revision: Union[str, Sequence[str], None] = '5c1d8e7a2f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las fotos existentes se dan de alta solas en el primer recorrido del
+    # recolector; `python almacen_fotos.py migrar` las pasa al almacén por hash
+    op.create_table('fotos',
+    sa.Column('nombre', sa.String(length=255), nullable=False),
+    sa.Column('referencias', sa.Integer(), nullable=False),
+    sa.Column('tamano', sa.Integer(), nullable=True),
+    sa.Column('creada', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('nombre')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('fotos')
@@ -0,0 +1,58 @@
+"""add row versions and tombstones for incremental sync
+
+Revision ID: c4f2a8d6e1b3
+Revises: 9a4e6b3c1d57
+Create Date: 2026-10-18 19:20:11.274903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f2a8d6e1b3'
+down_revision: Union[str, Sequence[str], None] = '9a4e6b3c1d57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLAS_VERSIONADAS = ['trabajadores', 'computadores', 'detalle', 'mantenimientos', 'permisos', 'asignar_usuario']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('contadores_version',
+    sa.Column('nombre', sa.String(length=30), nullable=False),
+    sa.Column('valor', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('nombre')
+    )
+    op.create_table('eliminados',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('entidad', sa.String(length=30), nullable=False),
+    sa.Column('clave', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('creado', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_eliminados_entidad_version', 'eliminados', ['entidad', 'version'], unique=False)
+    op.create_index('ix_eliminados_creado', 'eliminados', ['creado'], unique=False)
+
+    # Las filas existentes (y las que se escriban sin pasar por versionado.py)
+    # quedan en la versión 1: since=0 las devuelve todas
+    for tabla in TABLAS_VERSIONADAS:
+        op.add_column(tabla, sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'))
+        op.create_index(f'ix_{tabla}_version', tabla, ['version'], unique=False)
+    op.execute("INSERT INTO contadores_version (nombre, valor) VALUES ('filas', 1), ('lapidas', 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabla in TABLAS_VERSIONADAS:
+        op.drop_index(f'ix_{tabla}_version', table_name=tabla)
+        op.drop_column(tabla, 'version')
+    op.drop_index('ix_eliminados_creado', table_name='eliminados')
+    op.drop_index('ix_eliminados_entidad_version', table_name='eliminados')
+    op.drop_table('eliminados')
+    op.drop_table('contadores_version')
@@ -0,0 +1,72 @@
+"""add composite indexes for list and lookup query patterns
+
+Revision ID: e3a91f5c7d28
+Revises: b7d2e41c9a05
+Create Date: 2026-10-18 11:02:47.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a91f5c7d28'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e41c9a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columnas FK que quedan cubiertas por un índice compuesto. MySQL descarta el
+# índice implícito de la FK al crear uno que la cubra, así que en el downgrade
+# hay que recrearlo antes de borrar el compuesto.
+FK_CUBIERTAS = [
+    ('asignar_usuario', 'usuario_id'),
+    ('computadores', 'trabajador_id'),
+    ('detalle', 'codigo_computador'),
+    ('mantenimientos', 'computador_id'),
+    ('permisos', 'cedula_trabajador'),
+    ('permisos', 'codigo_computador'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_trabajadores_apellidos', 'trabajadores', ['apellidos'], unique=False)
+    op.create_index('ix_trabajadores_nombre_apellidos', 'trabajadores', ['nombre', 'apellidos'], unique=False)
+    op.create_index('ix_asignar_usuario_usuario_trabajador', 'asignar_usuario', ['usuario_id', 'trabajador_id'], unique=False)
+    op.create_index('ix_computadores_marca_codigo', 'computadores', ['marca', 'codigo'], unique=False)
+    op.create_index('ix_computadores_nombre', 'computadores', ['nombre'], unique=False)
+    op.create_index('ix_computadores_trabajador_codigo', 'computadores', ['trabajador_id', 'codigo'], unique=False)
+    op.create_index('ix_detalle_codigo_computador', 'detalle', ['codigo_computador'], unique=False)
+    op.create_index('ix_mantenimientos_computador_fecha', 'mantenimientos', ['computador_id', 'fecha'], unique=False)
+    op.create_index('ix_mantenimientos_estado_fecha', 'mantenimientos', ['estado', 'fecha'], unique=False)
+    op.create_index('ix_mantenimientos_fecha', 'mantenimientos', ['fecha'], unique=False)
+    op.create_index('ix_mantenimientos_tipo_estado_fecha', 'mantenimientos', ['tipo', 'estado', 'fecha'], unique=False)
+    op.create_index('ix_mantenimientos_tipo_fecha', 'mantenimientos', ['tipo', 'fecha'], unique=False)
+    op.create_index('ix_permisos_cedula_estado', 'permisos', ['cedula_trabajador', 'estado'], unique=False)
+    op.create_index('ix_permisos_computador_estado', 'permisos', ['codigo_computador', 'estado'], unique=False)
+    op.create_index('ix_permisos_estado_id', 'permisos', ['estado', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'mysql':
+        for tabla, columna in FK_CUBIERTAS:
+            op.create_index(f'ix_{tabla}_{columna}_fk', tabla, [columna], unique=False)
+    op.drop_index('ix_permisos_estado_id', table_name='permisos')
+    op.drop_index('ix_permisos_computador_estado', table_name='permisos')
+    op.drop_index('ix_permisos_cedula_estado', table_name='permisos')
+    op.drop_index('ix_mantenimientos_tipo_fecha', table_name='mantenimientos')
+    op.drop_index('ix_mantenimientos_tipo_estado_fecha', table_name='mantenimientos')
+    op.drop_index('ix_mantenimientos_fecha', table_name='mantenimientos')
+    op.drop_index('ix_mantenimientos_estado_fecha', table_name='mantenimientos')
+    op.drop_index('ix_mantenimientos_computador_fecha', table_name='mantenimientos')
+    op.drop_index('ix_detalle_codigo_computador', table_name='detalle')
+    op.drop_index('ix_computadores_trabajador_codigo', table_name='computadores')
+    op.drop_index('ix_computadores_nombre', table_name='computadores')
+    op.drop_index('ix_computadores_marca_codigo', table_name='computadores')
+    op.drop_index('ix_asignar_usuario_usuario_trabajador', table_name='asignar_usuario')
+    op.drop_index('ix_trabajadores_nombre_apellidos', table_name='trabajadores')
+    op.drop_index('ix_trabajadores_apellidos', table_name='trabajadores')
@@ -0,0 +1,562 @@
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import anyio
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import event, select, update
+from sqlalchemy import inspect as inspeccionar
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import config
+import tareas
+from database import SessionLocal
+from models import Computador, EstadoTareaEnum, Foto, Tarea, Trabajador
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow es opcional: sin él no hay miniaturas
+    Image = None
+
+# 📷 Almacén de fotos por contenido (computadores y trabajadores)
+#
+# Cada archivo se nombra con el SHA-256 de su contenido y se reparte en dos
+# niveles de carpetas: fotos/ab/cd/abcd…ef.jpg. Así ninguna carpeta pasa de
+# unos pocos cientos de entradas aunque haya millones de fotos, y una imagen
+# subida dos veces se guarda una sola vez. La tabla `fotos` lleva cuántos
+# registros (Computador.foto / Trabajador.foto) apuntan a cada archivo; un
+# recolector recorre el almacén por fragmentos y borra lo que nadie usa.
+
+FOTOS_DIR = config.FOTOS_DIR
+MINIATURAS_DIR = os.path.join(FOTOS_DIR, "miniaturas")
+# Versiones AVIF / WebP de los originales (las de miniaturas van junto al .jpg)
+VARIANTES_DIR = os.path.join(FOTOS_DIR, "variantes")
+TEMPORALES_DIR = os.path.join(FOTOS_DIR, ".tmp")
+
+TAMANO_BLOQUE = 64 * 1024
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+# Lado mayor en píxeles de cada miniatura
+TAMANOS_MINIATURA = {"small": 256, "medium": 640}
+
+
+def _soporta(modulo: str) -> bool:
+    try:
+        return Image is not None and features.check_module(modulo)
+    except ValueError:  # Pillow sin ese plugin
+        return False
+
+
+# Formatos a los que se recodifica cada foto, en orden de preferencia al negociar
+FORMATOS_VARIANTE = {
+    formato: opciones
+    for formato, opciones in (
+        ("avif", {"format": "AVIF", "quality": 60}),
+        ("webp", {"format": "WEBP", "quality": 80, "method": 6}),
+    )
+    if _soporta(formato)
+}
+
+# "" = fotos planas anteriores al almacén por hash (ver `migrar_planas`)
+FRAGMENTOS = [""] + [f"{i:02x}" for i in range(256)]
+# ab/cd/<sha256>.ext, o un nombre plano heredado
+NOMBRE_VALIDO = re.compile(r"^(?:[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+|[^/\\.][^/\\]*)$")
+RUTA_BASE = urlsplit(config.FOTOS_URL_BASE).path
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def ruta_relativa(sha: str, ext: str) -> str:
+    return f"{sha[:2]}/{sha[2:4]}/{sha}{ext}"
+
+
+def fragmento_de(nombre: str) -> str:
+    return nombre[:2] if "/" in nombre else ""
+
+
+def url_foto(nombre: str) -> str:
+    return f"{config.FOTOS_URL_BASE}{nombre}"
+
+
+def url_miniatura(nombre: str, tamano: str) -> str:
+    return url_foto(f"miniaturas/{tamano}/{os.path.splitext(nombre)[0]}.jpg")
+
+
+def nombre_desde_url(url: str):
+    """Nombre relativo dentro de fotos/ si la URL es de este almacén.
+
+    Solo se compara la ruta (/fotos/...), no el host: las URLs guardadas con
+    otra IP o dominio siguen contando como referencias.
+    """
+    if not url:
+        return None
+    ruta = urlsplit(url).path
+    if not ruta.startswith(RUTA_BASE):
+        return None
+    nombre = ruta[len(RUTA_BASE):]
+    # Nunca salir de la carpeta de fotos ni apuntar a miniaturas / temporales
+    if not NOMBRE_VALIDO.match(nombre):
+        return None
+    return nombre
+
+
+def extension_segura(foto: UploadFile) -> str:
+    ext = os.path.splitext(foto.filename or "")[1].lower()
+    if ext not in EXTENSIONES:
+        ext = mimetypes.guess_extension(foto.content_type or "") or ""
+    if ext not in EXTENSIONES:
+        raise HTTPException(status_code=400, detail="Formato de imagen no soportado")
+    return ext
+
+
+def rutas_miniaturas(nombre: str) -> list:
+    base = os.path.splitext(nombre)[0]
+    return [os.path.join(MINIATURAS_DIR, tamano, f"{base}.jpg") for tamano in TAMANOS_MINIATURA]
+
+
+def ruta_variante(ruta: str, formato: str) -> str:
+    """Ruta relativa (dentro de fotos/) de la versión `formato` de un original o miniatura."""
+    base = os.path.splitext(ruta)[0]
+    if ruta.startswith("miniaturas/"):
+        return f"{base}.{formato}"
+    return f"variantes/{base}.{formato}"
+
+
+def rutas_derivadas(nombre: str) -> list:
+    """Miniaturas y variantes de una foto: se borran con ella."""
+    base = os.path.splitext(nombre)[0]
+    rutas = rutas_miniaturas(nombre)
+    for formato in ("avif", "webp"):
+        rutas.append(os.path.join(VARIANTES_DIR, f"{base}.{formato}"))
+        rutas += [os.path.join(MINIATURAS_DIR, tamano, f"{base}.{formato}") for tamano in TAMANOS_MINIATURA]
+    return rutas
+
+
+def _guardar_imagen(imagen, destino: str, **opciones):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{uuid.uuid4().hex}.tmp"
+    imagen.save(temporal, **opciones)
+    os.replace(temporal, destino)
+
+
+def _guardar_variantes(imagen, origen: str, relativa: str):
+    # Solo se conserva la variante si pesa menos que el archivo que reemplaza
+    limite = os.path.getsize(origen)
+    for formato, opciones in FORMATOS_VARIANTE.items():
+        destino = os.path.join(FOTOS_DIR, ruta_variante(relativa, formato))
+        if os.path.exists(destino) or origen.endswith(f".{formato}"):
+            continue
+        _guardar_imagen(imagen, destino, **opciones)
+        if os.path.getsize(destino) >= limite:
+            _borrar(destino)
+
+
+def generar_miniaturas(nombre: str):
+    origen = os.path.join(FOTOS_DIR, nombre)
+    with Image.open(origen) as imagen:
+        # Los GIF animados se dejan tal cual: recodificar perdería la animación
+        animada = getattr(imagen, "is_animated", False)
+        # AVIF / WebP admiten transparencia; la miniatura JPEG no
+        transparente = "A" in imagen.getbands() or "transparency" in imagen.info
+        imagen = imagen.convert("RGBA" if transparente else "RGB")
+        if not animada:
+            _guardar_variantes(imagen, origen, nombre)
+        base = os.path.splitext(nombre)[0]
+        for (tamano, lado), destino in zip(TAMANOS_MINIATURA.items(), rutas_miniaturas(nombre)):
+            copia = imagen.copy()
+            copia.thumbnail((lado, lado))
+            if not os.path.exists(destino):
+                _guardar_imagen(copia.convert("RGB"), destino, format="JPEG", quality=80, optimize=True)
+            _guardar_variantes(copia, destino, f"miniaturas/{tamano}/{base}.jpg")
+
+
+# ======== CONTEO DE REFERENCIAS ========
+
+def ajustar_referencias(db: Session, deltas: Counter):
+    """Suma `deltas` (URL -> cambio) a los contadores, en la transacción de `db`."""
+    por_nombre = Counter()
+    for url, delta in deltas.items():
+        nombre = nombre_desde_url(url)
+        if nombre:
+            por_nombre[nombre] += delta
+    conexion = db.connection()
+    for nombre, delta in por_nombre.items():
+        if delta:
+            conexion.execute(
+                update(Foto.__table__)
+                .where(Foto.__table__.c.nombre == nombre)
+                .values(referencias=Foto.__table__.c.referencias + delta)
+            )
+
+
+@event.listens_for(Session, "before_flush")
+def _contar_referencias(db, contexto, instancias):
+    # Toda escritura por el ORM pasa por aquí; las masivas (importar) llaman a
+    # ajustar_referencias por su cuenta
+    deltas = Counter()
+    for obj in db.new:
+        if isinstance(obj, (Computador, Trabajador)) and obj.foto:
+            deltas[obj.foto] += 1
+    for obj in db.dirty:
+        if isinstance(obj, (Computador, Trabajador)):
+            historia = inspeccionar(obj).attrs.foto.load_history()
+            for url in historia.deleted:
+                deltas[url] -= 1
+            for url in historia.added:
+                deltas[url] += 1
+    for obj in db.deleted:
+        if isinstance(obj, (Computador, Trabajador)):
+            historia = inspeccionar(obj).attrs.foto.load_history()
+            for url in historia.deleted or historia.unchanged:
+                deltas[url] -= 1
+    deltas.pop(None, None)
+    if deltas:
+        ajustar_referencias(db, deltas)
+
+
+def foto_reemplazada(db: Session, anterior, nueva):
+    """Para UPDATE sin ORM (escrituras condicionales): ajusta contadores y encola la anterior."""
+    if anterior == nueva:
+        return
+    deltas = Counter({anterior: -1, nueva: 1})
+    deltas.pop(None, None)
+    ajustar_referencias(db, deltas)
+    if anterior:
+        programar_eliminacion(db, anterior)
+
+
+def referencias_exactas(db: Session, nombre: str) -> int:
+    """Cuenta en las tablas (no en el contador) los registros que usan `nombre`."""
+    total = 0
+    for modelo in (Computador, Trabajador):
+        for (url,) in db.query(modelo.foto).filter(modelo.foto.like(f"%{nombre}")):
+            total += nombre_desde_url(url) == nombre
+    return total
+
+
+# ======== TAREAS (tareas.py) ========
+
+@tareas.tarea("miniaturas")
+def _tarea_miniaturas(db: Session, datos: dict):
+    # Si la foto ya se borró (quedó huérfana) no hay nada que generar
+    if os.path.exists(os.path.join(FOTOS_DIR, datos["nombre"])):
+        generar_miniaturas(datos["nombre"])
+
+
+@tareas.tarea("eliminar_foto")
+def _tarea_eliminar_foto(db: Session, datos: dict):
+    return {"eliminada": eliminar_foto_si_huerfana(db, datos["url"])}
+
+
+@tareas.tarea("barrer_fotos")
+def _tarea_barrer_fotos(db: Session, datos: dict):
+    # Un fragmento por tarea: cada paso es corto y el recorrido sobrevive a reinicios
+    indice = datos.get("fragmento", 0)
+    resultado = recolectar(db, FRAGMENTOS[indice])
+    if indice + 1 < len(FRAGMENTOS):
+        resultado["siguiente_job"] = tareas.encolar(db, "barrer_fotos", {"fragmento": indice + 1}).id
+    elif config.FOTOS_GC_INTERVALO > 0:
+        tareas.encolar(db, "barrer_fotos", {"fragmento": 0}, retraso=config.FOTOS_GC_INTERVALO)
+    return resultado
+
+
+def programar_barrido(db: Session, retraso: float = 0) -> Tarea:
+    """Inicia un recorrido del recolector, o adelanta el que ya esté en cola."""
+    en_cola = db.scalars(
+        select(Tarea)
+        .where(
+            Tarea.tipo == "barrer_fotos",
+            Tarea.estado.in_([EstadoTareaEnum.pendiente, EstadoTareaEnum.en_curso]),
+        )
+        .order_by(Tarea.id)
+        .limit(1)
+    ).first()
+    if en_cola is None:
+        return tareas.encolar(db, "barrer_fotos", {"fragmento": 0}, retraso=retraso)
+    cuando = _ahora() + timedelta(seconds=retraso)
+    if en_cola.estado == EstadoTareaEnum.pendiente and en_cola.disponible_desde > cuando:
+        en_cola.disponible_desde = cuando
+        event.listen(db, "after_commit", tareas.despertar, once=True)
+    return en_cola
+
+
+def iniciar_recolector():
+    """Deja programado el próximo recorrido periódico (si no lo hay ya)."""
+    if config.FOTOS_GC_INTERVALO <= 0:
+        return
+    db = SessionLocal()
+    try:
+        programar_barrido(db, retraso=config.FOTOS_GC_INTERVALO)
+        db.commit()
+    finally:
+        db.close()
+
+
+# ======== SUBIDA ========
+
+def registrar_subida(nombre: str, tamano: int):
+    """Alta en `fotos` (sin referencias aún) + miniaturas, en una transacción."""
+    db = SessionLocal()
+    try:
+        if db.get(Foto, nombre) is None:
+            db.add(Foto(nombre=nombre, referencias=0, tamano=tamano, creada=_ahora()))
+        trabajo = tareas.encolar(db, "miniaturas", {"nombre": nombre}) if Image is not None else None
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otra subida del mismo contenido ganó el INSERT
+            db.rollback()
+            trabajo = tareas.encolar(db, "miniaturas", {"nombre": nombre}) if Image is not None else None
+            db.commit()
+        return trabajo.id if trabajo else None
+    finally:
+        db.close()
+
+
+async def guardar_foto(foto: UploadFile) -> dict:
+    """Guarda la subida por bloques sin bloquear el event loop."""
+    ext = extension_segura(foto)
+    os.makedirs(TEMPORALES_DIR, exist_ok=True)
+    temporal = os.path.join(TEMPORALES_DIR, uuid.uuid4().hex)
+
+    sha = hashlib.sha256()
+    tamano = 0
+    try:
+        async with await anyio.open_file(temporal, "wb") as destino:
+            while bloque := await foto.read(TAMANO_BLOQUE):
+                tamano += len(bloque)
+                if tamano > config.FOTOS_TAMANO_MAXIMO:
+                    raise HTTPException(status_code=413, detail="La foto es demasiado grande")
+                sha.update(bloque)
+                await destino.write(bloque)
+
+        nombre = ruta_relativa(sha.hexdigest(), ext)
+        final = os.path.join(FOTOS_DIR, nombre)
+        if os.path.exists(final):
+            os.remove(temporal)
+            # La fecha del archivo es la que protege del recolector a una foto recién subida
+            os.utime(final)
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(temporal, final)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    respuesta = {"foto_url": url_foto(nombre), "miniaturas": {}}
+    trabajo = await anyio.to_thread.run_sync(registrar_subida, nombre, tamano)
+    if trabajo is not None:
+        respuesta["miniaturas"] = {tamano: url_miniatura(nombre, tamano) for tamano in TAMANOS_MINIATURA}
+        respuesta["job_id"] = trabajo
+    return respuesta
+
+
+# ======== BORRADO Y RECOLECCIÓN ========
+
+def programar_eliminacion(db: Session, url: str):
+    """Encola el borrado de la foto en la transacción de `db` (se decide tras el commit)."""
+    if nombre_desde_url(url):
+        tareas.encolar(db, "eliminar_foto", {"url": url})
+
+
+def _borrar(ruta: str) -> bool:
+    try:
+        os.remove(ruta)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def eliminar_foto_si_huerfana(db: Session, url: str) -> bool:
+    """Borra la foto (y sus miniaturas) si ningún registro la sigue usando y no es reciente."""
+    nombre = nombre_desde_url(url)
+    if not nombre:
+        return False
+    fila = db.get(Foto, nombre)
+    # El contador evita recorrer las tablas cuando la foto sigue en uso; si dice
+    # cero se confirma contra las tablas antes de borrar nada
+    if fila is not None and fila.referencias > 0:
+        return False
+    if referencias_exactas(db, nombre):
+        return False
+    # Igual que en `recolectar`: una subida reciente (guardar_foto renueva la fecha
+    # al deduplicar) puede estar por guardarse en otro registro; se deja al recolector
+    try:
+        if os.path.getmtime(os.path.join(FOTOS_DIR, nombre)) > time.time() - config.FOTOS_GRACIA:
+            return False
+    except FileNotFoundError:
+        pass
+
+    for ruta in rutas_derivadas(nombre):
+        _borrar(ruta)
+    if fila is not None:
+        db.delete(fila)
+        db.commit()
+    return _borrar(os.path.join(FOTOS_DIR, nombre))
+
+
+def archivos_de(raiz: str, fragmento: str):
+    """(nombre relativo, DirEntry) de un fragmento, sin listar el resto del almacén."""
+    if not fragmento:
+        if os.path.isdir(raiz):
+            for entrada in os.scandir(raiz):
+                if entrada.is_file() and not entrada.name.startswith("."):
+                    yield entrada.name, entrada
+        return
+    carpeta = os.path.join(raiz, fragmento)
+    if not os.path.isdir(carpeta):
+        return
+    for sub in os.scandir(carpeta):
+        if not sub.is_dir():
+            continue
+        for entrada in os.scandir(sub.path):
+            # Los .tmp son miniaturas a medio escribir
+            if entrada.is_file() and not entrada.name.endswith(".tmp"):
+                yield f"{fragmento}/{sub.name}/{entrada.name}", entrada
+
+
+def referencias_de(db: Session, fragmento: str) -> Counter:
+    """Referencias reales a los archivos de un fragmento, leídas en streaming."""
+    patron = f"%/{fragmento}/%" if fragmento else "%"
+    cuenta = Counter()
+    for modelo in (Computador, Trabajador):
+        consulta = select(modelo.foto).where(modelo.foto.like(patron)).execution_options(yield_per=1000)
+        for (url,) in db.execute(consulta):
+            nombre = nombre_desde_url(url)
+            if nombre and fragmento_de(nombre) == fragmento:
+                cuenta[nombre] += 1
+    return cuenta
+
+
+def recolectar(db: Session, fragmento: str) -> dict:
+    """Compara un fragmento del directorio con las referencias de la base.
+
+    Borra los archivos sin referencias más viejos que config.FOTOS_GRACIA (una
+    foto recién subida aún no está guardada en su registro), corrige los
+    contadores desviados y da de alta los archivos que no tenían fila. La
+    memoria usada es proporcional a un fragmento, no al almacén completo.
+    """
+    limite = time.time() - config.FOTOS_GRACIA
+    referencias = referencias_de(db, fragmento)
+    if fragmento:
+        filtro = Foto.nombre.like(f"{fragmento}/%")
+    else:
+        filtro = ~Foto.nombre.like("%/%")
+    filas = {f.nombre: f for f in db.scalars(select(Foto).where(filtro))}
+    resultado = {"fragmento": fragmento, "fotos": 0, "bytes": 0, "miniaturas": 0, "corregidas": 0, "temporales": 0}
+
+    vivas = set()
+    for nombre, entrada in archivos_de(FOTOS_DIR, fragmento):
+        usos = referencias.get(nombre, 0)
+        fila = filas.pop(nombre, None)
+        info = entrada.stat()
+        if usos == 0 and info.st_mtime < limite:
+            for ruta in rutas_derivadas(nombre):
+                _borrar(ruta)
+            if _borrar(entrada.path):
+                resultado["fotos"] += 1
+                resultado["bytes"] += info.st_size
+            if fila is not None:
+                db.delete(fila)
+            continue
+        vivas.add(os.path.splitext(nombre)[0])
+        if fila is None:
+            db.add(Foto(
+                nombre=nombre, referencias=usos, tamano=info.st_size,
+                creada=datetime.fromtimestamp(info.st_mtime, timezone.utc).replace(tzinfo=None),
+            ))
+        elif fila.referencias != usos:
+            fila.referencias = usos
+            resultado["corregidas"] += 1
+    # Filas cuyo archivo ya no existe
+    for fila in filas.values():
+        db.delete(fila)
+    db.commit()
+
+    # Miniaturas y variantes cuyo original ya no existe
+    carpetas = [os.path.join(MINIATURAS_DIR, tamano) for tamano in TAMANOS_MINIATURA] + [VARIANTES_DIR]
+    for carpeta in carpetas:
+        for nombre, entrada in archivos_de(carpeta, fragmento):
+            if os.path.splitext(nombre)[0] not in vivas and entrada.stat().st_mtime < limite and _borrar(entrada.path):
+                resultado["miniaturas"] += 1
+
+    # Subidas interrumpidas (una vez por recorrido)
+    if not fragmento and os.path.isdir(TEMPORALES_DIR):
+        for entrada in os.scandir(TEMPORALES_DIR):
+            if entrada.stat().st_mtime < limite and _borrar(entrada.path):
+                resultado["temporales"] += 1
+    return resultado
+
+
+# ======== MIGRACIÓN DE FOTOS PLANAS ========
+
+def migrar_planas(db: Session) -> int:
+    """Mueve las fotos de la raíz de fotos/ al almacén por hash y actualiza las URLs.
+
+    Los nombres originales (foto.jpg) se sobrescribían entre sí; con el hash
+    del contenido eso ya no pasa. Las miniaturas se regeneran en segundo plano.
+    """
+    movidas = 0
+    for nombre, entrada in list(archivos_de(FOTOS_DIR, "")):
+        sha = hashlib.sha256()
+        with open(entrada.path, "rb") as archivo:
+            while bloque := archivo.read(TAMANO_BLOQUE):
+                sha.update(bloque)
+        nuevo = ruta_relativa(sha.hexdigest(), os.path.splitext(nombre)[1].lower())
+        destino = os.path.join(FOTOS_DIR, nuevo)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Se copia antes del commit y el original se borra después: si algo
+        # falla a mitad, cada URL sigue apuntando a un archivo que existe
+        if not os.path.exists(destino):
+            temporal = f"{destino}.{uuid.uuid4().hex}.tmp"
+            shutil.copy2(entrada.path, temporal)
+            os.replace(temporal, destino)
+        anterior = db.get(Foto, nombre)
+        if anterior is not None:
+            db.delete(anterior)
+        if db.get(Foto, nuevo) is None:
+            db.add(Foto(nombre=nuevo, referencias=0, tamano=entrada.stat().st_size, creada=_ahora()))
+            db.flush()
+        for modelo in (Computador, Trabajador):
+            for registro in db.query(modelo).filter(modelo.foto.like(f"%/{nombre}")):
+                if nombre_desde_url(registro.foto) == nombre:
+                    registro.foto = url_foto(nuevo)
+        if Image is not None:
+            tareas.encolar(db, "miniaturas", {"nombre": nuevo})
+        db.commit()
+        _borrar(entrada.path)
+        for ruta in rutas_derivadas(nombre):
+            _borrar(ruta)
+        movidas += 1
+    return movidas
+
+
+if __name__ == "__main__":
+    # python almacen_fotos.py migrar   -> fotos planas al almacén por hash
+    # python almacen_fotos.py barrer   -> un recorrido completo del recolector, aquí mismo
+    orden = sys.argv[1] if len(sys.argv) > 1 else ""
+    sesion = SessionLocal()
+    try:
+        if orden == "migrar":
+            print(f"📦 {migrar_planas(sesion)} fotos movidas al almacén por hash")
+        elif orden == "barrer":
+            total = Counter()
+            for fragmento in FRAGMENTOS:
+                parcial = recolectar(sesion, fragmento)
+                total.update({k: v for k, v in parcial.items() if k != "fragmento"})
+            print(f"🧹 {dict(total)}")
+        else:
+            print("Uso: python almacen_fotos.py [migrar|barrer]")
+    finally:
+        sesion.close()
@@ -0,0 +1,39 @@
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+import respuestas
+
+# ⚡ Modo asíncrono (config.MODO_ASYNC)
+#
+# Las lecturas más pedidas (listados y consultas por clave) son `async def` con
+# `db=Depends(get_sesion)`: con MODO_ASYNC=1 reciben una AsyncSession y esperan
+# cada consulta sobre la conexión asíncrona (aiomysql / aiosqlite), sin ocupar
+# hilos; sin la variable reciben la Session de siempre y cada consulta va al
+# threadpool. Lo que no es consulta (validar y serializar listados largos) se
+# hace en el threadpool para no frenar el event loop.
+#
+# El resto de los handlers siguen siendo `def` con `Depends(get_db)`: FastAPI
+# los corre completos en el threadpool en ambos modos, así su trabajo fuera de
+# la base (parseo de importaciones, escrituras en disco, archivos SQLite de la
+# caché y de eventos) nunca corre en el hilo del event loop.
+# Se comparan ambos modos con benchmarks/carga.py --modo.
+
+
+async def ejecutar(db, sentencia):
+    """Resultado ya leído de `sentencia`, con una Session (threadpool) o una AsyncSession."""
+    if isinstance(db, Session):
+        congelado = await run_in_threadpool(lambda: db.execute(sentencia).freeze())
+        return congelado()
+    return await db.execute(sentencia)
+
+
+def _validar(adaptador: TypeAdapter, valor) -> respuestas.RespuestaRapida:
+    return respuestas.RespuestaRapida(
+        adaptador.dump_python(adaptador.validate_python(valor, from_attributes=True), mode="json")
+    )
+
+
+async def validada(adaptador: TypeAdapter, valor) -> respuestas.RespuestaRapida:
+    """Valida y serializa en el threadpool; FastAPI no vuelve a validar una Response."""
+    return await run_in_threadpool(_validar, adaptador, valor)
@@ -0,0 +1,163 @@
+"""Benchmark de arranque: tiempo de importar main.py y tiempo hasta el primer 200.
+
+Cada medición corre en un proceso nuevo (como un worker recién escalado):
+
+- import: `import main` en un intérprete limpio.
+- primer 200: desde lanzar uvicorn hasta que GET / responde 200, y hasta que
+  responde 200 un endpoint que lee la base.
+- base caída (--sin-base): DATABASE_URL apunta a una base inalcanzable; el
+  worker debe arrancar igual y responder GET /.
+
+Uso (desde BACKEND/):
+    python benchmarks/bench_arranque.py [--url sqlite:////tmp/bench_arranque.db] [--repeticiones 5] [--sin-base] [--json]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND)
+
+# Ruta sin autenticación que consulta la base
+RUTA_BASE = "/mantenimientos/computadores"
+# Una base SQLite en una carpeta que no existe: la conexión falla al abrirla
+URL_CAIDA = "sqlite:////no-existe/bench_arranque.db"
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:////tmp/bench_arranque.db")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--sin-base", action="store_true", help="medir también con la base caída")
+    parser.add_argument("--limite", type=float, default=60, help="segundos máximos por arranque")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    return parser.parse_args()
+
+
+def entorno(url: str, **extra) -> dict:
+    return dict(
+        os.environ,
+        DATABASE_URL=url,
+        FOTOS_DIR=os.path.join(tempfile.gettempdir(), "bench_arranque_fotos"),
+        TOKEN_SECRET="arranque",
+        METRICAS="0",
+        **extra,
+    )
+
+
+def preparar_base(url: str):
+    """Esquema y admin, como harían `alembic upgrade head` y `python inicializar.py admin`."""
+    codigo = "import inicializar; inicializar.crear_tablas(); inicializar.crear_usuario_admin()"
+    subprocess.run([sys.executable, "-c", codigo], cwd=BACKEND, env=entorno(url), check=True)
+
+
+def medir_import(url: str, **extra) -> float:
+    codigo = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=BACKEND, env=entorno(url, **extra),
+        capture_output=True, text=True, timeout=120,
+    )
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1])
+    return float(salida.stdout.strip().splitlines()[-1]) * 1000
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def estado(puerto: int, ruta: str) -> int:
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=5)
+    try:
+        conexion.request("GET", ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        return respuesta.status
+    except OSError:
+        return 0
+    finally:
+        conexion.close()
+
+
+def medir_primer_200(url: str, rutas, limite: float, **extra) -> dict:
+    """ms desde lanzar uvicorn hasta el primer 200 de cada ruta (None si no llega)."""
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=BACKEND, env=entorno(url, **extra), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    tiempos = {}
+    try:
+        for ruta in rutas:
+            while time.perf_counter() - inicio < limite and proceso.poll() is None:
+                if estado(puerto, ruta) == 200:
+                    tiempos[ruta] = round((time.perf_counter() - inicio) * 1000, 1)
+                    break
+                time.sleep(0.005)
+            else:
+                tiempos[ruta] = None
+    finally:
+        proceso.terminate()
+        proceso.wait(10)
+    return tiempos
+
+
+def resumen(valores) -> dict:
+    validos = [v for v in valores if v is not None]
+    if not validos:
+        return {"ms_mediana": None, "ms_max": None, "fallidos": len(valores)}
+    return {
+        "ms_mediana": round(statistics.median(validos), 1),
+        "ms_max": round(max(validos), 1),
+        "fallidos": len(valores) - len(validos),
+    }
+
+
+def escenario(url: str, rutas, args, **extra) -> dict:
+    medir_import(url, **extra)  # calentamiento: compila los .pyc
+    importar = []
+    for _ in range(args.repeticiones):
+        try:
+            importar.append(medir_import(url, **extra))
+        except RuntimeError:
+            importar.append(None)
+    arranques = [medir_primer_200(url, rutas, args.limite, **extra) for _ in range(args.repeticiones)]
+    resultado = {"import": resumen(importar)}
+    for ruta in rutas:
+        resultado[f"primer_200 {ruta}"] = resumen([a[ruta] for a in arranques])
+    return resultado
+
+
+def main():
+    args = parsear_argumentos()
+    preparar_base(args.url)
+
+    resultado = {"base": escenario(args.url, ["/", RUTA_BASE], args, ARRANQUE_LOCAL="0")}
+    if args.sin_base:
+        resultado["base_caida"] = escenario(URL_CAIDA, ["/"], args, ARRANQUE_LOCAL="0")
+
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        return
+    for nombre, medidas in resultado.items():
+        print(nombre)
+        for medida, datos in medidas.items():
+            if datos["ms_mediana"] is None:
+                print(f"  ❌ {medida:<42} sin respuesta")
+                continue
+            fallidos = f"  ({datos['fallidos']} fallidos)" if datos["fallidos"] else ""
+            print(f"  {medida:<44} {datos['ms_mediana']:>8} ms (máx {datos['ms_max']}){fallidos}")
+
+
+if __name__ == "__main__":
+    main()
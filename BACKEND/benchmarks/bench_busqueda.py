@@ -0,0 +1,78 @@
+"""Benchmark de /buscar: construcción del índice y latencia de consultas con datos sintéticos.
+
+Uso (desde BACKEND/):
+    python benchmarks/bench_busqueda.py [--documentos 120000] [--repeticiones 20] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from busqueda import IndiceBusqueda  # noqa: E402
+
+NOMBRES = ["José", "María", "Andrés", "Lucía", "Camilo", "Sofía", "Juan", "Valentina", "Carlos", "Daniela",
+           "Sebastián", "Natalia", "Julián", "Ángela", "Óscar", "Mónica", "Iván", "Paola", "Hernán", "Yésica"]
+APELLIDOS = ["Pérez", "Gómez", "Rodríguez", "López", "Martínez", "García", "Hernández", "Díaz", "Muñoz",
+             "Álvarez", "Ramírez", "Castaño", "Zuluaga", "Ospina", "Quintero", "Giraldo", "Restrepo", "Cárdenas"]
+MARCAS = ["Lenovo", "HP", "Dell", "Asus", "Acer", "Apple"]
+
+CONSULTAS = ["jose", "perez gomez", "maria rodr", "castano", "lenov", "pc-004", "sn00012", "angela ramirez", "mu"]
+
+
+def poblar(indice: IndiceBusqueda, documentos: int):
+    # Proporciones aproximadas a las del inventario: 40% trabajadores, 30% equipos, 15% detalles, 15% permisos
+    for i in range(documentos):
+        cedula = str(10_000_000 + i)
+        tipo = i % 20
+        nombre, apellidos = random.choice(NOMBRES), f"{random.choice(APELLIDOS)} {random.choice(APELLIDOS)}"
+        if tipo < 8:
+            indice.agregar("trabajador", cedula, f"{nombre} {apellidos}", "", [cedula, nombre, apellidos])
+        elif tipo < 14:
+            codigo, marca = f"PC-{i:06d}", random.choice(MARCAS)
+            indice.agregar("computador", codigo, f"Equipo {i}", marca, [codigo, f"Equipo {i}", marca])
+        elif tipo < 17:
+            indice.agregar("detalle", i, f"SN{i:08d}", "", [f"SN{i:08d}", f"PC-{i:06d}"])
+        else:
+            indice.agregar("permiso", i, f"{nombre} {apellidos}", "", [f"PC-{i:06d}", cedula, nombre, apellidos])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documentos", type=int, default=120_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    random.seed(1)
+    indice = IndiceBusqueda()
+    inicio = time.perf_counter()
+    poblar(indice, args.documentos)
+    resultados = {"documentos": len(indice), "construccion_s": round(time.perf_counter() - inicio, 2), "consultas": {}}
+
+    for consulta in CONSULTAS:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            aciertos = indice.buscar(consulta)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultados["consultas"][consulta] = {
+            "mediana_ms": round(statistics.median(tiempos), 2),
+            "max_ms": round(max(tiempos), 2),
+            "primer_resultado": aciertos[0]["titulo"] if aciertos else None,
+        }
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+    print(f"{resultados['documentos']} documentos indexados en {resultados['construccion_s']} s")
+    for consulta, datos in resultados["consultas"].items():
+        print(f"{consulta:<16} mediana {datos['mediana_ms']:>7} ms   máx {datos['max_ms']:>7} ms   → {datos['primer_resultado']}")
+
+
+if __name__ == "__main__":
+    main()
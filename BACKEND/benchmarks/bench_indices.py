@@ -0,0 +1,210 @@
+"""Benchmark de índices: planes de consulta y latencia antes y después.
+
+Siembra una base local (SQLite por defecto, o un MySQL local con --url) con
+N mantenimientos y los datos relacionados, ejecuta las consultas reales de los
+routers sin los índices compuestos, los crea y repite la medición.
+
+Uso (desde BACKEND/):
+    python benchmarks/bench_indices.py [--url sqlite:////tmp/bench.db] [--mantenimientos 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from datetime import date, time as hora, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert, select, text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:////tmp/bench_indices.db")
+    parser.add_argument("--mantenimientos", type=int, default=1_000_000)
+    parser.add_argument("--computadores", type=int, default=20_000)
+    parser.add_argument("--trabajadores", type=int, default=5_000)
+    parser.add_argument("--permisos", type=int, default=50_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--json", help="guardar el resultado en este archivo")
+    args = parser.parse_args()
+
+    # El benchmark borra y recrea las tablas: solo contra bases locales
+    url = make_url(args.url)
+    if url.get_backend_name() != "sqlite" and url.host not in ("localhost", "127.0.0.1"):
+        parser.error("--url debe ser SQLite o un MySQL en localhost")
+    return args
+
+
+if __name__ == "__main__":
+    ARGS = parsear_argumentos()
+    os.environ["DATABASE_URL"] = ARGS.url
+
+from database import Base, engine  # noqa: E402
+from models import (  # noqa: E402
+    AsignarUsuario, Computador, Detalle, Mantenimiento, PermisoSalida, RolEnum, Trabajador, Usuario,
+)
+
+BLOQUE = 10_000
+MARCAS = ["HP", "Dell", "Lenovo", "Asus", "Acer", "Apple"]
+NOMBRES = ["José", "María", "Andrés", "Lucía", "Carlos", "Sofía", "Julián", "Valentina"]
+APELLIDOS = ["Pérez", "Gómez", "Rodríguez", "Martínez", "López", "Díaz", "Duarte", "Triana"]
+
+
+def indices_compuestos():
+    """Índices declarados en los modelos que no son de clave primaria."""
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            if not all(c.primary_key for c in indice.columns):
+                yield indice
+
+
+def sembrar(engine, n_mantenimientos: int, n_computadores: int, n_trabajadores: int, n_permisos: int):
+    rnd = random.Random(42)
+    inicio = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Trabajador), [
+            {
+                "cedula": f"{i:010d}", "nombre": rnd.choice(NOMBRES), "apellidos": rnd.choice(APELLIDOS),
+                "cargo": "Analista", "area_de_trabajo": f"Área {i % 20}", "edad": 20 + i % 40,
+                "residencia": "Bogotá", "telefono": "3000000000", "correo": f"t{i}@empresa.co",
+            }
+            for i in range(n_trabajadores)
+        ])
+        conn.execute(insert(Usuario), [
+            {"username": f"u{i}", "password": "x" * 64, "rol": RolEnum.normal} for i in range(n_trabajadores)
+        ])
+        conn.execute(insert(AsignarUsuario), [
+            {"usuario_id": f"u{i}", "trabajador_id": f"{i:010d}"} for i in range(n_trabajadores)
+        ])
+        conn.execute(insert(Computador), [
+            {
+                "codigo": f"PC-{i:07d}", "nombre": "Equipo " + "".join(rnd.choices(string.ascii_uppercase, k=4)),
+                "marca": rnd.choice(MARCAS),
+                "trabajador_id": f"{rnd.randrange(n_trabajadores):010d}" if rnd.random() < 0.8 else None,
+            }
+            for i in range(n_computadores)
+        ])
+        conn.execute(insert(Detalle), [
+            {
+                "codigo_computador": f"PC-{i:07d}", "procesador": "i5", "ram": "16GB",
+                "almacenamiento": "512GB", "sistema_operativo": "Windows 11", "serial": f"SN{i:09d}",
+            }
+            for i in range(n_computadores)
+        ])
+        conn.execute(insert(PermisoSalida), [
+            {
+                "codigo_computador": f"PC-{rnd.randrange(n_computadores):07d}",
+                "cedula_trabajador": f"{rnd.randrange(n_trabajadores):010d}",
+                "estado": rnd.choice(["activo", "inactivo"]),
+            }
+            for _ in range(n_permisos)
+        ])
+
+    for desde in range(0, n_mantenimientos, BLOQUE):
+        filas = [
+            {
+                "computador_id": f"PC-{rnd.randrange(n_computadores):07d}",
+                "fecha": inicio + timedelta(days=rnd.randrange(2000)),
+                "hora": hora(rnd.randrange(8, 18), 0),
+                "tipo": rnd.choice(["preventivo", "correctivo"]),
+                "estado": rnd.choice(["pendiente", "hecho"]),
+            }
+            for _ in range(min(BLOQUE, n_mantenimientos - desde))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(Mantenimiento), filas)
+
+
+def consultas(n_computadores: int):
+    """Las mismas formas de consulta que usan los routers."""
+    m, p, t = Mantenimiento, PermisoSalida, Trabajador
+    codigo = f"PC-{n_computadores // 2:07d}"
+    return {
+        "mantenimientos: rango fecha": select(m).where(m.fecha.between(date(2023, 1, 1), date(2023, 1, 31)))
+        .order_by(m.fecha.desc()),
+        "mantenimientos: rango + tipo + estado": select(m)
+        .where(m.fecha.between(date(2023, 1, 1), date(2023, 3, 31)), m.tipo == "preventivo", m.estado == "pendiente")
+        .order_by(m.fecha.desc()),
+        "mantenimientos: estado, últimos 100": select(m).where(m.estado == "pendiente")
+        .order_by(m.fecha.desc()).limit(100),
+        "mantenimientos: por computador": select(m).where(m.computador_id == codigo).order_by(m.fecha.desc()),
+        "permisos: activos, últimos 100": select(p).where(p.estado == "activo").order_by(p.id.desc()).limit(100),
+        "permisos: por trabajador": select(p).where(p.cedula_trabajador == f"{7:010d}"),
+        "permisos: por nombre (prefijo)": select(p).join(t, p.cedula_trabajador == t.cedula)
+        .where(t.nombre.like("Jos%")).order_by(p.id.desc()).limit(100),
+        "detalle: por computador": select(Detalle).where(Detalle.codigo_computador == codigo),
+        "asignación: por usuario": select(AsignarUsuario.trabajador_id).where(AsignarUsuario.usuario_id == "u7"),
+        "computadores: marca + cursor": select(Computador).where(Computador.marca == "HP", Computador.codigo > codigo)
+        .order_by(Computador.codigo).limit(100),
+    }
+
+
+def plan(conn, sql: str):
+    if conn.dialect.name == "sqlite":
+        return [fila[-1] for fila in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [dict(fila._mapping) for fila in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+
+
+def medir(engine, stmt, repeticiones: int):
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    tiempos = []
+    with engine.connect() as conn:
+        explicacion = plan(conn, sql)
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            conn.execute(stmt).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "plan": explicacion,
+        "ms_mediana": round(statistics.median(tiempos), 3),
+        "ms_max": round(max(tiempos), 3),
+    }
+
+
+def main(args):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    indices = list(indices_compuestos())
+    with engine.begin() as conn:
+        for indice in indices:
+            indice.drop(conn)
+
+    print(f"Sembrando {args.mantenimientos} mantenimientos...", file=sys.stderr)
+    inicio = time.perf_counter()
+    sembrar(engine, args.mantenimientos, args.computadores, args.trabajadores, args.permisos)
+    print(f"  listo en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+
+    resultado = {"antes": {}, "despues": {}}
+    for nombre, stmt in consultas(args.computadores).items():
+        resultado["antes"][nombre] = medir(engine, stmt, args.repeticiones)
+
+    with engine.begin() as conn:
+        for indice in indices:
+            indice.create(conn)
+        conn.execute(text("ANALYZE") if engine.dialect.name == "sqlite" else text(
+            "ANALYZE TABLE mantenimientos, permisos, trabajadores, computadores, detalle, asignar_usuario"
+        ))
+
+    for nombre, stmt in consultas(args.computadores).items():
+        resultado["despues"][nombre] = medir(engine, stmt, args.repeticiones)
+
+    for nombre in resultado["antes"]:
+        antes, despues = resultado["antes"][nombre], resultado["despues"][nombre]
+        print(f"{nombre:40} {antes['ms_mediana']:>10.2f} ms -> {despues['ms_mediana']:>8.2f} ms")
+        print(f"{'':40} antes:   {antes['plan']}")
+        print(f"{'':40} después: {despues['plan']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main(ARGS)
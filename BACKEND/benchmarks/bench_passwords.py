@@ -0,0 +1,72 @@
+"""Benchmark del hash de contraseñas: logins/seg por núcleo para cada juego de parámetros.
+
+Uso (desde BACKEND/):
+    python benchmarks/bench_passwords.py [--segundos 2] [--json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import seguridad  # noqa: E402
+
+PASSWORD = "contraseña-de-prueba"
+
+# (nombre, algoritmo, parámetros)
+PARAMETROS = [
+    ("scrypt n=2^14 r=8 p=1", "scrypt", {"n": 2 ** 14, "r": 8, "p": 1}),
+    ("scrypt n=2^15 r=8 p=1", "scrypt", {"n": 2 ** 15, "r": 8, "p": 1}),
+    ("scrypt n=2^16 r=8 p=1", "scrypt", {"n": 2 ** 16, "r": 8, "p": 1}),
+    ("argon2id t=2 m=19MiB p=1", "argon2", {"time_cost": 2, "memory_cost": 19 * 1024, "parallelism": 1}),
+    ("argon2id t=3 m=64MiB p=1", "argon2", {"time_cost": 3, "memory_cost": 64 * 1024, "parallelism": 1}),
+]
+
+
+def medir(guardado: str, segundos: float) -> dict:
+    inicio = time.perf_counter()
+    cpu_inicio = time.process_time()
+    logins = 0
+    while time.perf_counter() - inicio < segundos:
+        assert seguridad.verificar_password(PASSWORD, guardado)
+        logins += 1
+    # Un solo hilo: la CPU consumida equivale a un núcleo
+    cpu = time.process_time() - cpu_inicio
+    return {
+        "logins": logins,
+        "ms_por_login": round(1000 * cpu / logins, 4),
+        "logins_seg_por_nucleo": round(logins / cpu, 1),
+        "longitud_hash": len(guardado),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segundos", type=float, default=2.0)
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nombre, algoritmo, parametros in PARAMETROS:
+        if algoritmo == "argon2" and seguridad.PasswordHasher is None:
+            resultados[nombre] = {"omitido": "argon2-cffi no instalado"}
+            continue
+        guardado = seguridad.hash_password(PASSWORD, algoritmo, **parametros)
+        resultados[nombre] = medir(guardado, args.segundos)
+    resultados["sha256 legado (referencia)"] = medir(hashlib.sha256(PASSWORD.encode()).hexdigest(), args.segundos)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+    for nombre, datos in resultados.items():
+        if "omitido" in datos:
+            print(f"{nombre:30} omitido: {datos['omitido']}")
+        else:
+            print(f"{nombre:30} {datos['logins_seg_por_nucleo']:>12} logins/s/núcleo {datos['ms_por_login']:>10} ms/login")
+
+
+if __name__ == "__main__":
+    main()
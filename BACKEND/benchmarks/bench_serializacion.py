@@ -0,0 +1,146 @@
+"""Benchmark de serialización: listados completos contra ?resumen=true.
+
+Siembra una base SQLite en memoria con N mantenimientos y N permisos (10 000
+por defecto), pide cada listado por TestClient con y sin ?resumen=true y
+compara el rendimiento (filas por segundo). El camino completo hidrata
+objetos ORM y los valida con MantenimientoOut -> ComputadorOut -> TrabajadorOut;
+el resumen lee tuplas y las serializa con orjson sin response_model.
+
+Uso (desde BACKEND/):
+    python benchmarks/bench_serializacion.py [--filas 10000] [--repeticiones 5] [--minimo 3] [--json]
+
+Sale con código 1 si algún resumen no alcanza `--minimo` veces el rendimiento
+del listado completo.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, time as hora, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Base propia en memoria y sin caché HTTP ni métricas: se mide la serialización
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["CACHE_HTTP"] = "0"
+os.environ["METRICAS"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import inicializar  # noqa: E402
+import main  # noqa: E402
+import respuestas  # noqa: E402
+from database import engine  # noqa: E402
+from models import Computador, Mantenimiento, PermisoSalida, Trabajador  # noqa: E402
+
+# Listado completo -> mismo listado por el camino rápido
+PARES = {
+    "/mantenimientos/": "/mantenimientos/?resumen=true",
+    "/permisos/": "/permisos/?resumen=true",
+}
+
+N_COMPUTADORES = 2_000
+N_TRABAJADORES = 500
+
+
+def sembrar(filas: int):
+    rnd = random.Random(7)
+    with engine.begin() as conn:
+        conn.execute(insert(Trabajador), [
+            {
+                "cedula": str(1000 + i), "nombre": rnd.choice(["José", "Jorge", "Ana", "Luz"]),
+                "apellidos": "Pérez", "cargo": "Analista", "area_de_trabajo": f"Área {i % 5}", "edad": 30,
+                "residencia": "Bogotá", "telefono": "300", "correo": f"t{i}@empresa.co",
+            }
+            for i in range(N_TRABAJADORES)
+        ])
+        conn.execute(insert(Computador), [
+            {"codigo": f"PC-{i:04d}", "nombre": f"Equipo {i}", "marca": "HP",
+             "trabajador_id": str(1000 + i % N_TRABAJADORES) if i % 4 else None}
+            for i in range(N_COMPUTADORES)
+        ])
+        conn.execute(insert(Mantenimiento), [
+            {
+                "computador_id": f"PC-{rnd.randrange(N_COMPUTADORES):04d}",
+                "fecha": date(2025, 1, 1) + timedelta(days=i % 365), "hora": hora(8, 0),
+                "tipo": rnd.choice(["preventivo", "correctivo"]), "estado": rnd.choice(["pendiente", "hecho"]),
+                "observaciones": "Limpieza y revisión general",
+            }
+            for i in range(filas)
+        ])
+        conn.execute(insert(PermisoSalida), [
+            {
+                "codigo_computador": f"PC-{rnd.randrange(N_COMPUTADORES):04d}",
+                "cedula_trabajador": str(1000 + rnd.randrange(N_TRABAJADORES)),
+                "estado": rnd.choice(["activo", "inactivo"]),
+            }
+            for _ in range(filas)
+        ])
+
+
+def medir(cliente: TestClient, ruta: str, repeticiones: int) -> dict:
+    cliente.get(ruta).raise_for_status()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(ruta)
+        tiempos.append(time.perf_counter() - inicio)
+        respuesta.raise_for_status()
+    filas = len(respuesta.json())
+    mediana = statistics.median(tiempos)
+    return {
+        "filas": filas,
+        "bytes": len(respuesta.content),
+        "ms_mediana": round(mediana * 1000, 1),
+        "filas_por_s": round(filas / mediana),
+    }
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10_000, help="mantenimientos y permisos sembrados")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--minimo", type=float, default=3.0, help="aceleración mínima exigida")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    # Sin `with` no corre el lifespan (hilos que también consultan): las tablas se crean aquí
+    inicializar.crear_tablas()
+    cliente = TestClient(main.app)
+    sembrar(args.filas)
+
+    resultado = {}
+    fallos = []
+    for completo, resumen in PARES.items():
+        antes = medir(cliente, completo, args.repeticiones)
+        despues = medir(cliente, resumen, args.repeticiones)
+        aceleracion = round(despues["filas_por_s"] / antes["filas_por_s"], 2)
+        resultado[completo] = {"completo": antes, "resumen": despues, "aceleracion": aceleracion}
+        if antes["filas"] != despues["filas"]:
+            fallos.append(f"{resumen}: {despues['filas']} filas, el completo devuelve {antes['filas']}")
+        if aceleracion < args.minimo:
+            fallos.append(f"{resumen}: {aceleracion}x (mínimo {args.minimo}x)")
+
+    if args.json:
+        print(json.dumps({"filas": args.filas, "orjson": respuestas.orjson is not None,
+                          "resultado": resultado, "fallos": fallos}, indent=2, ensure_ascii=False))
+    else:
+        print(f"{args.filas} filas · orjson {'sí' if respuestas.orjson is not None else 'no'}")
+        for ruta, datos in resultado.items():
+            antes, despues = datos["completo"], datos["resumen"]
+            marca = "✅" if datos["aceleracion"] >= args.minimo else "❌"
+            print(
+                f"{marca} {ruta:<18} {antes['ms_mediana']:>8} ms -> {despues['ms_mediana']:>7} ms"
+                f"  ({antes['filas_por_s']:>7} -> {despues['filas_por_s']:>8} filas/s, {datos['aceleracion']}x)"
+            )
+        for fallo in fallos:
+            print(f"❌ {fallo}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main_()
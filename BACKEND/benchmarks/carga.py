@@ -0,0 +1,382 @@
+"""Prueba de carga del backend: latencia p50/p95/p99, RPS y memoria por endpoint.
+
+Siembra una base local (SQLite por defecto, o un MySQL local con --url) con el
+tamaño pedido, arranca la app con uvicorn en un proceso aparte y la ataca con
+`--concurrencia` clientes durante `--segundos` por escenario. El resultado se
+imprime y se puede guardar como JSON; con --comparar se contrasta con una
+línea base y el script sale con código 1 si algún escenario empeora más que
+la tolerancia.
+
+Uso (desde BACKEND/):
+    python benchmarks/carga.py --guardar base.json
+    python benchmarks/carga.py --comparar base.json [--tolerancia 0.15]
+    python benchmarks/carga.py --escenarios listar_computadores,login --concurrencia 16 --segundos 20
+    python benchmarks/carga.py --modo async --concurrencia 200 --comparar sync.json
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.engine import make_url  # noqa: E402
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:////tmp/bench_carga.db", help="base a sembrar (se borra)")
+    parser.add_argument("--computadores", type=int, default=2_000)
+    parser.add_argument("--trabajadores", type=int, default=500)
+    parser.add_argument("--mantenimientos", type=int, default=20_000)
+    parser.add_argument("--permisos", type=int, default=5_000)
+    parser.add_argument("--sin-sembrar", action="store_true", help="reutilizar la base de una corrida anterior")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10.0, help="duración de cada escenario")
+    parser.add_argument("--escenarios", help="lista separada por comas (por defecto todos)")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--sin-cache", action="store_true", help="arrancar con CACHE_HTTP=0")
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync",
+                        help="handlers en el threadpool o con sesión asíncrona (MODO_ASYNC)")
+    parser.add_argument("--guardar", help="guardar el resultado en este archivo JSON")
+    parser.add_argument("--comparar", help="línea base JSON contra la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="empeoramiento admitido (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    # La siembra borra y recrea las tablas: solo contra bases locales
+    url = make_url(args.url)
+    if url.get_backend_name() != "sqlite" and url.host not in ("localhost", "127.0.0.1"):
+        parser.error("--url debe ser SQLite o un MySQL en localhost")
+    if args.escenarios:
+        desconocidos = set(args.escenarios.split(",")) - set(ESCENARIOS)
+        if desconocidos:
+            parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+    return args
+
+
+# ======== CLIENTE ========
+
+class Cliente:
+    """Una conexión keep-alive por hilo de carga."""
+
+    def __init__(self, puerto: int, token: str = None):
+        self.conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+        self.token = token
+
+    def pedir(self, metodo: str, ruta: str, cuerpo=None, tipo: str = "application/json") -> int:
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if cuerpo is not None:
+            headers["Content-Type"] = tipo
+            if tipo == "application/json":
+                cuerpo = json.dumps(cuerpo)
+        try:
+            if self.conexion.sock is None:
+                # Sin Nagle: si no, el ACK retardado mete ~40 ms en cada petición
+                self.conexion.connect()
+                self.conexion.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.conexion.request(metodo, ruta, body=cuerpo, headers=headers)
+            respuesta = self.conexion.getresponse()
+            respuesta.read()
+            return respuesta.status
+        except (http.client.HTTPException, OSError):
+            self.conexion.close()
+            return 0
+
+
+def multipart(nombre_archivo: str, contenido: bytes, content_type: str):
+    limite = uuid.uuid4().hex
+    cuerpo = (
+        f"--{limite}\r\n"
+        f'Content-Disposition: form-data; name="foto"; filename="{nombre_archivo}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + contenido + f"\r\n--{limite}--\r\n".encode()
+    return cuerpo, f"multipart/form-data; boundary={limite}"
+
+
+def imagen_aleatoria(rnd: random.Random) -> bytes:
+    """JPEG pequeño y distinto en cada llamada (el almacén deduplica por contenido)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + rnd.randbytes(20_000) + b"\xff\xd9"
+    imagen = Image.new("RGB", (320, 240), tuple(rnd.randrange(256) for _ in range(3)))
+    imagen.putpixel((rnd.randrange(320), rnd.randrange(240)), (rnd.randrange(256), 0, 0))
+    salida = io.BytesIO()
+    imagen.save(salida, "JPEG", quality=85)
+    return salida.getvalue()
+
+
+# ======== ESCENARIOS ========
+# Cada escenario hace una petición y devuelve el código HTTP
+
+def listar_computadores(cliente, rnd, datos):
+    marca = rnd.choice(["", "&marca=HP", "&marca=Dell", "&marca=Lenovo"])
+    return cliente.pedir("GET", f"/computadores/?limite=100{marca}")
+
+
+def obtener_computador(cliente, rnd, datos):
+    return cliente.pedir("GET", f"/computadores/PC-{rnd.randrange(datos['computadores']):07d}")
+
+
+def obtener_trabajador(cliente, rnd, datos):
+    return cliente.pedir("GET", f"/trabajadores/{rnd.randrange(datos['trabajadores']):010d}")
+
+
+def listar_mantenimientos(cliente, rnd, datos):
+    inicio = date(2020, 1, 1) + timedelta(days=rnd.randrange(1970))
+    return cliente.pedir("GET", f"/mantenimientos/?fecha_inicio={inicio}&fecha_fin={inicio + timedelta(days=30)}")
+
+
+def listar_permisos(cliente, rnd, datos):
+    return cliente.pedir("GET", f"/permisos/?estado=activo&nombre={rnd.choice(['Jos', 'Mar', 'And', 'Luc'])}")
+
+
+def buscar(cliente, rnd, datos):
+    return cliente.pedir("GET", f"/buscar?q={rnd.choice(['jose', 'perez', 'PC-00012', 'SN0000003', 'lenovo'])}")
+
+
+def crear_mantenimiento(cliente, rnd, datos):
+    return cliente.pedir("POST", "/mantenimientos/", {
+        "computador_id": f"PC-{rnd.randrange(datos['computadores']):07d}",
+        "fecha": str(date(2026, 1, 1) + timedelta(days=rnd.randrange(365))),
+        "hora": "09:00:00",
+        "tipo": rnd.choice(["preventivo", "correctivo"]),
+        "estado": "pendiente",
+    })
+
+
+def login(cliente, rnd, datos):
+    return cliente.pedir("POST", "/usuarios/login", {"username": "admin", "password": "admin"})
+
+
+def subir_foto(cliente, rnd, datos):
+    cuerpo, tipo = multipart("equipo.jpg", imagen_aleatoria(rnd), "image/jpeg")
+    return cliente.pedir("POST", "/upload-foto/", cuerpo, tipo)
+
+
+# Mezcla de un día normal: sobre todo lecturas
+PESOS_MEZCLA = {
+    listar_computadores: 25, obtener_computador: 20, obtener_trabajador: 10, listar_mantenimientos: 15,
+    listar_permisos: 10, buscar: 10, crear_mantenimiento: 5, login: 4, subir_foto: 1,
+}
+
+
+def mezcla(cliente, rnd, datos):
+    escenario = rnd.choices(list(PESOS_MEZCLA), weights=list(PESOS_MEZCLA.values()))[0]
+    return escenario(cliente, rnd, datos)
+
+
+ESCENARIOS = {
+    f.__name__: f for f in (
+        listar_computadores, obtener_computador, obtener_trabajador, listar_mantenimientos, listar_permisos,
+        buscar, crear_mantenimiento, login, subir_foto, mezcla,
+    )
+}
+
+
+# ======== MEDICIÓN ========
+
+def rss_mb(pid: int):
+    """Memoria residente del servidor (Linux /proc; psutil si está instalado)."""
+    try:
+        with open(f"/proc/{pid}/status") as archivo:
+            for linea in archivo:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def percentil(cortes, p: int):
+    return round(cortes[p - 1], 2)
+
+
+def ejecutar_escenario(nombre, args, token, datos, pid):
+    escenario = ESCENARIOS[nombre]
+    fin = time.perf_counter() + args.segundos
+    memoria = []
+    detener = threading.Event()
+
+    def muestrear():
+        while not detener.wait(0.2):
+            valor = rss_mb(pid)
+            if valor is not None:
+                memoria.append(valor)
+
+    def trabajador(semilla):
+        rnd = random.Random(semilla)
+        cliente = Cliente(args.puerto, token)
+        latencias, errores = [], 0
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            codigo = escenario(cliente, rnd, datos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if not 200 <= codigo < 400:
+                errores += 1
+        return latencias, errores
+
+    rss_inicio = rss_mb(pid)
+    muestreador = threading.Thread(target=muestrear, daemon=True)
+    muestreador.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrencia) as pool:
+        resultados = list(pool.map(trabajador, range(args.concurrencia)))
+    duracion = time.perf_counter() - inicio
+    detener.set()
+    muestreador.join()
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    errores = sum(e for _, e in resultados)
+    cortes = statistics.quantiles(latencias, n=100, method="inclusive") if len(latencias) > 1 else [0.0] * 99
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 1),
+        "p50_ms": percentil(cortes, 50),
+        "p95_ms": percentil(cortes, 95),
+        "p99_ms": percentil(cortes, 99),
+        "max_ms": round(latencias[-1], 2) if latencias else 0.0,
+        "rss_inicio_mb": round(rss_inicio, 1) if rss_inicio else None,
+        "rss_max_mb": round(max(memoria), 1) if memoria else None,
+        "rss_fin_mb": round(memoria[-1], 1) if memoria else None,
+    }
+
+
+# ======== SERVIDOR ========
+
+def sembrar_base(args):
+    os.environ["DATABASE_URL"] = args.url
+    from bench_indices import sembrar
+    from database import Base, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    print(f"Sembrando {args.computadores} computadores / {args.mantenimientos} mantenimientos...", file=sys.stderr)
+    sembrar(engine, args.mantenimientos, args.computadores, args.trabajadores, args.permisos)
+    engine.dispose()
+
+
+def arrancar_servidor(args, fotos_dir: str):
+    entorno = dict(
+        os.environ,
+        DATABASE_URL=args.url,
+        FOTOS_DIR=fotos_dir,
+        TOKEN_SECRET="carga-" + uuid.uuid4().hex,
+        BUSQUEDA_SNAPSHOT=os.path.join(fotos_dir, "busqueda.json"),
+    )
+    if args.sin_cache:
+        entorno["CACHE_HTTP"] = "0"
+    entorno["MODO_ASYNC"] = "1" if args.modo == "async" else "0"
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.puerto), "--log-level", "warning"],
+        cwd=BACKEND, env=entorno,
+    )
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise SystemExit("El servidor terminó al arrancar")
+        if Cliente(args.puerto).pedir("GET", "/openapi.json") == 200:
+            return proceso
+        time.sleep(0.3)
+    proceso.terminate()
+    raise SystemExit("El servidor no respondió en 60 s")
+
+
+def obtener_token(puerto: int) -> str:
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    conexion.request("POST", "/usuarios/login", body=json.dumps({"username": "admin", "password": "admin"}),
+                     headers={"Content-Type": "application/json"})
+    respuesta = conexion.getresponse()
+    if respuesta.status != 200:
+        raise SystemExit(f"No se pudo iniciar sesión como admin ({respuesta.status})")
+    return json.loads(respuesta.read())["access_token"]
+
+
+# ======== COMPARACIÓN ========
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> list:
+    regresiones = []
+    for nombre, ahora in actual["escenarios"].items():
+        antes = base.get("escenarios", {}).get(nombre)
+        if antes is None:
+            continue
+        if antes["p95_ms"] and ahora["p95_ms"] > antes["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {antes['p95_ms']} -> {ahora['p95_ms']} ms")
+        if antes["rps"] and ahora["rps"] < antes["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: RPS {antes['rps']} -> {ahora['rps']}")
+        if ahora["errores"] > antes["errores"]:
+            regresiones.append(f"{nombre}: errores {antes['errores']} -> {ahora['errores']}")
+    return regresiones
+
+
+def main():
+    args = parsear_argumentos()
+    if not args.sin_sembrar:
+        sembrar_base(args)
+
+    nombres = args.escenarios.split(",") if args.escenarios else list(ESCENARIOS)
+    datos = {"computadores": args.computadores, "trabajadores": args.trabajadores}
+    resultado = {
+        "configuracion": {
+            "url": make_url(args.url).render_as_string(hide_password=True),
+            "computadores": args.computadores, "trabajadores": args.trabajadores,
+            "mantenimientos": args.mantenimientos, "permisos": args.permisos,
+            "concurrencia": args.concurrencia, "segundos": args.segundos, "cache_http": not args.sin_cache,
+            "modo": args.modo,
+        },
+        "escenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="1a_carga_") as fotos_dir:
+        servidor = arrancar_servidor(args, fotos_dir)
+        try:
+            token = obtener_token(args.puerto)
+            for nombre in nombres:
+                print(f"→ {nombre}...", file=sys.stderr)
+                resultado["escenarios"][nombre] = ejecutar_escenario(nombre, args, token, datos, servidor.pid)
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+
+    print(f"{'escenario':<24}{'RPS':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errores':>9}{'RSS máx':>10}")
+    for nombre, r in resultado["escenarios"].items():
+        print(f"{nombre:<24}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['errores']:>9}"
+              f"{r['rss_max_mb'] if r['rss_max_mb'] is not None else '-':>10}")
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(resultado, json.load(archivo), args.tolerancia)
+        for regresion in regresiones:
+            print(f"❌ {regresion}")
+        if regresiones:
+            sys.exit(1)
+        print(f"✅ Sin regresiones frente a {args.comparar} (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Cuenta las sentencias SQL que emite cada endpoint de listado y falla si hay regresiones.
+
+Siembra una base SQLite en memoria dos veces (N y 10·N mantenimientos / permisos
+sobre los mismos computadores y trabajadores), llama a cada endpoint con
+TestClient y compara el número de consultas con el presupuesto. Un endpoint
+sin N+1 emite las mismas consultas en ambos tamaños.
+
+Uso (desde BACKEND/):
+    python benchmarks/contar_consultas.py [--filas 200] [--json]
+
+Sale con código 1 si algún endpoint supera su presupuesto o crece con las filas.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, time as hora, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Base propia en memoria y sin caché HTTP: cada petición debe llegar a la base
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["CACHE_HTTP"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete, event, insert  # noqa: E402
+
+import inicializar  # noqa: E402
+import main  # noqa: E402
+from database import engine  # noqa: E402
+from models import Computador, Mantenimiento, PermisoSalida, Trabajador  # noqa: E402
+
+# Endpoint -> máximo de sentencias SQL por petición
+PRESUPUESTO = {
+    "/mantenimientos/": 1,
+    "/mantenimientos/?tipo=preventivo&estado=pendiente": 1,
+    "/permisos/": 3,
+    "/permisos/?nombre=jo&estado=activo": 3,
+    "/mantenimientos/?resumen=true": 1,
+    "/permisos/?resumen=true&nombre=jo": 1,
+    "/computadores/?todos=true": 1,
+    "/computadores/?limite=100": 1,
+    "/trabajadores/": 1,
+    "/mantenimientos/computadores": 1,
+    "/computadores/PC-0001/ficha?ultimos=50": 3,
+    # Sincronización: contador + filas (+ relaciones) + lápidas
+    "/computadores/?since=0": 3,
+    "/mantenimientos/?since=0": 3,
+    "/permisos/?since=0": 5,
+    "/detalles/?since=0": 3,
+}
+
+N_COMPUTADORES = 150
+N_TRABAJADORES = 60
+
+
+class ContadorSQL:
+    def __init__(self):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+    def quitar(self):
+        event.remove(engine, "before_cursor_execute", self._contar)
+
+
+def sembrar(filas: int):
+    rnd = random.Random(7)
+    with engine.begin() as conn:
+        for modelo in (PermisoSalida, Mantenimiento, Computador, Trabajador):
+            conn.execute(delete(modelo))
+        conn.execute(insert(Trabajador), [
+            {
+                "cedula": str(1000 + i), "nombre": rnd.choice(["José", "Jorge", "Ana", "Luz"]),
+                "apellidos": "Pérez", "cargo": "Analista", "area_de_trabajo": f"Área {i % 5}", "edad": 30,
+                "residencia": "Bogotá", "telefono": "300", "correo": f"t{i}@empresa.co",
+            }
+            for i in range(N_TRABAJADORES)
+        ])
+        conn.execute(insert(Computador), [
+            {"codigo": f"PC-{i:04d}", "nombre": f"Equipo {i}", "marca": "HP",
+             "trabajador_id": str(1000 + i % N_TRABAJADORES) if i % 4 else None}
+            for i in range(N_COMPUTADORES)
+        ])
+        conn.execute(insert(Mantenimiento), [
+            {
+                "computador_id": f"PC-{rnd.randrange(N_COMPUTADORES):04d}",
+                "fecha": date(2025, 1, 1) + timedelta(days=i % 365), "hora": hora(8, 0),
+                "tipo": rnd.choice(["preventivo", "correctivo"]), "estado": rnd.choice(["pendiente", "hecho"]),
+            }
+            for i in range(filas)
+        ])
+        conn.execute(insert(PermisoSalida), [
+            {
+                "codigo_computador": f"PC-{rnd.randrange(N_COMPUTADORES):04d}",
+                "cedula_trabajador": str(1000 + rnd.randrange(N_TRABAJADORES)),
+                "estado": rnd.choice(["activo", "inactivo"]),
+            }
+            for _ in range(filas)
+        ])
+
+
+def medir(cliente: TestClient, contador: ContadorSQL) -> dict:
+    resultado = {}
+    for ruta in PRESUPUESTO:
+        antes = contador.total
+        respuesta = cliente.get(ruta)
+        respuesta.raise_for_status()
+        resultado[ruta] = contador.total - antes
+    return resultado
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200, help="mantenimientos y permisos en la pasada pequeña")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    # Sin `with` no corre el lifespan (hilos que también consultan): las tablas se crean aquí
+    inicializar.crear_tablas()
+    cliente = TestClient(main.app)
+    contador = ContadorSQL()
+
+    sembrar(args.filas)
+    pequeno = medir(cliente, contador)
+    sembrar(args.filas * 10)
+    grande = medir(cliente, contador)
+
+    fallos = []
+    for ruta, maximo in PRESUPUESTO.items():
+        if grande[ruta] > maximo:
+            fallos.append(f"{ruta}: {grande[ruta]} consultas (presupuesto {maximo})")
+        if grande[ruta] > pequeno[ruta]:
+            fallos.append(f"{ruta}: crece con las filas ({pequeno[ruta]} -> {grande[ruta]})")
+
+    if args.json:
+        print(json.dumps({"filas": [args.filas, args.filas * 10], "pequeno": pequeno, "grande": grande,
+                          "presupuesto": PRESUPUESTO, "fallos": fallos}, indent=2, ensure_ascii=False))
+    else:
+        for ruta, maximo in PRESUPUESTO.items():
+            marca = "✅" if grande[ruta] <= min(maximo, pequeno[ruta]) else "❌"
+            print(f"{marca} {ruta:<52} {pequeno[ruta]:>3} / {grande[ruta]:>3} consultas (máx {maximo})")
+        for fallo in fallos:
+            print(f"❌ {fallo}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main_()
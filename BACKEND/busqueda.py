@@ -0,0 +1,450 @@
+import heapq
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# 🔎 Índice invertido de trigramas en memoria para /buscar
+#
+# Se mantiene al día desde los handlers de escritura de los routers y se
+# puede reconstruir offline con:  python busqueda.py reconstruir
+#
+# Cada worker tiene su propio índice: lo que escribe otro worker llega cada
+# BUSQUEDA_SINCRONIZAR segundos leyendo las filas con versión mayor a la
+# última aplicada (y sus lápidas), igual que un cliente de ?since=.
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Fracción mínima de trigramas de la consulta que debe tener un resultado
+UMBRAL = 0.6
+
+# Desempate entre tipos con el mismo puntaje
+PRIORIDAD = {"trabajador": 0, "computador": 1, "detalle": 2, "permiso": 3}
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sin tildes ni signos: 'José Pérez' -> 'jose perez'."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def trigramas(texto: str, prefijo: bool = False) -> set:
+    """Trigramas por palabra con relleno; con prefijo=True no se cierra la palabra
+    (así 'jos' encuentra 'jose' mientras se escribe)."""
+    resultado = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra}" if prefijo else f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._docs = {}                        # id -> (tipo, clave, titulo, subtitulo, texto, clave normalizada)
+        self._ids = {}                         # (tipo, clave) -> id
+        self._postings = defaultdict(set)      # trigrama -> ids
+        self._relacionados = defaultdict(set)  # (tipo, clave) padre -> ids de documentos hijos
+        self._padres = {}                      # id -> padres
+        self._siguiente = 0
+        self._lock = threading.RLock()
+        # Versión de filas hasta la que está al día (None: desconocida, p. ej. instantánea)
+        self.version = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def agregar(self, tipo: str, clave, titulo: str, subtitulo: str, campos, padres=()):
+        texto = normalizar(" ".join(str(c) for c in campos if c))
+        clave = str(clave)
+        with self._lock:
+            self.quitar(tipo, clave)
+            doc_id = self._siguiente
+            self._siguiente += 1
+            self._docs[doc_id] = (tipo, clave, titulo, subtitulo, texto, normalizar(clave))
+            self._ids[(tipo, clave)] = doc_id
+            for trigrama in trigramas(texto):
+                self._postings[trigrama].add(doc_id)
+            self._padres[doc_id] = tuple((t, str(c)) for t, c in padres)
+            for padre in self._padres[doc_id]:
+                self._relacionados[padre].add(doc_id)
+
+    def quitar(self, tipo: str, clave):
+        with self._lock:
+            doc_id = self._ids.pop((tipo, str(clave)), None)
+            if doc_id is None:
+                return
+            texto = self._docs.pop(doc_id)[4]
+            for trigrama in trigramas(texto):
+                posting = self._postings.get(trigrama)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del self._postings[trigrama]
+            for padre in self._padres.pop(doc_id, ()):
+                self._relacionados[padre].discard(doc_id)
+
+    def quitar_con_relacionados(self, tipo: str, clave):
+        """Quita el documento y los que dependen de él (p. ej. permisos de un computador)."""
+        with self._lock:
+            hijos = self._relacionados.pop((tipo, str(clave)), set())
+            for doc_id in list(hijos):
+                if doc_id in self._docs:
+                    hijo_tipo, hijo_clave = self._docs[doc_id][:2]
+                    self.quitar(hijo_tipo, hijo_clave)
+            self.quitar(tipo, clave)
+
+    def buscar(self, consulta: str, tipos=None, limite: int = 20):
+        texto = normalizar(consulta)
+        buscados = trigramas(texto, prefijo=True)
+        if not buscados:
+            return []
+        minimo = max(1, int(len(buscados) * UMBRAL + 0.999))
+
+        with self._lock:
+            # Conteo de coincidencias por documento (Counter.update recorre los sets en C)
+            conteo = Counter()
+            for trigrama in buscados:
+                conteo.update(self._postings.get(trigrama, ()))
+
+            claves_orden = []
+            for doc_id, coincidencias in conteo.items():
+                if coincidencias < minimo:
+                    continue
+                tipo, clave, titulo, _, doc_texto, clave_normalizada = self._docs[doc_id]
+                if tipos and tipo not in tipos:
+                    continue
+                puntaje = coincidencias / len(buscados)
+                # Bonificación si es la clave exacta, aparece literal (sin tildes)
+                # o como inicio de palabra
+                if clave_normalizada == texto:
+                    puntaje += 1
+                elif texto in doc_texto:
+                    puntaje += 0.5
+                    if doc_texto.startswith(texto) or f" {texto}" in doc_texto:
+                        puntaje += 0.25
+                claves_orden.append((-puntaje, PRIORIDAD[tipo], len(titulo or ""), clave, doc_id))
+
+            mejores = heapq.nsmallest(limite, claves_orden)
+            return [
+                {
+                    "tipo": self._docs[doc_id][0],
+                    "clave": clave,
+                    "titulo": self._docs[doc_id][2],
+                    "subtitulo": self._docs[doc_id][3],
+                    "puntaje": round(-puntaje, 3),
+                }
+                for puntaje, _, _, clave, doc_id in mejores
+            ]
+
+    # ======== INSTANTÁNEA ========
+
+    def exportar(self) -> list:
+        with self._lock:
+            return [
+                [tipo, clave, titulo, subtitulo, texto, self._padres.get(doc_id, ())]
+                for doc_id, (tipo, clave, titulo, subtitulo, texto, _) in self._docs.items()
+            ]
+
+    @classmethod
+    def desde_lista(cls, documentos):
+        indice = cls()
+        for tipo, clave, titulo, subtitulo, texto, padres in documentos:
+            indice.agregar(tipo, clave, titulo, subtitulo, [texto], padres)
+        return indice
+
+
+# ======== DOCUMENTOS POR ENTIDAD ========
+
+def doc_trabajador(t):
+    nombre = f"{t.nombre} {t.apellidos}"
+    return ("trabajador", t.cedula, nombre, t.cargo, [t.cedula, t.nombre, t.apellidos, t.cargo], ())
+
+
+def doc_computador(c):
+    return (
+        "computador", c.codigo, c.nombre, f"{c.marca} · {c.codigo}",
+        [c.codigo, c.nombre, c.marca], (),
+    )
+
+
+def doc_detalle(d):
+    return (
+        "detalle", d.id, d.serial or d.codigo_computador, f"Computador {d.codigo_computador}",
+        [d.serial, d.codigo_computador], [("computador", d.codigo_computador)],
+    )
+
+
+def doc_permiso(p, nombre: str = "", apellidos: str = ""):
+    estado = p.estado.value if hasattr(p.estado, "value") else p.estado
+    return (
+        "permiso", p.id, f"{nombre} {apellidos}".strip() or p.cedula_trabajador,
+        f"{p.codigo_computador} · {estado}",
+        [p.codigo_computador, p.cedula_trabajador, nombre, apellidos],
+        [("computador", p.codigo_computador), ("trabajador", p.cedula_trabajador)],
+    )
+
+
+# ======== ÍNDICE GLOBAL ========
+
+_indice = IndiceBusqueda()
+_estado_lock = threading.Lock()
+_reconstruyendo = False
+_repetir = False
+_pendientes = []
+
+
+def _aplicar(operacion, *args):
+    """Aplica un cambio al índice vigente y lo guarda si hay una reconstrucción en curso."""
+    with _estado_lock:
+        if _reconstruyendo:
+            _pendientes.append((operacion, args))
+        indice = _indice
+    getattr(indice, operacion)(*args)
+
+
+def indexar(documento):
+    tipo, clave, titulo, subtitulo, campos, padres = documento
+    _aplicar("agregar", tipo, clave, titulo, subtitulo, campos, padres)
+
+
+def quitar(tipo: str, clave, relacionados: bool = False):
+    _aplicar("quitar_con_relacionados" if relacionados else "quitar", tipo, clave)
+
+
+def buscar(consulta: str, tipos=None, limite: int = None):
+    return _indice.buscar(consulta, tipos, limite or config.BUSQUEDA_LIMITE)
+
+
+def indexar_permisos_de_trabajador(db, cedula: str):
+    """El texto de los permisos incluye el nombre del trabajador: se reindexan si cambia."""
+    from models import PermisoSalida, Trabajador
+
+    trabajador = db.query(Trabajador).filter(Trabajador.cedula == cedula).first()
+    if trabajador is None:
+        return
+    for permiso in db.query(PermisoSalida).filter(PermisoSalida.cedula_trabajador == cedula):
+        indexar(doc_permiso(permiso, trabajador.nombre, trabajador.apellidos))
+
+
+def construir_desde_db() -> IndiceBusqueda:
+    from sqlalchemy import select
+    import versionado
+    from database import engine
+    from models import Computador, Detalle, PermisoSalida, Trabajador
+
+    indice = IndiceBusqueda()
+    consultas = [
+        (select(Trabajador), doc_trabajador),
+        (select(Computador), doc_computador),
+        (select(Detalle), doc_detalle),
+    ]
+    from sqlalchemy.orm import Session
+
+    with Session(engine) as db:
+        # Antes de leer: lo que se confirme mientras tanto vuelve en la siguiente sincronización
+        indice.version = versionado.estado(db)[0]
+        for consulta, convertir in consultas:
+            for fila in db.execute(consulta.execution_options(yield_per=2000)).scalars():
+                indice.agregar(*convertir(fila))
+            db.expunge_all()
+        consulta = (
+            select(PermisoSalida, Trabajador.nombre, Trabajador.apellidos)
+            .outerjoin(Trabajador, PermisoSalida.cedula_trabajador == Trabajador.cedula)
+            .execution_options(yield_per=2000)
+        )
+        for permiso, nombre, apellidos in db.execute(consulta):
+            indice.agregar(*doc_permiso(permiso, nombre or "", apellidos or ""))
+    return indice
+
+
+def reconstruir():
+    """Reconstruye desde la base sin perder los cambios que lleguen mientras tanto."""
+    global _indice, _reconstruyendo, _repetir
+    with _estado_lock:
+        if _reconstruyendo:
+            # La lectura en curso puede no ver lo último: se repite al terminar
+            _repetir = True
+            return
+        _reconstruyendo = True
+
+    while True:
+        with _estado_lock:
+            _repetir = False
+            _pendientes.clear()
+        try:
+            nuevo = construir_desde_db()
+        except Exception:
+            with _estado_lock:
+                _reconstruyendo = False
+                _pendientes.clear()
+            raise
+
+        while True:
+            with _estado_lock:
+                pendientes = list(_pendientes)
+                _pendientes.clear()
+                if not pendientes:
+                    _indice = nuevo
+                    if not _repetir:
+                        _reconstruyendo = False
+                    break
+            for operacion, args in pendientes:
+                getattr(nuevo, operacion)(*args)
+        logger.info("Índice de búsqueda reconstruido: %s documentos", len(nuevo))
+        if not _reconstruyendo:
+            return
+
+
+def cargar_snapshot(ruta: str = None) -> bool:
+    global _indice
+    ruta = ruta or config.BUSQUEDA_SNAPSHOT
+    if not os.path.exists(ruta):
+        return False
+    with open(ruta, encoding="utf-8") as archivo:
+        _indice = IndiceBusqueda.desde_lista(json.load(archivo))
+    return True
+
+
+def guardar_snapshot(indice: IndiceBusqueda, ruta: str = None):
+    ruta = ruta or config.BUSQUEDA_SNAPSHOT
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(indice.exportar(), archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def sincronizar() -> int:
+    """Aplica al índice las filas escritas (por cualquier worker) desde la última versión vista.
+
+    Devuelve cuántos cambios aplicó. Si las lápidas necesarias ya se purgaron,
+    reconstruye el índice completo.
+    """
+    from sqlalchemy.orm import Session
+    import versionado
+    from database import engine
+    from models import Computador, Detalle, PermisoSalida, Trabajador
+
+    with _estado_lock:
+        if _reconstruyendo:
+            return 0
+        indice = _indice
+    since = indice.version
+    if since is None:
+        # Aún sin reconstruir desde la base: no hay desde dónde pedir cambios
+        return 0
+
+    with Session(engine) as db:
+        version, purgadas = versionado.estado(db)
+        if version == since:
+            return 0
+        if since < purgadas:
+            logger.warning("Lápidas purgadas desde la versión %s: se reconstruye el índice", since)
+            reconstruir()
+            return 0
+
+        cambios = 0
+        trabajadores = versionado.delta(db, db.query(Trabajador), Trabajador, since)
+        for clave in trabajadores["eliminados"]:
+            quitar("trabajador", clave, relacionados=True)
+        for trabajador in trabajadores["items"]:
+            indexar(doc_trabajador(trabajador))
+            # Los permisos muestran el nombre del trabajador
+            indexar_permisos_de_trabajador(db, trabajador.cedula)
+        cambios += len(trabajadores["eliminados"]) + len(trabajadores["items"])
+
+        computadores = versionado.delta(db, db.query(Computador), Computador, since)
+        for clave in computadores["eliminados"]:
+            quitar("computador", clave, relacionados=True)
+        for computador in computadores["items"]:
+            indexar(doc_computador(computador))
+        cambios += len(computadores["eliminados"]) + len(computadores["items"])
+
+        detalles = versionado.delta(db, db.query(Detalle), Detalle, since)
+        for clave in detalles["eliminados"]:
+            quitar("detalle", clave)
+        for detalle in detalles["items"]:
+            indexar(doc_detalle(detalle))
+        cambios += len(detalles["eliminados"]) + len(detalles["items"])
+
+        permisos = versionado.delta(db, db.query(PermisoSalida), PermisoSalida, since)
+        for clave in permisos["eliminados"]:
+            quitar("permiso", clave)
+        nombres = {}
+        cedulas = {p.cedula_trabajador for p in permisos["items"]}
+        if cedulas:
+            nombres = {
+                t.cedula: (t.nombre, t.apellidos)
+                for t in db.query(Trabajador).filter(Trabajador.cedula.in_(cedulas))
+            }
+        for permiso in permisos["items"]:
+            indexar(doc_permiso(permiso, *nombres.get(permiso.cedula_trabajador, ("", ""))))
+        cambios += len(permisos["eliminados"]) + len(permisos["items"])
+
+    # Versión leída antes que las filas: lo confirmado después llega en la próxima vuelta
+    with _estado_lock:
+        if _indice is indice:
+            indice.version = version
+    return cambios
+
+
+_detener = threading.Event()
+
+
+def _bucle_sincronizacion():
+    while not _detener.wait(config.BUSQUEDA_SINCRONIZAR):
+        try:
+            sincronizar()
+        except Exception:
+            logger.exception("Falló la sincronización del índice de búsqueda")
+
+
+def iniciar_sincronizacion():
+    if config.BUSQUEDA_SINCRONIZAR <= 0:
+        return
+    _detener.clear()
+    threading.Thread(target=_bucle_sincronizacion, name="sincronizar-busqueda", daemon=True).start()
+
+
+def detener_sincronizacion():
+    _detener.set()
+
+
+def reconstruir_en_segundo_plano():
+    def _reconstruir():
+        try:
+            reconstruir()
+        except Exception:
+            logger.exception("Falló la reconstrucción del índice de búsqueda")
+
+    threading.Thread(target=_reconstruir, name="indice-busqueda", daemon=True).start()
+
+
+def iniciar():
+    """Arranque: instantánea si existe (disponible al momento), reconstrucción en segundo
+    plano y sincronización periódica con lo que escriben los demás workers."""
+    try:
+        cargar_snapshot()
+    except (OSError, ValueError):
+        logger.exception("No se pudo leer la instantánea de búsqueda")
+    reconstruir_en_segundo_plano()
+    iniciar_sincronizacion()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["reconstruir"]:
+        print("Uso: python busqueda.py reconstruir")
+        sys.exit(1)
+    indice = construir_desde_db()
+    guardar_snapshot(indice)
+    print(f"✅ Índice con {len(indice)} documentos guardado en {config.BUSQUEDA_SNAPSHOT}")
@@ -0,0 +1,204 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# 🗄️ Cache HTTP para los listados: ETag débil por versión de tabla + LRU en memoria
+
+# Ruta del listado -> tablas de las que depende su contenido
+RUTAS_CACHEADAS = {
+    "/computadores/": ("computadores", "trabajadores"),
+    "/trabajadores/": ("trabajadores",),
+    "/mantenimientos/": ("mantenimientos", "computadores", "trabajadores"),
+    "/permisos/": ("permisos", "computadores", "trabajadores"),
+}
+
+
+class VersionesMemoria:
+    """Versiones por tabla dentro del proceso (un solo worker)."""
+
+    def __init__(self):
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def leer(self, tablas):
+        with self._lock:
+            return tuple(self._versiones.get(t, 0) for t in tablas)
+
+    def incrementar(self, tablas):
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+
+class VersionesArchivo:
+    """Versiones guardadas en un archivo SQLite local que comparten todos los workers."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS versiones (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def leer(self, tablas):
+        filas = dict(
+            self._conexion().execute(
+                f"SELECT tabla, version FROM versiones WHERE tabla IN ({','.join('?' * len(tablas))})",
+                tablas,
+            ).fetchall()
+        )
+        return tuple(filas.get(t, 0) for t in tablas)
+
+    def incrementar(self, tablas):
+        conn = self._conexion()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for tabla in tablas:
+                conn.execute(
+                    "INSERT INTO versiones (tabla, version) VALUES (?, 1) "
+                    "ON CONFLICT(tabla) DO UPDATE SET version = version + 1",
+                    (tabla,),
+                )
+
+
+class CacheLRU:
+    """Respuestas serializadas con límite de entradas, de bytes y TTL."""
+
+    def __init__(self, max_entradas: int, max_bytes: int, ttl: int):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                self._quitar(clave)
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, cuerpo: bytes, headers):
+        if len(cuerpo) > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (time.monotonic() + self.ttl, (cuerpo, headers))
+            self._bytes += len(cuerpo)
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._datos)))
+
+    def _quitar(self, clave):
+        _, (cuerpo, _) = self._datos.pop(clave)
+        self._bytes -= len(cuerpo)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+
+if config.CACHE_BACKEND == "archivo":
+    versiones = VersionesArchivo(config.CACHE_ARCHIVO)
+else:
+    versiones = VersionesMemoria()
+
+respuestas = CacheLRU(config.CACHE_MAX_ENTRADAS, config.CACHE_MAX_BYTES, config.CACHE_TTL)
+
+
+def invalidar(*tablas):
+    """Llamar después del commit de cualquier escritura sobre esas tablas."""
+    versiones.incrementar(tablas)
+
+
+def invalidar_fichas(*codigos):
+    """Ficha de uno o varios computadores; sin códigos, todas (p. ej. tras una importación)."""
+    versiones.incrementar([f"ficha:{c}" for c in codigos if c] if codigos else ["fichas"])
+
+
+def tablas_ficha(codigo: str) -> tuple:
+    # Los cambios de un trabajador se reflejan en las fichas de sus equipos
+    return (f"ficha:{codigo}", "fichas", "trabajadores")
+
+
+def calcular_etag(ruta: str, query: bytes, tablas) -> str:
+    base = f"{ruta}?{query.decode('latin-1')}|{versiones.leer(tablas)}"
+    return 'W/"' + hashlib.sha1(base.encode()).hexdigest()[:20] + '"'
+
+
+def coincide_etag(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    # La comparación débil ignora el prefijo W/
+    return "*" in candidatos or etag[2:] in [c[2:] if c.startswith("W/") else c for c in candidatos]
+
+
+class CacheHTTPMiddleware:
+    """Middleware ASGI: responde 304 / desde el LRU sin tocar la base de datos."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        tablas = RUTAS_CACHEADAS.get(scope["path"])
+        if tablas is None:
+            return await self.app(scope, receive, send)
+
+        etag = calcular_etag(scope["path"], scope.get("query_string", b""), tablas)
+        headers_cache = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+        headers = dict(scope["headers"])
+
+        if coincide_etag(headers.get(b"if-none-match", b"").decode("latin-1"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers_cache})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        clave = (scope["path"], scope.get("query_string", b""), etag)
+        guardado = respuestas.obtener(clave)
+        if guardado is not None:
+            cuerpo, headers_respuesta = guardado
+            await send({"type": "http.response.start", "status": 200, "headers": headers_respuesta})
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        estado = {}
+        partes = []
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                estado["status"] = message["status"]
+                if message["status"] == 200:
+                    message["headers"] = [
+                        (k, v) for k, v in message.get("headers", []) if k.lower() not in (b"etag", b"cache-control")
+                    ] + headers_cache
+                    estado["headers"] = message["headers"]
+            elif message["type"] == "http.response.body" and estado.get("status") == 200:
+                partes.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    respuestas.guardar(clave, b"".join(partes), estado["headers"])
+            await send(message)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,191 @@
+import os
+import tempfile
+
+# ⚙️ Configuración leída de variables de entorno (con valores por defecto)
+
+
+def _bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+def _int(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    return int(valor) if valor else defecto
+
+
+# ======== BASE DE DATOS ========
+
+# Las credenciales de MySQL solo llegan por el entorno (Railway define DATABASE_URL);
+# sin la variable se usa una base SQLite local para desarrollo
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "local.db"),
+)
+# Si no se define, se deriva de DATABASE_URL cambiando el driver (aiomysql / aiosqlite)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# Handlers async con sesión asíncrona (aiomysql / aiosqlite) en lugar del threadpool
+MODO_ASYNC = _bool("MODO_ASYNC", False)
+
+DB_POOL_SIZE = _int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _int("DB_POOL_TIMEOUT", 30)
+# El proxy de Railway corta sockets inactivos: se reciclan antes de que eso pase
+DB_POOL_RECYCLE = _int("DB_POOL_RECYCLE", 280)
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", True)
+DB_ECHO = _bool("DB_ECHO", False)
+# Conexiones que se abren en segundo plano al arrancar, antes de la primera petición
+DB_POOL_CALENTAR = _int("DB_POOL_CALENTAR", 2)
+# Base local (SQLite): tablas y usuario admin al arrancar. Con MySQL el esquema es
+# de Alembic y el admin se crea una vez con `python inicializar.py admin`
+ARRANQUE_LOCAL = _bool("ARRANQUE_LOCAL", DATABASE_URL.startswith("sqlite"))
+
+
+# ======== FOTOS ========
+
+FOTOS_DIR = os.getenv("FOTOS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fotos"))
+FOTOS_URL_BASE = os.getenv("FOTOS_URL_BASE", "http://192.168.1.233:8000/fotos/")
+FOTOS_TAMANO_MAXIMO = _int("FOTOS_TAMANO_MAXIMO", 10 * 1024 * 1024)
+# Segundos que una foto sin referencias se conserva (puede estar recién subida)
+FOTOS_GRACIA = _int("FOTOS_GRACIA", 3600)
+# Con nginx delante: prefijo de la location `internal` que apunta a fotos/
+# (X-Accel-Redirect, nginx envía el archivo con sendfile). Vacío = lo sirve la app
+FOTOS_X_ACCEL = os.getenv("FOTOS_X_ACCEL", "")
+# Cada cuánto recorre el almacén el recolector de fotos huérfanas (0 = solo a pedido)
+FOTOS_GC_INTERVALO = _int("FOTOS_GC_INTERVALO", 24 * 3600)
+
+
+# ======== CACHE HTTP ========
+
+CACHE_HTTP = _bool("CACHE_HTTP", True)
+# "memoria" (un solo worker) o "archivo" (versiones compartidas entre workers)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_ARCHIVO = os.getenv("CACHE_ARCHIVO", os.path.join(tempfile.gettempdir(), "1a_cache_versiones.db"))
+CACHE_TTL = _int("CACHE_TTL", 300)
+CACHE_MAX_ENTRADAS = _int("CACHE_MAX_ENTRADAS", 256)
+CACHE_MAX_BYTES = _int("CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+
+# ======== SERIALIZACIÓN ========
+
+# Clase de respuesta por defecto con orjson (si está instalado) en lugar de json.dumps
+JSON_RAPIDO = _bool("JSON_RAPIDO", False)
+
+
+# ======== IMPORTACIÓN MASIVA ========
+
+IMPORT_CHUNK = _int("IMPORT_CHUNK", 1000)
+IMPORT_MAX_ERRORES = _int("IMPORT_MAX_ERRORES", 1000)
+
+
+# ======== EXPORTACIÓN ========
+
+EXPORT_YIELD_PER = _int("EXPORT_YIELD_PER", 1000)
+
+
+# ======== CONTRASEÑAS ========
+
+# "scrypt" (hashlib, sin dependencias) o "argon2" (requiere argon2-cffi)
+PASSWORD_ALGORITMO = os.getenv("PASSWORD_ALGORITMO", "scrypt")
+SCRYPT_N = _int("SCRYPT_N", 2 ** 14)
+SCRYPT_R = _int("SCRYPT_R", 8)
+SCRYPT_P = _int("SCRYPT_P", 1)
+ARGON2_TIME_COST = _int("ARGON2_TIME_COST", 3)
+ARGON2_MEMORY_COST = _int("ARGON2_MEMORY_COST", 64 * 1024)
+ARGON2_PARALLELISM = _int("ARGON2_PARALLELISM", 1)
+# Hilos dedicados al KDF: limita cuánta CPU puede acaparar el login
+PASSWORD_WORKERS = _int("PASSWORD_WORKERS", 2)
+# Segundos que se recuerda un login ya verificado (0 lo desactiva)
+LOGIN_CACHE_TTL = _int("LOGIN_CACHE_TTL", 300)
+LOGIN_CACHE_MAX = _int("LOGIN_CACHE_MAX", 1024)
+
+
+# ======== SESIONES (TOKENS) ========
+
+# Debe ser la misma en todos los workers; sin ella se genera una por proceso
+TOKEN_SECRET = os.getenv("TOKEN_SECRET")
+ACCESS_TOKEN_TTL = _int("ACCESS_TOKEN_TTL", 15 * 60)
+REFRESH_TOKEN_TTL = _int("REFRESH_TOKEN_TTL", 7 * 24 * 3600)
+# Lista de revocación en memoria (logout / rotación del refresh token)
+TOKEN_REVOCACION = _bool("TOKEN_REVOCACION", True)
+
+
+# ======== ESTADÍSTICAS ========
+
+# Cada cuánto se recalculan los contadores desde la base (0 = nunca en segundo plano)
+STATS_RECONCILIAR = _int("STATS_RECONCILIAR", 300)
+
+
+# ======== BÚSQUEDA ========
+
+# Instantánea del índice generada offline (python busqueda.py reconstruir)
+BUSQUEDA_SNAPSHOT = os.getenv("BUSQUEDA_SNAPSHOT", os.path.join(tempfile.gettempdir(), "1a_busqueda.json"))
+BUSQUEDA_LIMITE = _int("BUSQUEDA_LIMITE", 20)
+# Cada cuántos segundos cada worker trae al índice lo que escribieron los demás (0 = nunca)
+BUSQUEDA_SINCRONIZAR = _int("BUSQUEDA_SINCRONIZAR", 5)
+
+
+# ======== MANTENIMIENTOS POR LOTES ========
+
+MANTENIMIENTOS_LOTE_MAX = _int("MANTENIMIENTOS_LOTE_MAX", 1000)
+# Tope de filas que puede generar una programación recurrente
+MANTENIMIENTOS_PROGRAMA_MAX = _int("MANTENIMIENTOS_PROGRAMA_MAX", 20000)
+
+
+# ======== MÉTRICAS ========
+
+# Histograma por ruta, Server-Timing y /metrics (Prometheus)
+METRICAS = _bool("METRICAS", True)
+# Sentencias SQL a partir de las cuales se registra un aviso
+CONSULTA_LENTA_MS = _int("CONSULTA_LENTA_MS", 200)
+# Perfilador por muestreo: solo para diagnosticar, vuelca pilas "folded"
+PERFILADOR = _bool("PERFILADOR", False)
+PERFILADOR_UMBRAL_MS = _int("PERFILADOR_UMBRAL_MS", 500)
+PERFILADOR_INTERVALO_MS = _int("PERFILADOR_INTERVALO_MS", 5)
+PERFILADOR_DIR = os.getenv("PERFILADOR_DIR", os.path.join(tempfile.gettempdir(), "1a_perfiles"))
+
+
+# ======== TAREAS EN SEGUNDO PLANO ========
+
+# Workers dentro del proceso web (con TAREAS=0 se corre aparte: python tareas.py)
+TAREAS = _bool("TAREAS", True)
+TAREAS_WORKERS = _int("TAREAS_WORKERS", 2)
+# Segundos entre sondeos cuando nadie avisa (otras instancias, reintentos)
+TAREAS_INTERVALO = _int("TAREAS_INTERVALO", 2)
+TAREAS_MAX_INTENTOS = _int("TAREAS_MAX_INTENTOS", 5)
+# Base del backoff exponencial entre reintentos, en segundos
+TAREAS_REINTENTO = _int("TAREAS_REINTENTO", 10)
+# Cada cuántos segundos el worker renueva `actualizada` de la tarea que ejecuta
+TAREAS_LATIDO = _int("TAREAS_LATIDO", 30)
+# Una tarea "en_curso" sin latido en este tiempo se da por abandonada (worker caído)
+TAREAS_TIMEOUT = _int("TAREAS_TIMEOUT", 120)
+# Las terminadas se borran pasado este tiempo
+TAREAS_RETENCION = _int("TAREAS_RETENCION", 7 * 24 * 3600)
+# A partir de cuántas filas dependientes un borrado se hace en segundo plano
+TAREAS_CASCADA_MIN = _int("TAREAS_CASCADA_MIN", 500)
+# Filas por transacción en los borrados por lotes
+TAREAS_LOTE = _int("TAREAS_LOTE", 1000)
+
+
+# ======== FLUJO DE CAMBIOS (SSE) ========
+
+EVENTOS = _bool("EVENTOS", True)
+# "memoria" (un solo worker) o "archivo" (eventos compartidos entre workers)
+EVENTOS_BACKEND = os.getenv("EVENTOS_BACKEND", "memoria")
+EVENTOS_ARCHIVO = os.getenv("EVENTOS_ARCHIVO", os.path.join(tempfile.gettempdir(), "1a_eventos.db"))
+# Eventos que se guardan para reanudar; un cliente más atrasado recibe "recargar"
+EVENTOS_MAXIMO = _int("EVENTOS_MAXIMO", 10000)
+# Una escritura que toca más filas que esto publica un solo "recargar"
+EVENTOS_MAX_CLAVES = _int("EVENTOS_MAX_CLAVES", 500)
+# Segundos entre revisiones sin aviso local (eventos de otros workers)
+EVENTOS_INTERVALO = _int("EVENTOS_INTERVALO", 2)
+EVENTOS_PING = _int("EVENTOS_PING", 15)
+EVENTOS_RETRY_MS = _int("EVENTOS_RETRY_MS", 3000)
+
+
+# ======== SINCRONIZACIÓN INCREMENTAL (?since=) ========
+
+# Segundos que se conservan las lápidas de filas borradas; desde antes, 410 y resincronizar
+SYNC_RETENCION = _int("SYNC_RETENCION", 30 * 24 * 3600)
@@ -0,0 +1,68 @@
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Query, contains_eager, joinedload, selectinload
+from models import Computador, Mantenimiento, PermisoSalida, Trabajador
+
+# 🧭 Estrategias de carga por endpoint / modelo de respuesta
+#
+# Las relaciones de models.py son perezosas (lazy="select"); aquí se declara
+# qué necesita cada response_model para serializar sin consultas por fila.
+# benchmarks/contar_consultas.py verifica que el número de consultas no crezca
+# con el número de filas.
+
+
+def computadores_out(query: Query) -> Query:
+    """ComputadorOut -> trabajador. Muchos-a-uno: un JOIN no duplica filas."""
+    return query.options(joinedload(Computador.trabajador))
+
+
+def mantenimientos_out(query: Query) -> Query:
+    """MantenimientoOut -> computador -> trabajador en una sola consulta.
+
+    Ambos saltos son muchos-a-uno, así que el JOIN explícito + contains_eager
+    devuelve exactamente una fila por mantenimiento.
+    """
+    return query.join(Mantenimiento.computador).outerjoin(Computador.trabajador).options(
+        contains_eager(Mantenimiento.computador).contains_eager(Computador.trabajador)
+    )
+
+
+def permisos_out(query: Query) -> Query:
+    """PermisoSalidaOut -> trabajador + computador -> trabajador.
+
+    El trabajador del permiso llega por el mismo JOIN que usan los filtros por
+    nombre/apellido; los computadores (y sus responsables) se piden aparte con
+    selectinload, una vez por equipo distinto en lugar de repetirlos en cada fila.
+    """
+    return query.join(PermisoSalida.trabajador).options(
+        contains_eager(PermisoSalida.trabajador),
+        selectinload(PermisoSalida.computador).selectinload(Computador.trabajador),
+    )
+
+
+# ======== RESÚMENES (?resumen=true) ========
+#
+# Tuplas de columnas en lugar de entidades: sin identity map ni objetos
+# anidados. Las filas van directo a respuestas.RespuestaRapida.
+
+
+def mantenimientos_resumen() -> Select:
+    """MantenimientoResumen: el mantenimiento + el nombre de su computador."""
+    return select(
+        Mantenimiento.id, Mantenimiento.computador_id, Mantenimiento.fecha, Mantenimiento.hora,
+        Mantenimiento.tipo, Mantenimiento.observaciones, Mantenimiento.estado, Mantenimiento.version,
+        Computador.nombre.label("computador_nombre"),
+    ).join(Mantenimiento.computador)
+
+
+def permisos_resumen() -> Select:
+    """PermisoResumen: el permiso + nombres del computador y del trabajador.
+
+    Trabajador va en el mismo JOIN que usan los filtros por nombre/apellido.
+    """
+    return select(
+        PermisoSalida.id, PermisoSalida.codigo_computador, PermisoSalida.cedula_trabajador,
+        PermisoSalida.estado, PermisoSalida.version,
+        Computador.nombre.label("computador_nombre"),
+        Trabajador.nombre.label("trabajador_nombre"),
+        Trabajador.apellidos.label("trabajador_apellidos"),
+    ).join(PermisoSalida.trabajador).join(PermisoSalida.computador)
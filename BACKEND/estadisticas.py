@@ -0,0 +1,153 @@
+import copy
+import enum
+import logging
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import func
+
+import config
+from database import SessionLocal
+from models import Computador, Mantenimiento, PermisoSalida
+
+logger = logging.getLogger(__name__)
+
+# 📊 Contadores del tablero: se ajustan en cada escritura y se reconcilian periódicamente
+
+
+def _valor(dato):
+    return dato.value if isinstance(dato, enum.Enum) else dato
+
+
+class Contadores:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = None
+        self._sucio = True
+        self._actualizado = None
+
+    def reconciliar(self):
+        """Recalcula todo con unas pocas consultas GROUP BY."""
+        db = SessionLocal()
+        try:
+            datos = {
+                "computadores_por_marca": Counter(dict(
+                    db.query(Computador.marca, func.count()).group_by(Computador.marca).all()
+                )),
+                "computadores_sin_asignar": db.query(func.count()).select_from(Computador)
+                .filter(Computador.trabajador_id.is_(None)).scalar(),
+                "mantenimientos_por_estado": Counter({
+                    _valor(k): n for k, n in db.query(Mantenimiento.estado, func.count()).group_by(Mantenimiento.estado)
+                }),
+                "mantenimientos_por_tipo": Counter({
+                    _valor(k): n for k, n in db.query(Mantenimiento.tipo, func.count()).group_by(Mantenimiento.tipo)
+                }),
+                "permisos_por_estado": Counter({
+                    _valor(k): n for k, n in db.query(PermisoSalida.estado, func.count()).group_by(PermisoSalida.estado)
+                }),
+            }
+        finally:
+            db.close()
+
+        with self._lock:
+            self._datos = datos
+            self._sucio = False
+            self._actualizado = time.time()
+
+    def invalidar(self):
+        """Para escrituras cuyo efecto no se conoce (cascadas): se recalcula en la próxima lectura."""
+        with self._lock:
+            self._sucio = True
+
+    def ajustar(self, seccion: str, clave, delta: int = 1):
+        with self._lock:
+            if self._datos is None:
+                return
+            if seccion == "computadores_sin_asignar":
+                self._datos[seccion] += delta
+            else:
+                self._datos[seccion][_valor(clave)] += delta
+
+    def resumen(self) -> dict:
+        with self._lock:
+            pendiente = self._sucio or self._datos is None
+        if pendiente:
+            self.reconciliar()
+        with self._lock:
+            datos = copy.deepcopy(self._datos)
+            actualizado = self._actualizado
+
+        por_marca = {k: v for k, v in datos["computadores_por_marca"].items() if v > 0}
+        return {
+            "computadores_total": sum(por_marca.values()),
+            "computadores_por_marca": por_marca,
+            "computadores_sin_asignar": datos["computadores_sin_asignar"],
+            "mantenimientos_pendientes": datos["mantenimientos_por_estado"]["pendiente"],
+            "mantenimientos_hechos": datos["mantenimientos_por_estado"]["hecho"],
+            "mantenimientos_preventivos": datos["mantenimientos_por_tipo"]["preventivo"],
+            "mantenimientos_correctivos": datos["mantenimientos_por_tipo"]["correctivo"],
+            "permisos_activos": datos["permisos_por_estado"]["activo"],
+            "permisos_inactivos": datos["permisos_por_estado"]["inactivo"],
+            "actualizado": actualizado,
+        }
+
+
+contadores = Contadores()
+
+
+# ======== AJUSTES DESDE LOS ROUTERS ========
+
+def computador_creado(marca, trabajador_id):
+    contadores.ajustar("computadores_por_marca", marca, 1)
+    if trabajador_id is None:
+        contadores.ajustar("computadores_sin_asignar", None, 1)
+
+
+def computador_actualizado(antes: tuple, despues: tuple):
+    """antes / despues: (marca, trabajador_id)."""
+    if antes[0] != despues[0]:
+        contadores.ajustar("computadores_por_marca", antes[0], -1)
+        contadores.ajustar("computadores_por_marca", despues[0], 1)
+    if (antes[1] is None) != (despues[1] is None):
+        contadores.ajustar("computadores_sin_asignar", None, 1 if despues[1] is None else -1)
+
+
+def mantenimiento_cambiado(antes: tuple = None, despues: tuple = None):
+    """antes / despues: (tipo, estado); None si el registro no existía / ya no existe."""
+    for datos, delta in ((antes, -1), (despues, 1)):
+        if datos is not None:
+            contadores.ajustar("mantenimientos_por_tipo", datos[0], delta)
+            contadores.ajustar("mantenimientos_por_estado", datos[1], delta)
+
+
+def permiso_cambiado(antes=None, despues=None):
+    """antes / despues: estado del permiso; None si no existía / ya no existe."""
+    if antes is not None:
+        contadores.ajustar("permisos_por_estado", antes, -1)
+    if despues is not None:
+        contadores.ajustar("permisos_por_estado", despues, 1)
+
+
+# ======== RECONCILIACIÓN PERIÓDICA ========
+
+_detener = threading.Event()
+
+
+def _bucle_reconciliacion():
+    while not _detener.wait(config.STATS_RECONCILIAR):
+        try:
+            contadores.reconciliar()
+        except Exception:
+            logger.exception("Falló la reconciliación de estadísticas")
+
+
+def iniciar_reconciliacion():
+    if config.STATS_RECONCILIAR <= 0:
+        return
+    _detener.clear()
+    threading.Thread(target=_bucle_reconciliacion, name="reconciliar-stats", daemon=True).start()
+
+
+def detener_reconciliacion():
+    _detener.set()
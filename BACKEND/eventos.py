@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from starlette.concurrency import run_in_threadpool
+
+import config
+
+# 📡 Flujo de cambios: cada escritura publica un evento compacto
+#
+# {"v": versión, "entidad": "computadores", "clave": "PC-0001", "op": "actualizar"}
+#
+# Los clientes se suscriben por SSE (/eventos) y reanudan desde la última
+# versión vista; con eso actualizan una fila en lugar de volver a bajar el
+# listado. Las versiones crecen siempre: si el cliente pide una que ya no está
+# guardada (o de antes de un reinicio) recibe "recargar" y baja todo de nuevo.
+
+def _evento(version, entidad, clave, op) -> dict:
+    return {"v": version, "entidad": entidad, "clave": clave, "op": op}
+
+
+class EventosMemoria:
+    """Últimos eventos dentro del proceso (un solo worker)."""
+
+    def __init__(self, maximo: int):
+        self._eventos = deque(maxlen=maximo)
+        self._lock = threading.Lock()
+        # Arranca en el reloj (ms): un reinicio nunca reutiliza versiones ya entregadas
+        self._version = int(time.time() * 1000)
+
+    def agregar(self, cambios):
+        with self._lock:
+            for entidad, clave, op in cambios:
+                self._version += 1
+                self._eventos.append(_evento(self._version, entidad, clave, op))
+
+    def ultima(self) -> int:
+        with self._lock:
+            return self._version
+
+    def desde(self, version: int):
+        """(eventos posteriores a `version`, False si faltan algunos)."""
+        with self._lock:
+            primera = self._eventos[0]["v"] if self._eventos else self._version + 1
+            if version > self._version or version < primera - 1:
+                return [], False
+            # Las versiones son consecutivas: la posición sale de la resta
+            return list(itertools.islice(self._eventos, version - primera + 1, None)), True
+
+
+class EventosArchivo:
+    """Eventos en un archivo SQLite local que comparten todos los workers."""
+
+    def __init__(self, ruta: str, maximo: int):
+        self.ruta = ruta
+        self.maximo = maximo
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS eventos ("
+                "v INTEGER PRIMARY KEY AUTOINCREMENT, entidad TEXT NOT NULL, clave TEXT, op TEXT NOT NULL)"
+            )
+            # La primera versión también sale del reloj (ver EventosMemoria)
+            conn.execute(
+                "INSERT OR IGNORE INTO sqlite_sequence (name, seq) "
+                "SELECT 'eventos', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'eventos')",
+                (int(time.time() * 1000),),
+            )
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def agregar(self, cambios):
+        conn = self._conexion()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO eventos (entidad, clave, op) VALUES (?, ?, ?)", cambios)
+            conn.execute(
+                "DELETE FROM eventos WHERE v <= (SELECT seq FROM sqlite_sequence WHERE name = 'eventos') - ?",
+                (self.maximo,),
+            )
+
+    def ultima(self) -> int:
+        fila = self._conexion().execute("SELECT seq FROM sqlite_sequence WHERE name = 'eventos'").fetchone()
+        return fila[0] if fila else 0
+
+    def desde(self, version: int):
+        conn = self._conexion()
+        ultima = self.ultima()
+        if version == ultima:
+            return [], True
+        primera = conn.execute("SELECT MIN(v) FROM eventos").fetchone()[0] or ultima + 1
+        if version > ultima or version < primera - 1:
+            return [], False
+        filas = conn.execute(
+            "SELECT v, entidad, clave, op FROM eventos WHERE v > ? ORDER BY v", (version,)
+        ).fetchall()
+        return [_evento(*f) for f in filas], True
+
+
+if config.EVENTOS_BACKEND == "archivo":
+    registro = EventosArchivo(config.EVENTOS_ARCHIVO, config.EVENTOS_MAXIMO)
+else:
+    registro = EventosMemoria(config.EVENTOS_MAXIMO)
+
+
+# ======== SUSCRIPTORES ========
+
+_suscriptores = set()
+_suscriptores_lock = threading.Lock()
+
+
+def publicar(entidad: str, claves, op: str):
+    """Llamar después del commit; `claves` puede ser una o varias (None = toda la entidad)."""
+    if not config.EVENTOS:
+        return
+    if claves is None or isinstance(claves, (str, int)):
+        claves = [claves]
+    claves = [None if c is None else str(c) for c in claves]
+    if not claves:
+        return
+    if len(claves) > config.EVENTOS_MAX_CLAVES:
+        # Cambios masivos: un solo aviso, al cliente le sale más barato recargar
+        claves, op = [None], "recargar"
+    registro.agregar([(entidad, c, op) for c in claves])
+    _avisar()
+
+
+def _avisar():
+    # Se publica desde el threadpool: cada suscriptor se despierta en su event loop
+    with _suscriptores_lock:
+        pendientes = list(_suscriptores)
+    for loop, aviso in pendientes:
+        try:
+            loop.call_soon_threadsafe(aviso.set)
+        except RuntimeError:
+            pass  # loop cerrado
+
+
+async def _leer(funcion, *args):
+    # El backend "archivo" consulta SQLite y puede esperar hasta 5 s a un
+    # escritor: se lee en el threadpool para no frenar el event loop
+    if isinstance(registro, EventosArchivo):
+        return await run_in_threadpool(funcion, *args)
+    return funcion(*args)
+
+
+def formato_sse(evento: dict) -> str:
+    return f"id: {evento['v']}\nevent: cambio\ndata: {json.dumps(evento, separators=(',', ':'))}\n\n"
+
+
+async def flujo(desde, entidades, desconectado):
+    """Generador SSE: pendientes desde `desde` y luego los nuevos a medida que llegan.
+
+    `desconectado` es `request.is_disconnected`. Sin avisos locales (otros
+    workers con el backend "archivo") se revisa cada EVENTOS_INTERVALO.
+    """
+    loop = asyncio.get_running_loop()
+    aviso = asyncio.Event()
+    suscriptor = (loop, aviso)
+    with _suscriptores_lock:
+        _suscriptores.add(suscriptor)
+    try:
+        yield f"retry: {config.EVENTOS_RETRY_MS}\n\n"
+        version = await _leer(registro.ultima) if desde is None else desde
+        ultimo_envio = time.monotonic()
+        while True:
+            aviso.clear()
+            eventos, completos = await _leer(registro.desde, version)
+            if not completos:
+                # La versión del cliente ya no está: que recargue y siga desde la actual
+                version = await _leer(registro.ultima)
+                yield formato_sse(_evento(version, "*", None, "recargar"))
+                ultimo_envio = time.monotonic()
+                continue
+            for evento in eventos:
+                version = evento["v"]
+                if entidades is None or evento["entidad"] in entidades:
+                    yield formato_sse(evento)
+                    ultimo_envio = time.monotonic()
+            if time.monotonic() - ultimo_envio >= config.EVENTOS_PING:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                ultimo_envio = time.monotonic()
+            try:
+                await asyncio.wait_for(aviso.wait(), config.EVENTOS_INTERVALO)
+            except asyncio.TimeoutError:
+                pass
+            if await desconectado():
+                return
+    finally:
+        with _suscriptores_lock:
+            _suscriptores.discard(suscriptor)
+
@@ -0,0 +1,51 @@
+import sys
+
+from sqlalchemy.exc import IntegrityError
+
+from database import Base, SessionLocal, engine
+from models import RolEnum, Usuario
+from seguridad import hash_password
+
+# 🚀 Tareas de una sola vez por despliegue (fuera del arranque de cada worker)
+#
+#   alembic upgrade head          -> esquema
+#   python inicializar.py admin   -> usuario admin por defecto, si no existe
+#
+# Con una base local (config.ARRANQUE_LOCAL) main.py las hace al arrancar.
+
+
+def crear_tablas():
+    """Solo para bases locales / de prueba: en producción el esquema es de Alembic."""
+    Base.metadata.create_all(bind=engine)
+
+
+def crear_usuario_admin() -> bool:
+    """Crea el usuario admin por defecto; False si ya existía. Se puede repetir."""
+    db = SessionLocal()
+    try:
+        if db.query(Usuario.username).filter(Usuario.username == "admin").first():
+            return False
+        db.add(Usuario(
+            username="admin",
+            password=hash_password("admin"),  # 👈 Contraseña por defecto
+            rol=RolEnum.admin,
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otro proceso lo creó entre la consulta y el INSERT
+            db.rollback()
+            return False
+        return True
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["admin"]:
+        print("Uso: python inicializar.py admin")
+        sys.exit(1)
+    if crear_usuario_admin():
+        print("✅ Usuario 'admin' creado por defecto")
+    else:
+        print("ℹ️ Usuario 'admin' ya existe")
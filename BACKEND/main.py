@@ -1,13 +1,74 @@
+from contextlib import asynccontextmanager
+import logging
+import threading
 from fastapi import FastAPI
-from database import engine, SessionLocal
-from models import Base, Usuario, RolEnum
-from routers import computadores, usuarios, detalles, trabajador,asignar_usuarios,mantenimiento,permisos
+from database import engine, calentar
+from routers import computadores, usuarios, detalles, trabajador,asignar_usuarios,mantenimiento,permisos,importar,exportar,stats,buscar,fotos,eventos,tareas as rutas_tareas,metricas as rutas_metricas
+import estadisticas
+import busqueda
+import metricas
+import tareas
+import almacen_fotos
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
-import hashlib
+import config
+from cache_http import CacheHTTPMiddleware
+import inicializar
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from respuestas import RespuestaRapida
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def preparar(recolector: bool):
+    # En un hilo: primera conexión, mappers y lo que necesita ir a la base
+    calentar()
+    if recolector:
+        try:
+            almacen_fotos.iniciar_recolector()
+        except SQLAlchemyError:
+            logger.warning("No se pudo programar el recolector de fotos", exc_info=True)
+
+
+# 👇 Arranque y apagado de cada worker
+#
+# Importar este módulo no toca la base: el esquema es de Alembic y el usuario
+# admin se crea con `python inicializar.py admin` (salvo con una base local).
+# El pool se calienta en segundo plano, así que una base caída no impide que
+# el worker arranque y responda.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    os.makedirs(config.FOTOS_DIR, exist_ok=True)
+    if config.ARRANQUE_LOCAL:
+        inicializar.crear_tablas()
+        if inicializar.crear_usuario_admin():
+            print("✅ Usuario 'admin' creado por defecto")
+    recolector = bool(config.TAREAS and tareas.iniciar())
+    threading.Thread(target=preparar, args=(recolector,), name="arranque", daemon=True).start()
+    estadisticas.iniciar_reconciliacion()
+    busqueda.iniciar()
+    if metricas.perfilador is not None:
+        metricas.perfilador.iniciar()
+    yield
+    estadisticas.detener_reconciliacion()
+    busqueda.detener_sincronizacion()
+    tareas.detener()
+    if metricas.perfilador is not None:
+        metricas.perfilador.detener()
+
+
+# Con JSON_RAPIDO todas las respuestas se serializan con orjson (si está instalado)
+app = FastAPI(
+    default_response_class=RespuestaRapida if config.JSON_RAPIDO else JSONResponse,
+    lifespan=lifespan,
+)
+
+# Cache HTTP (ETag + 304) para los listados que el front consulta a menudo.
+# Se registra antes que CORS: el último en agregarse queda por fuera, así las
+# respuestas del cache (304 y aciertos del LRU) también llevan las cabeceras CORS
+if config.CACHE_HTTP:
+    app.add_middleware(CacheHTTPMiddleware)
 
 # Middleware CORS
 app.add_middleware(
@@ -18,13 +79,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Crear tablas en la base de datos
-Base.metadata.create_all(bind=engine)
-
-# Crear carpeta 'fotos' si no existe
-ruta_fotos = os.path.join(os.path.dirname(__file__), "fotos")
-os.makedirs(ruta_fotos, exist_ok=True)
-app.mount("/fotos", StaticFiles(directory=ruta_fotos), name="fotos")
+# Métricas por ruta + Server-Timing (por fuera del cache para medir también los 304)
+if config.METRICAS:
+    metricas.instrumentar_engine(engine)
+    app.add_middleware(metricas.MetricasMiddleware)
 
 # Registrar routers
 app.include_router(computadores.router)
@@ -34,6 +92,15 @@ app.include_router(trabajador.router)
 app.include_router(asignar_usuarios.router)
 app.include_router(mantenimiento.router)
 app.include_router(permisos.router)
+app.include_router(importar.router)
+app.include_router(exportar.router)
+app.include_router(stats.router)
+app.include_router(buscar.router)
+app.include_router(fotos.router)
+app.include_router(eventos.router)
+app.include_router(rutas_tareas.router)
+if config.METRICAS:
+    app.include_router(rutas_metricas.router)
 
 
 
@@ -41,31 +108,3 @@ app.include_router(permisos.router)
 @app.get("/")
 def root():
     return {"mensaje": "Servidor FastAPI activo"}
-
-# ======== USUARIO PREDETERMINADO ========
-
-def hash_password(password: str):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def crear_usuario_admin():
-    db = SessionLocal()
-    try:
-        existe = db.query(Usuario).filter(Usuario.username == "admin").first()
-        if not existe:
-            admin = Usuario(
-                username="admin",
-                password=hash_password("admin"),  # 👈 Contraseña por defecto
-                rol=RolEnum.admin  # Mejor usar el Enum directamente
-            )
-            db.add(admin)
-            db.commit()
-            print("✅ Usuario 'admin' creado por defecto")
-        else:
-            print("ℹ️ Usuario 'admin' ya existe")
-    finally:
-        db.close()
-
-# 👇 Ejecutar solo al iniciar el servidor
-@app.on_event("startup")
-def on_startup():
-    crear_usuario_admin()
@@ -0,0 +1,307 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+import cache_http
+import config
+
+logger = logging.getLogger(__name__)
+
+# 📈 Instrumentación: latencia por ruta, consultas SQL por petición,
+# cabecera Server-Timing, /metrics en formato Prometheus y perfilador opcional.
+#
+# Las métricas son por proceso: con varios workers cada uno expone las suyas.
+
+# Límites (segundos) de los histogramas de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MedicionPeticion:
+    """Lo que se acumula durante una petición (se comparte con el threadpool vía ContextVar)."""
+
+    __slots__ = ("ruta", "inicio", "consultas", "tiempo_sql", "mas_lenta", "sql_mas_lenta")
+
+    def __init__(self):
+        self.ruta = None
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.mas_lenta = 0.0
+        self.sql_mas_lenta = None
+
+
+_actual: ContextVar = ContextVar("medicion_peticion", default=None)
+
+
+class Histograma:
+    def __init__(self):
+        self.cubetas = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor: float):
+        self.suma += valor
+        self.cuenta += 1
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.cubetas[i] += 1
+                break
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}        # (metodo, ruta) -> Histograma
+        self.respuestas = Counter()  # (metodo, ruta, codigo) -> total
+        self.consultas = Counter()   # ruta -> sentencias SQL
+        self.tiempo_sql = Counter()  # ruta -> segundos en la base
+        self.consultas_lentas = 0
+
+    def registrar(self, metodo: str, ruta: str, codigo: int, duracion: float, medicion: MedicionPeticion):
+        with self._lock:
+            histograma = self.latencias.get((metodo, ruta))
+            if histograma is None:
+                histograma = self.latencias[(metodo, ruta)] = Histograma()
+            histograma.observar(duracion)
+            self.respuestas[(metodo, ruta, codigo)] += 1
+            self.consultas[ruta] += medicion.consultas
+            self.tiempo_sql[ruta] += medicion.tiempo_sql
+
+    def prometheus(self) -> str:
+        lineas = []
+        with self._lock:
+            lineas += [
+                "# HELP http_peticion_segundos Latencia de las peticiones por ruta",
+                "# TYPE http_peticion_segundos histogram",
+            ]
+            for (metodo, ruta), h in sorted(self.latencias.items()):
+                etiquetas = f'metodo="{metodo}",ruta="{_escapar(ruta)}"'
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS, h.cubetas):
+                    acumulado += cantidad
+                    lineas.append(f'http_peticion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f'http_peticion_segundos_bucket{{{etiquetas},le="+Inf"}} {h.cuenta}')
+                lineas.append(f"http_peticion_segundos_sum{{{etiquetas}}} {h.suma:.6f}")
+                lineas.append(f"http_peticion_segundos_count{{{etiquetas}}} {h.cuenta}")
+
+            lineas += ["# HELP http_respuestas_total Respuestas por ruta y código", "# TYPE http_respuestas_total counter"]
+            for (metodo, ruta, codigo), total in sorted(self.respuestas.items()):
+                lineas.append(f'http_respuestas_total{{metodo="{metodo}",ruta="{_escapar(ruta)}",codigo="{codigo}"}} {total}')
+
+            lineas += ["# HELP db_consultas_total Sentencias SQL por ruta", "# TYPE db_consultas_total counter"]
+            for ruta, total in sorted(self.consultas.items()):
+                lineas.append(f'db_consultas_total{{ruta="{_escapar(ruta)}"}} {total}')
+
+            lineas += ["# HELP db_segundos_total Tiempo en la base por ruta", "# TYPE db_segundos_total counter"]
+            for ruta, total in sorted(self.tiempo_sql.items()):
+                lineas.append(f'db_segundos_total{{ruta="{_escapar(ruta)}"}} {total:.6f}')
+
+            lineas += [
+                f"# HELP db_consultas_lentas_total Sentencias por encima de {config.CONSULTA_LENTA_MS} ms",
+                "# TYPE db_consultas_lentas_total counter",
+                f"db_consultas_lentas_total {self.consultas_lentas}",
+            ]
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = Registro()
+
+
+# ======== SQLALCHEMY ========
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.consultas += 1
+        medicion.tiempo_sql += duracion
+        if duracion > medicion.mas_lenta:
+            medicion.mas_lenta = duracion
+            medicion.sql_mas_lenta = statement
+    if duracion * 1000 >= config.CONSULTA_LENTA_MS:
+        with registro._lock:
+            registro.consultas_lentas += 1
+        ruta = medicion.ruta if medicion is not None else "-"
+        logger.warning("Consulta lenta (%.1f ms) en %s: %s", duracion * 1000, ruta, " ".join(statement.split())[:500])
+
+
+def instrumentar_engine(engine):
+    """Engancha los contadores SQL a un engine (síncrono, o el .sync_engine de uno async)."""
+    if not event.contains(engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+def estado_pool(engine) -> dict:
+    """Uso del pool; los pools de SQLite (StaticPool / NullPool) no llevan estas cuentas."""
+    pool = engine.pool
+    datos = {}
+    for nombre, metodo in (("tamano", "size"), ("en_uso", "checkedout"), ("libres", "checkedin"), ("overflow", "overflow")):
+        funcion = getattr(pool, metodo, None)
+        if funcion is not None:
+            datos[nombre] = funcion()
+    return datos
+
+
+def prometheus_pool(engines: dict) -> str:
+    """engines: etiqueta -> engine (el síncrono y, si está creado, el asíncrono)."""
+    estados = {etiqueta: estado_pool(engine) for etiqueta, engine in engines.items()}
+    lineas = []
+    for nombre in ("tamano", "en_uso", "libres", "overflow"):
+        valores = [(etiqueta, estado[nombre]) for etiqueta, estado in estados.items() if nombre in estado]
+        if valores:
+            lineas.append(f"# TYPE db_pool_{nombre} gauge")
+            lineas += [f'db_pool_{nombre}{{engine="{etiqueta}"}} {valor}' for etiqueta, valor in valores]
+    return "\n".join(lineas) + ("\n" if lineas else "")
+
+
+# ======== PERFILADOR POR MUESTREO ========
+
+# Hojas de pila de hilos ociosos (workers de los pools esperando, selector del event loop)
+_FUNCIONES_OCIOSAS = {"wait", "select", "poll", "_worker"}
+
+
+class Perfilador:
+    """Muestrea las pilas de todos los hilos mientras hay peticiones en curso.
+
+    Las peticiones que superan el umbral se vuelcan en formato "folded"
+    (una pila por línea + número de muestras), el que aceptan flamegraph.pl
+    y speedscope. Con peticiones concurrentes las muestras se mezclan: está
+    pensado para diagnosticar, no para dejarlo siempre encendido.
+    """
+
+    def __init__(self, intervalo: float, umbral: float, directorio: str):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.directorio = directorio
+        self._muestras = deque(maxlen=50_000)  # (instante, pila)
+        self._en_curso = 0
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        if self._hilo is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._hilo = threading.Thread(target=self._bucle, name="perfilador", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            if not self._en_curso:
+                continue
+            ahora = time.perf_counter()
+            for hilo, frame in sys._current_frames().items():
+                if hilo == propio or frame.f_code.co_name in _FUNCIONES_OCIOSAS:
+                    continue
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    frame = frame.f_back
+                self._muestras.append((ahora, ";".join(reversed(pila))))
+
+    def entrar(self):
+        with self._lock:
+            self._en_curso += 1
+
+    def salir(self, metodo: str, ruta: str, inicio: float, fin: float):
+        with self._lock:
+            self._en_curso -= 1
+        if fin - inicio < self.umbral:
+            return
+        pilas = Counter(pila for instante, pila in list(self._muestras) if inicio <= instante <= fin)
+        if not pilas:
+            return
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}_{metodo}_{ruta.strip('/').replace('/', '_') or 'raiz'}_{int((fin - inicio) * 1000)}ms.folded"
+        ruta_archivo = os.path.join(self.directorio, nombre)
+        with open(ruta_archivo, "w", encoding="utf-8") as archivo:
+            for pila, cantidad in pilas.most_common():
+                archivo.write(f"{pila} {cantidad}\n")
+        logger.warning("Petición lenta %s %s (%.0f ms): perfil en %s", metodo, ruta, (fin - inicio) * 1000, ruta_archivo)
+
+
+perfilador = None
+if config.PERFILADOR:
+    perfilador = Perfilador(
+        config.PERFILADOR_INTERVALO_MS / 1000, config.PERFILADOR_UMBRAL_MS / 1000, config.PERFILADOR_DIR
+    )
+
+
+# ======== MIDDLEWARE ========
+
+def nombre_ruta(scope) -> str:
+    """Plantilla de la ruta (/computadores/{codigo}) para no disparar la cardinalidad."""
+    ruta = scope.get("route")
+    if ruta is not None:
+        return getattr(ruta, "path", scope["path"])
+    if scope.get("root_path") and scope["root_path"] != scope.get("app_root_path", ""):
+        return scope["root_path"] + "/*"  # montajes: /fotos/*
+    if scope["path"] in cache_http.RUTAS_CACHEADAS:
+        return scope["path"]  # respondida por el cache antes del router
+    return "sin_ruta"
+
+
+class MetricasMiddleware:
+    """Middleware ASGI: histograma por ruta + cabecera Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicion = MedicionPeticion()
+        medicion.ruta = scope["path"]
+        token = _actual.set(medicion)
+        estado = {"codigo": 500}
+        if perfilador is not None:
+            perfilador.entrar()
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                estado["codigo"] = message["status"]
+                total = (time.perf_counter() - medicion.inicio) * 1000
+                sql = medicion.tiempo_sql * 1000
+                server_timing = (
+                    f'db;dur={sql:.1f};desc="{medicion.consultas} consultas", '
+                    f"db-max;dur={medicion.mas_lenta * 1000:.1f}, "
+                    f"app;dur={max(total - sql, 0):.1f}, total;dur={total:.1f}"
+                )
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", server_timing.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            fin = time.perf_counter()
+            medicion.ruta = nombre_ruta(scope)
+            registro.registrar(scope["method"], medicion.ruta, estado["codigo"], fin - medicion.inicio, medicion)
+            if medicion.tiempo_sql * 1000 >= config.CONSULTA_LENTA_MS:
+                logger.info(
+                    "%s %s: %s consultas, %.1f ms en la base; la más lenta (%.1f ms): %s",
+                    scope["method"], medicion.ruta, medicion.consultas, medicion.tiempo_sql * 1000,
+                    medicion.mas_lenta * 1000, " ".join((medicion.sql_mas_lenta or "").split())[:300],
+                )
+            if perfilador is not None:
+                perfilador.salir(scope["method"], medicion.ruta, medicion.inicio, fin)
+            _actual.reset(token)
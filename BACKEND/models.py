@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Enum, Integer, ForeignKey,Date,Time,Text # ✅ Agrega Enum aquí
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Enum, Integer, ForeignKey,Date,Time,Text,Index,DateTime,BigInteger # ✅ Agrega Enum aquí
+from sqlalchemy.orm import relationship, backref
 from database import Base
 import enum
 
@@ -13,7 +13,7 @@ class Usuario(Base):
     __tablename__ = "usuarios"
 
     username = Column(String(50), primary_key=True, index=True)
-    password = Column(String(100), nullable=False)
+    password = Column(String(255), nullable=False)  # scrypt / argon2 con sal
     rol = Column(Enum(RolEnum), nullable=False)  # ✅ Usa Enum de SQLAlchemy
 
 
@@ -30,6 +30,15 @@ class Trabajador(Base):
     telefono = Column(String(50), nullable=False)
     correo = Column(String(150), nullable=False)
     foto = Column(String(255), nullable=True)
+    # Versión de la última escritura (versionado.py): ?since= en el listado
+    version = Column(BigInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        # Búsquedas de permisos por nombre / apellidos del trabajador
+        Index("ix_trabajadores_nombre_apellidos", "nombre", "apellidos"),
+        Index("ix_trabajadores_apellidos", "apellidos"),
+        Index("ix_trabajadores_version", "version"),
+    )
 
 # Modelo de computador
 class Computador(Base):
@@ -41,6 +50,15 @@ class Computador(Base):
     trabajador_id = Column(String(20), ForeignKey("trabajadores.cedula", ondelete="SET NULL"), nullable=True)
     foto = Column(String(255), nullable=True)  # Ruta o URL de la imagen
     trabajador = relationship("Trabajador", backref="computadores")
+    version = Column(BigInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        # Filtros de GET /computadores/ + orden por código (cursor)
+        Index("ix_computadores_marca_codigo", "marca", "codigo"),
+        Index("ix_computadores_trabajador_codigo", "trabajador_id", "codigo"),
+        Index("ix_computadores_nombre", "nombre"),
+        Index("ix_computadores_version", "version"),
+    )
 
 # Modelo detalles
 class Detalle(Base):
@@ -54,6 +72,12 @@ class Detalle(Base):
     sistema_operativo = Column(String(100), nullable=False)
     observaciones = Column(String(255), nullable=True)
     serial = Column(String(100), nullable=True)  # en la clase Detalle
+    version = Column(BigInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("ix_detalle_codigo_computador", "codigo_computador"),
+        Index("ix_detalle_version", "version"),
+    )
 
 
 
@@ -73,6 +97,13 @@ class AsignarUsuario(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     usuario_id = Column(String(50), ForeignKey("usuarios.username", ondelete="CASCADE"))
     trabajador_id = Column(String(20), ForeignKey("trabajadores.cedula", ondelete="CASCADE"))
+    version = Column(BigInteger, nullable=False, default=1)
+
+    __table_args__ = (
+        # Cubre el perfil del header: usuario -> trabajador sin leer la fila
+        Index("ix_asignar_usuario_usuario_trabajador", "usuario_id", "trabajador_id"),
+        Index("ix_asignar_usuario_version", "version"),
+    )
 
 # RELACIONES ENTRE MODELOS
 Usuario.asignaciones = relationship("AsignarUsuario", back_populates="usuario")
@@ -100,8 +131,23 @@ class Mantenimiento(Base):
     tipo = Column(Enum(TipoMantenimientoEnum), nullable=False)
     observaciones = Column(Text, nullable=True)
     estado = Column(Enum(EstadoMantenimientoEnum), nullable=False)
+    version = Column(BigInteger, nullable=False, default=1)
+
+    # Sin carga ansiosa por defecto: cada endpoint elige su estrategia en consultas.py
+    computador = relationship(
+        "Computador",
+        backref=backref("mantenimientos", cascade="all, delete", passive_deletes=True),
+    )
 
-    computador = relationship("Computador", backref="mantenimientos", lazy="joined")
+    __table_args__ = (
+        # listar_mantenimientos: rango de fecha + tipo/estado, orden fecha desc
+        Index("ix_mantenimientos_fecha", "fecha"),
+        Index("ix_mantenimientos_estado_fecha", "estado", "fecha"),
+        Index("ix_mantenimientos_tipo_fecha", "tipo", "fecha"),
+        Index("ix_mantenimientos_tipo_estado_fecha", "tipo", "estado", "fecha"),
+        Index("ix_mantenimientos_computador_fecha", "computador_id", "fecha"),
+        Index("ix_mantenimientos_version", "version"),
+    )
 
 
 class EstadoPermisoEnum(enum.Enum):
@@ -115,7 +161,88 @@ class PermisoSalida(Base):
     codigo_computador = Column(String(50), ForeignKey("computadores.codigo", ondelete="CASCADE"), nullable=False)
     cedula_trabajador = Column(String(20), ForeignKey("trabajadores.cedula", ondelete="CASCADE"), nullable=False)
     estado = Column(Enum(EstadoPermisoEnum), nullable=False)
+    version = Column(BigInteger, nullable=False, default=1)
 
     # Relaciones
-    computador = relationship("Computador", backref="permisos", lazy="joined")
-    trabajador = relationship("Trabajador", backref="permisos", lazy="joined")
+    computador = relationship(
+        "Computador",
+        backref=backref("permisos", cascade="all, delete", passive_deletes=True),
+    )
+    trabajador = relationship(
+        "Trabajador",
+        backref=backref("permisos", cascade="all, delete", passive_deletes=True),
+    )
+
+    __table_args__ = (
+        # listar_permisos: filtro por estado, orden id desc
+        Index("ix_permisos_estado_id", "estado", "id"),
+        Index("ix_permisos_cedula_estado", "cedula_trabajador", "estado"),
+        Index("ix_permisos_computador_estado", "codigo_computador", "estado"),
+        Index("ix_permisos_version", "version"),
+    )
+
+
+# Cola de tareas en segundo plano (tareas.py)
+class EstadoTareaEnum(enum.Enum):
+    pendiente = "pendiente"
+    en_curso = "en_curso"
+    hecha = "hecha"
+    fallida = "fallida"
+
+class Tarea(Base):
+    __tablename__ = "tareas"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    tipo = Column(String(50), nullable=False)
+    datos = Column(Text, nullable=False)  # JSON
+    estado = Column(Enum(EstadoTareaEnum), nullable=False)
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False)
+    # Con reintentos se pospone (backoff); las fechas son UTC sin zona
+    disponible_desde = Column(DateTime, nullable=False)
+    creada = Column(DateTime, nullable=False)
+    actualizada = Column(DateTime, nullable=False)
+    resultado = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Los workers toman las pendientes ya disponibles, en orden de llegada
+        Index("ix_tareas_estado_disponible", "estado", "disponible_desde"),
+    )
+
+
+# Almacén de fotos por contenido (almacen_fotos.py)
+class Foto(Base):
+    __tablename__ = "fotos"
+
+    # Ruta relativa dentro de fotos/: ab/cd/<sha256>.ext
+    nombre = Column(String(255), primary_key=True)
+    # Registros (computadores + trabajadores) que la usan; 0 = candidata al recolector
+    referencias = Column(Integer, nullable=False, default=0)
+    tamano = Column(Integer, nullable=True)
+    creada = Column(DateTime, nullable=False)
+
+
+# Sincronización incremental (versionado.py)
+class ContadorVersion(Base):
+    __tablename__ = "contadores_version"
+
+    # "filas": última versión asignada; "lapidas": hasta dónde se purgaron los borrados
+    nombre = Column(String(30), primary_key=True)
+    valor = Column(BigInteger, nullable=False, default=0)
+
+
+class Eliminado(Base):
+    __tablename__ = "eliminados"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entidad = Column(String(30), nullable=False)  # nombre de la tabla
+    clave = Column(String(50), nullable=False)  # clave primaria como texto
+    version = Column(BigInteger, nullable=False)
+    creado = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # ?since=: lápidas de una entidad posteriores a una versión
+        Index("ix_eliminados_entidad_version", "entidad", "version"),
+        Index("ix_eliminados_creado", "creado"),
+    )
@@ -0,0 +1,45 @@
+import enum
+import json
+from datetime import date, datetime, time
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json con un default para enums y fechas
+    orjson = None
+
+# ⚡ Serialización directa para listados grandes
+#
+# FastAPI valida lo que devuelve un endpoint contra su response_model y lo pasa
+# por jsonable_encoder antes de serializarlo; con miles de filas eso cuesta más
+# que la consulta. Los endpoints con ?resumen=true arman filas planas (dicts
+# desde tuplas, sin objetos ORM) y las devuelven en una RespuestaRapida, que
+# va directo a bytes. Los enums salen por su valor y las fechas en ISO 8601,
+# igual que con los modelos Pydantic.
+
+
+def _por_defecto(valor):
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+def a_json(contenido) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":"), default=_por_defecto).encode("utf-8")
+
+
+class RespuestaRapida(JSONResponse):
+    """JSONResponse que serializa con orjson (o json con enums y fechas) sin jsonable_encoder."""
+
+    def render(self, content) -> bytes:
+        return a_json(content)
+
+
+def filas(resultado) -> RespuestaRapida:
+    """Respuesta con las filas de un `select(...)` ejecutado, una por dict."""
+    return RespuestaRapida([dict(fila) for fila in resultado.mappings()])
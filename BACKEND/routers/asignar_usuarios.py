@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
+from sesiones import solo_admin
+import eventos
+import versionado
 from models import Usuario, Trabajador, AsignarUsuario
-from schemas import AsignarUsuarioCreate, AsignarUsuarioOut, PerfilResponse
+from schemas import AsignarUsuarioCreate, AsignarUsuarioOut, DeltaAsignaciones, PerfilResponse
+from typing import Optional, Union
 
 router = APIRouter(prefix="/asignar-usuario", tags=["Asignar Usuario"])
 
 # ✅ 1. Crear asignación (usuario ↔ trabajador)
-@router.post("/", response_model=AsignarUsuarioOut)
+@router.post("/", response_model=AsignarUsuarioOut, dependencies=[Depends(solo_admin)])
 def asignar_usuario(asignacion: AsignarUsuarioCreate, db: Session = Depends(get_db)):
     usuario = db.query(Usuario).filter(Usuario.username == asignacion.usuario_id).first()
     if not usuario:
@@ -21,6 +25,7 @@ def asignar_usuario(asignacion: AsignarUsuarioCreate, db: Session = Depends(get_
     db.add(nueva_asignacion)
     db.commit()
     db.refresh(nueva_asignacion)
+    eventos.publicar("asignar_usuario", nueva_asignacion.id, "crear")
 
     return nueva_asignacion
 
@@ -39,7 +44,7 @@ def obtener_perfil(username: str, db: Session = Depends(get_db)):
     return PerfilResponse(nombre=trabajador.nombre, foto=trabajador.foto)
 
 # ✅ Eliminar asignación
-@router.delete("/{id}", status_code=204)
+@router.delete("/{id}", status_code=204, dependencies=[Depends(solo_admin)])
 def eliminar_asignacion(id: int, db: Session = Depends(get_db)):
     asignacion = db.query(AsignarUsuario).filter(AsignarUsuario.id == id).first()
     if not asignacion:
@@ -47,9 +52,15 @@ def eliminar_asignacion(id: int, db: Session = Depends(get_db)):
 
     db.delete(asignacion)
     db.commit()
+    eventos.publicar("asignar_usuario", id, "eliminar")
     return {"message": "Asignación eliminada correctamente"}
 
     
-@router.get("/", response_model=list[AsignarUsuarioOut])
-def listar_asignaciones(db: Session = Depends(get_db)):
+@router.get("/", response_model=Union[DeltaAsignaciones, list[AsignarUsuarioOut]], dependencies=[Depends(solo_admin)])
+def listar_asignaciones(
+    since: Optional[int] = Query(None, ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    db: Session = Depends(get_db),
+):
+    if since is not None:
+        return versionado.delta(db, db.query(AsignarUsuario), AsignarUsuario, since)
     return db.query(AsignarUsuario).all()
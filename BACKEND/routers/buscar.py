@@ -0,0 +1,25 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+import busqueda
+import config
+from schemas import ResultadoBusqueda
+
+router = APIRouter(tags=["Búsqueda"])
+
+TIPOS = {"trabajador", "computador", "detalle", "permiso"}
+
+
+# 🔎 Búsqueda unificada: trabajadores, computadores, detalles y permisos
+@router.get("/buscar", response_model=List[ResultadoBusqueda])
+def buscar(
+    q: str = Query(..., min_length=1, max_length=100),
+    tipos: Optional[str] = Query(None, description="Lista separada por comas, p. ej. trabajador,computador"),
+    limite: int = Query(config.BUSQUEDA_LIMITE, ge=1, le=100),
+):
+    filtro = None
+    if tipos:
+        filtro = {t.strip() for t in tipos.split(",") if t.strip()}
+        desconocidos = filtro - TIPOS
+        if desconocidos:
+            raise HTTPException(status_code=400, detail=f"Tipos no válidos: {', '.join(sorted(desconocidos))}")
+    return busqueda.buscar(q, filtro, limite)
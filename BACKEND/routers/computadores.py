@@ -1,82 +1,392 @@
-from fastapi import APIRouter, Depends, HTTPException,requests
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Computador
-from schemas import ComputadorCreate, ComputadorUpdate, ComputadorOut
+from database import get_db, get_sesion, en_sesion
+from asincrono import ejecutar, validada
+from respuestas import RespuestaRapida
+from sesiones import solo_admin
+import cache_http
+import eventos
+import versionado
+import estadisticas
+import consultas
+import busqueda
+import tareas
+from almacen_fotos import guardar_foto, eliminar_foto_si_huerfana, foto_reemplazada, programar_eliminacion
+from models import Computador, Detalle, Mantenimiento, PermisoSalida, Trabajador, EstadoPermisoEnum
+from schemas import (
+    ComputadorCreate, ComputadorUpdate, ComputadorCambios, ComputadorOut, ComputadorPagina, TrabajadorOut, DeltaComputadores,
+    DetalleOut, FichaComputador, MantenimientoFicha, PermisoFicha,
+)
+import config
 from fastapi import UploadFile, File
-from sqlalchemy.orm import joinedload
-import shutil
-import os
+from sqlalchemy.orm import load_only
+from types import SimpleNamespace
+from typing import Optional, Union
+import base64
+import binascii
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+# Campos que se pueden pedir con ?fields= (columnas + relación trabajador)
+CAMPOS_COMPUTADOR = {"codigo", "nombre", "marca", "trabajador_id", "foto", "version", "trabajador"}
+LIMITE_MAXIMO = 500
+# Respuestas que se validan en el threadpool (asincrono.validada)
+DELTA = TypeAdapter(DeltaComputadores)
+LISTA = TypeAdapter(list[ComputadorOut])
+# Secciones de la ficha (?fields=)
+SECCIONES_FICHA = ("computador", "trabajador", "detalle", "mantenimientos", "permisos_activos")
+
+
+def codificar_cursor(codigo: str) -> str:
+    return base64.urlsafe_b64encode(codigo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> str:
     try:
-        yield db
-    finally:
-        db.close()
+        relleno = "=" * (-len(cursor) % 4)
+        return base64.b64decode(cursor + relleno, altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def parsear_campos(fields: Optional[str]) -> Optional[set]:
+    if not fields:
+        return None
+    campos = {c.strip() for c in fields.split(",") if c.strip()}
+    desconocidos = campos - CAMPOS_COMPUTADOR
+    if desconocidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {', '.join(sorted(desconocidos))}",
+        )
+    # El código siempre viaja: es la clave del cursor
+    return campos | {"codigo"}
+
+
+def proyectar(computador: Computador, campos: set) -> dict:
+    # Solo se leen atributos cargados, así no se disparan consultas perezosas
+    item = {c: getattr(computador, c) for c in campos if c != "trabajador"}
+    if "trabajador" in campos:
+        item["trabajador"] = (
+            TrabajadorOut.model_validate(computador.trabajador).model_dump()
+            if computador.trabajador else None
+        )
+    return item
+
+
+def escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
-@router.get("/computadores/", response_model=list[ComputadorOut])
-def listar_computadores(db: Session = Depends(get_db)):
-    return db.query(Computador).options(joinedload(Computador.trabajador)).all()
+# ✅ Listar computadores (paginación por cursor sobre `codigo`)
+@router.get("/computadores/", response_model=Union[DeltaComputadores, ComputadorPagina, list[ComputadorOut]])
+async def listar_computadores(
+    cursor: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = None,
+    marca: Optional[str] = None,
+    trabajador_id: Optional[str] = None,
+    nombre_prefijo: Optional[str] = None,
+    todos: bool = False,
+    since: Optional[int] = Query(None, ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    db=Depends(get_sesion),
+):
+    if since is not None:
+        # Sincronización: la tabla completa, sin filtros ni páginas
+        if cursor or fields or marca or trabajador_id or nombre_prefijo or todos:
+            raise HTTPException(status_code=400, detail="since no se combina con filtros, campos ni cursor")
+        delta = await en_sesion(
+            db, lambda sesion: versionado.delta(sesion, consultas.computadores_out(sesion.query(Computador)), Computador, since)
+        )
+        return await validada(DELTA, delta)
 
-@router.post("/computadores/", response_model=ComputadorOut)
+    campos = parsear_campos(fields)
+    consulta = select(Computador)
+
+    if marca:
+        consulta = consulta.where(Computador.marca == marca)
+    if trabajador_id:
+        consulta = consulta.where(Computador.trabajador_id == trabajador_id)
+    if nombre_prefijo:
+        consulta = consulta.where(Computador.nombre.like(f"{escapar_like(nombre_prefijo)}%", escape="\\"))
+
+    # 👇 Comportamiento anterior (lista completa) solo bajo petición explícita
+    if todos:
+        resultado = await ejecutar(db, consultas.computadores_out(consulta).order_by(Computador.codigo))
+        return await validada(LISTA, resultado.scalars().all())
+
+    columnas = [getattr(Computador, c) for c in (campos or CAMPOS_COMPUTADOR) if c != "trabajador"]
+    consulta = consulta.options(load_only(*columnas))
+    if campos is None or "trabajador" in campos:
+        consulta = consultas.computadores_out(consulta)
+
+    if cursor:
+        consulta = consulta.where(Computador.codigo > decodificar_cursor(cursor))
+
+    # Se pide una fila de más para saber si hay otra página
+    resultado = await ejecutar(db, consulta.order_by(Computador.codigo).limit(limite + 1))
+    return await run_in_threadpool(armar_pagina, resultado.scalars().all(), campos, limite)
+
+
+def armar_pagina(filas: list, campos: Optional[set], limite: int) -> RespuestaRapida:
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if campos is None:
+        items = [ComputadorOut.model_validate(c).model_dump(mode="json") for c in filas]
+    else:
+        items = [proyectar(c, campos) for c in filas]
+    siguiente = codificar_cursor(filas[-1].codigo) if hay_mas else None
+    return RespuestaRapida({"items": items, "siguiente_cursor": siguiente})
+
+@router.post("/computadores/", response_model=ComputadorOut, dependencies=[Depends(solo_admin)])
 def crear_computador(computador: ComputadorCreate, db: Session = Depends(get_db)):
     nuevo = Computador(**computador.dict())
     db.add(nuevo)
     db.commit()
+    cache_http.invalidar("computadores")
+    eventos.publicar("computadores", computador.codigo, "crear")
+    estadisticas.computador_creado(computador.marca, computador.trabajador_id)
     db.refresh(nuevo)
+    busqueda.indexar(busqueda.doc_computador(nuevo))
     return nuevo
 
-@router.put("/computadores/{codigo}", response_model=ComputadorOut)
-def actualizar_computador(codigo: str, computador: ComputadorUpdate, db: Session = Depends(get_db)):
-    db_computador = db.query(Computador).filter(Computador.codigo == codigo).first()
-    if not db_computador:
-        raise HTTPException(status_code=404, detail="Computador no encontrado")
+@router.put("/computadores/{codigo}", response_model=ComputadorOut, dependencies=[Depends(solo_admin)])
+def actualizar_computador(
+    codigo: str,
+    computador: ComputadorUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, codigo, computador.dict(), if_match, response)
 
-    for key, value in computador.dict().items():
-        setattr(db_computador, key, value)
+# ✏️ Actualización parcial: solo se escriben los campos enviados
+@router.patch("/computadores/{codigo}", response_model=ComputadorOut, dependencies=[Depends(solo_admin)])
+def modificar_computador(
+    codigo: str,
+    computador: ComputadorCambios,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, codigo, computador.model_dump(exclude_unset=True), if_match, response)
 
-    db.commit()
-    db.refresh(db_computador)
-    return db_computador
 
-@router.delete("/computadores/{codigo}")
+def guardar_cambios(db: Session, codigo: str, cambios: dict, if_match: Optional[str], response: Response) -> dict:
+    # Un solo UPDATE condicionado a la versión (If-Match); la respuesta sale de RETURNING
+    anteriores, fila = versionado.actualizar_condicional(
+        db, Computador, [Computador.codigo == codigo], cambios,
+        versiones=versionado.versiones_if_match(if_match),
+        previas=("foto", "marca", "trabajador_id"),
+        no_encontrado="Computador no encontrado",
+    )
+    if "foto" in anteriores:
+        foto_reemplazada(db, anteriores["foto"], fila["foto"])
+    versionado.confirmar(db, fila)
+
+    cache_http.invalidar("computadores")
+    cache_http.invalidar_fichas(codigo)
+    eventos.publicar("computadores", codigo, "actualizar")
+    antes = (anteriores.get("marca", fila["marca"]), anteriores.get("trabajador_id", fila["trabajador_id"]))
+    estadisticas.computador_actualizado(antes, (fila["marca"], fila["trabajador_id"]))
+    busqueda.indexar(busqueda.doc_computador(SimpleNamespace(**fila)))
+    response.headers["ETag"] = versionado.etag(fila["version"])
+    # RETURNING no trae la relación: el responsable en una consulta más
+    trabajador = db.get(Trabajador, fila["trabajador_id"]) if fila["trabajador_id"] else None
+    return dict(fila, trabajador=trabajador)
+
+@router.delete("/computadores/{codigo}", dependencies=[Depends(solo_admin)])
 def eliminar_computador(codigo: str, db: Session = Depends(get_db)):
     computador = db.query(Computador).filter(Computador.codigo == codigo).first()
 
     if not computador:
         raise HTTPException(status_code=404, detail="Computador no encontrado")
 
-    # Si tiene una ruta de foto, intenta eliminar el archivo físico
-    if computador.foto and computador.foto.startswith("http://192.168.1.233:8000/fotos/"):
-        nombre_foto = computador.foto.split("/fotos/")[-1]  # solo el nombre del archivo
-        ruta_foto = os.path.join(os.path.dirname(__file__), "..", "fotos", nombre_foto)
-
-        if os.path.exists(ruta_foto):
-            os.remove(ruta_foto)
+    # Con muchos dependientes la cascada se hace por lotes en segundo plano
+    dependientes = contar_dependientes(db, codigo)
+    if dependientes >= config.TAREAS_CASCADA_MIN:
+        tarea = tareas.encolar(db, "eliminar_computador", {"codigo": codigo})
+        db.commit()
+        return JSONResponse(status_code=202, content={"mensaje": "Eliminación en curso", "job_id": tarea.id})
 
+    # Si tiene foto y nadie más la usa, se elimina el archivo físico (tras el commit)
+    if computador.foto:
+        programar_eliminacion(db, computador.foto)
     db.delete(computador)
     db.commit()
+    computador_eliminado(codigo, dependientes)
     return {"mensaje": "Computador eliminado"}
 
-FOTOS_DIR = os.path.join(os.path.dirname(__file__), "..", "fotos")
 
-@router.post("/upload-foto/")
-def subir_foto(foto: UploadFile = File(...)):
-    ruta_destino = os.path.join(FOTOS_DIR, foto.filename)
+def contar_dependientes(db: Session, codigo: str) -> int:
+    return (
+        db.query(func.count()).select_from(Mantenimiento).filter(Mantenimiento.computador_id == codigo).scalar()
+        + db.query(func.count()).select_from(PermisoSalida).filter(PermisoSalida.codigo_computador == codigo).scalar()
+    )
+
+
+def computador_eliminado(codigo: str, dependientes: int):
+    cache_http.invalidar("computadores", "detalle", "mantenimientos", "permisos")
+    cache_http.invalidar_fichas(codigo)
+    eventos.publicar("computadores", codigo, "eliminar")
+    eventos.publicar("detalle", codigo, "eliminar")
+    if dependientes:
+        # Los ids borrados por la cascada no se conocen sin leerlos: se avisa en bloque
+        eventos.publicar("mantenimientos", None, "recargar")
+        eventos.publicar("permisos", None, "recargar")
+    # La cascada borra mantenimientos y permisos: se recalcula en la próxima lectura
+    estadisticas.contadores.invalidar()
+    busqueda.quitar("computador", codigo, relacionados=True)
+
 
-    with open(ruta_destino, "wb") as buffer:
-        shutil.copyfileobj(foto.file, buffer)
+@tareas.tarea("eliminar_computador")
+def _tarea_eliminar_computador(db: Session, datos: dict):
+    codigo = datos["codigo"]
+    borradas = {
+        "mantenimientos": tareas.borrar_por_lotes(db, Mantenimiento, Mantenimiento.computador_id == codigo),
+        "permisos": tareas.borrar_por_lotes(db, PermisoSalida, PermisoSalida.codigo_computador == codigo),
+        "detalles": tareas.borrar_por_lotes(db, Detalle, Detalle.codigo_computador == codigo),
+    }
+    computador = db.get(Computador, codigo)
+    if computador is not None:
+        foto = computador.foto
+        db.delete(computador)
+        db.commit()
+        eliminar_foto_si_huerfana(db, foto)
+    computador_eliminado(codigo, borradas["mantenimientos"] + borradas["permisos"])
+    return borradas
 
-    url_foto = f"http://192.168.1.233:8000/fotos/{foto.filename}"
-    return {"foto_url": url_foto}
+@router.post("/upload-foto/", dependencies=[Depends(solo_admin)])
+async def subir_foto(foto: UploadFile = File(...)):
+    return await guardar_foto(foto)
 
 # ✅ Obtener un computador por su código
 @router.get("/computadores/{codigo}", response_model=ComputadorOut)
-def obtener_computador(codigo: str, db: Session = Depends(get_db)):
-    computador = db.query(Computador).filter(Computador.codigo == codigo).first()
+async def obtener_computador(codigo: str, response: Response, db=Depends(get_sesion)):
+    consulta = consultas.computadores_out(select(Computador)).where(Computador.codigo == codigo)
+    computador = (await ejecutar(db, consulta)).scalars().first()
     if not computador:
         raise HTTPException(status_code=404, detail="Computador no encontrado")
+    # Versión a mandar en If-Match al guardar
+    response.headers["ETag"] = versionado.etag(computador.version)
     return computador
+
+
+def parsear_secciones(fields: Optional[str]) -> tuple:
+    if not fields:
+        return SECCIONES_FICHA
+    secciones = {c.strip() for c in fields.split(",") if c.strip()}
+    desconocidas = secciones - set(SECCIONES_FICHA)
+    if desconocidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Secciones no válidas: {', '.join(sorted(desconocidas))}",
+        )
+    # Orden fijo: la misma selección comparte entrada de caché
+    return tuple(s for s in SECCIONES_FICHA if s in secciones)
+
+
+def armar_ficha(db: Session, codigo: str, secciones: tuple, ultimos: int) -> Optional[FichaComputador]:
+    # 1️⃣ Computador + trabajador + detalle: todos muchos-a-uno (o uno por equipo)
+    fila = (
+        db.query(Computador, Trabajador, Detalle)
+        .outerjoin(Trabajador, Computador.trabajador_id == Trabajador.cedula)
+        .outerjoin(Detalle, Detalle.codigo_computador == Computador.codigo)
+        .filter(Computador.codigo == codigo)
+        .order_by(Detalle.id)
+        .first()
+    )
+    if fila is None:
+        return None
+    computador, trabajador, detalle = fila
+
+    ficha = {}
+    if "computador" in secciones:
+        ficha["computador"] = ComputadorCreate(
+            codigo=computador.codigo, nombre=computador.nombre, marca=computador.marca,
+            trabajador_id=computador.trabajador_id, foto=computador.foto,
+        )
+    if "trabajador" in secciones:
+        ficha["trabajador"] = TrabajadorOut.model_validate(trabajador) if trabajador else None
+    if "detalle" in secciones:
+        ficha["detalle"] = DetalleOut.model_validate(detalle) if detalle else None
+
+    # 2️⃣ Últimos mantenimientos (índice computador_id + fecha)
+    if "mantenimientos" in secciones:
+        filas = (
+            db.query(
+                Mantenimiento.id, Mantenimiento.computador_id, Mantenimiento.fecha, Mantenimiento.hora,
+                Mantenimiento.tipo, Mantenimiento.observaciones, Mantenimiento.estado,
+            )
+            .filter(Mantenimiento.computador_id == codigo)
+            .order_by(Mantenimiento.fecha.desc(), Mantenimiento.hora.desc(), Mantenimiento.id.desc())
+            .limit(ultimos)
+            .all()
+        ) if ultimos else []
+        ficha["mantenimientos"] = [
+            MantenimientoFicha(
+                id=m.id, computador_id=m.computador_id, fecha=m.fecha, hora=m.hora,
+                tipo=m.tipo.value, observaciones=m.observaciones, estado=m.estado.value,
+            )
+            for m in filas
+        ]
+
+    # 3️⃣ Permisos activos (índice codigo_computador + estado)
+    if "permisos_activos" in secciones:
+        filas = (
+            db.query(PermisoSalida.id, PermisoSalida.codigo_computador, PermisoSalida.cedula_trabajador)
+            .filter(
+                PermisoSalida.codigo_computador == codigo,
+                PermisoSalida.estado == EstadoPermisoEnum.activo,
+            )
+            .order_by(PermisoSalida.id)
+            .all()
+        )
+        ficha["permisos_activos"] = [
+            PermisoFicha(id=p.id, codigo_computador=p.codigo_computador, cedula_trabajador=p.cedula_trabajador, estado="activo")
+            for p in filas
+        ]
+
+    return FichaComputador(**ficha)
+
+
+# 🗂️ Ficha completa de un computador en una sola llamada
+@router.get("/computadores/{codigo}/ficha", response_model=FichaComputador, response_model_exclude_unset=True)
+def obtener_ficha(
+    codigo: str,
+    request: Request,
+    fields: Optional[str] = None,
+    ultimos: int = Query(5, ge=0, le=50),
+    db: Session = Depends(get_db),
+):
+    secciones = parsear_secciones(fields)
+    if not config.CACHE_HTTP:
+        ficha = armar_ficha(db, codigo, secciones, ultimos)
+        if ficha is None:
+            raise HTTPException(status_code=404, detail="Computador no encontrado")
+        return Response(ficha.model_dump_json(exclude_unset=True), media_type="application/json")
+
+    # La versión de la ficha se lee antes de consultar: una escritura concurrente
+    # deja la entrada con una versión vieja, nunca un cuerpo nuevo con ETag viejo
+    tablas = cache_http.tablas_ficha(codigo)
+    consulta = f"fields={','.join(secciones)}&ultimos={ultimos}".encode()
+    etag = cache_http.calcular_etag(f"/computadores/{codigo}/ficha", consulta, tablas)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cache_http.coincide_etag(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    clave = ("ficha", codigo, consulta, etag)
+    guardado = cache_http.respuestas.obtener(clave)
+    if guardado is not None:
+        return Response(guardado[0], media_type="application/json", headers=headers)
+
+    ficha = armar_ficha(db, codigo, secciones, ultimos)
+    if ficha is None:
+        raise HTTPException(status_code=404, detail="Computador no encontrado")
+    cuerpo = ficha.model_dump_json(exclude_unset=True).encode()
+    cache_http.respuestas.guardar(clave, cuerpo, None)
+    return Response(cuerpo, media_type="application/json", headers=headers)
@@ -1,29 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db
+from sesiones import solo_admin
+import cache_http
+import eventos
+import versionado
+import busqueda
 from models import Detalle, Computador
-from schemas import DetalleCreate, DetalleOut
+from schemas import DetalleCreate, DetalleCambios, DetalleOut, DeltaDetalles
+from types import SimpleNamespace
+from typing import Optional
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# 🔁 Detalles cambiados / borrados desde una versión (no hay listado completo de detalles)
+@router.get("/detalles/", response_model=DeltaDetalles)
+def detalles_desde(
+    since: int = Query(..., ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    db: Session = Depends(get_db),
+):
+    return versionado.delta(db, db.query(Detalle), Detalle, since)
 
 # 🔍 Obtener los detalles de un computador por su código
 @router.get("/computadores/{codigo}/detalles", response_model=DetalleOut)
-def obtener_detalle(codigo: str, db: Session = Depends(get_db)):
+def obtener_detalle(codigo: str, response: Response, db: Session = Depends(get_db)):
     detalle = db.query(Detalle).filter(Detalle.codigo_computador == codigo).first()
     if not detalle:
         raise HTTPException(status_code=404, detail="Detalle no encontrado")
+    response.headers["ETag"] = versionado.etag(detalle.version)
     return detalle
 
 # ✅ Crear detalle para un computador
-@router.post("/detalles/", response_model=DetalleOut)
+@router.post("/detalles/", response_model=DetalleOut, dependencies=[Depends(solo_admin)])
 def crear_detalle(detalle: DetalleCreate, db: Session = Depends(get_db)):
     # Verificar que el computador exista
     computador = db.query(Computador).filter(Computador.codigo == detalle.codigo_computador).first()
@@ -33,38 +42,78 @@ def crear_detalle(detalle: DetalleCreate, db: Session = Depends(get_db)):
     nuevo = Detalle(**detalle.dict())
     db.add(nuevo)
     db.commit()
+    cache_http.invalidar("detalle")
+    cache_http.invalidar_fichas(nuevo.codigo_computador)
+    eventos.publicar("detalle", detalle.codigo_computador, "crear")
     db.refresh(nuevo)
+    busqueda.indexar(busqueda.doc_detalle(nuevo))
     return nuevo
 
 # ♻️ Actualizar detalle de un computador
-@router.put("/computadores/{codigo}/detalles", response_model=DetalleOut)
-def actualizar_detalle(codigo: str, detalle_data: DetalleCreate, db: Session = Depends(get_db)):
-    detalle = db.query(Detalle).filter(Detalle.codigo_computador == codigo).first()
-    if not detalle:
-        raise HTTPException(status_code=404, detail="Detalle no encontrado")
+@router.put("/computadores/{codigo}/detalles", response_model=DetalleOut, dependencies=[Depends(solo_admin)])
+def actualizar_detalle(
+    codigo: str,
+    detalle_data: DetalleCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, codigo, detalle_data.dict(), if_match, response)
 
-    for key, value in detalle_data.dict().items():
-        setattr(detalle, key, value)
+# ✏️ Actualización parcial: solo se escriben los campos enviados
+@router.patch("/computadores/{codigo}/detalles", response_model=DetalleOut, dependencies=[Depends(solo_admin)])
+def modificar_detalle(
+    codigo: str,
+    detalle_data: DetalleCambios,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, codigo, detalle_data.model_dump(exclude_unset=True), if_match, response)
 
-    db.commit()
-    db.refresh(detalle)
-    return detalle
+
+def guardar_cambios(db: Session, codigo: str, cambios: dict, if_match: Optional[str], response: Response) -> dict:
+    # El detalle se identifica por el computador; el UPDATE va por id (el mismo que daría .first())
+    detalle_id = db.scalar(select(func.min(Detalle.id)).where(Detalle.codigo_computador == codigo))
+    if detalle_id is None:
+        raise HTTPException(status_code=404, detail="Detalle no encontrado")
+    _, fila = versionado.actualizar_condicional(
+        db, Detalle, [Detalle.id == detalle_id], cambios,
+        versiones=versionado.versiones_if_match(if_match),
+        no_encontrado="Detalle no encontrado",
+    )
+    versionado.confirmar(db, fila)
+
+    nuevo_codigo = fila["codigo_computador"]
+    cache_http.invalidar("detalle")
+    cache_http.invalidar_fichas(codigo, nuevo_codigo)
+    # La clave es el código del computador: si cambia, se avisa con las dos
+    eventos.publicar("detalle", sorted({codigo, nuevo_codigo}), "actualizar")
+    busqueda.indexar(busqueda.doc_detalle(SimpleNamespace(**fila)))
+    response.headers["ETag"] = versionado.etag(fila["version"])
+    return fila
 
 # ❌ Eliminar detalle de un computador
-@router.delete("/computadores/{codigo}/detalles")
+@router.delete("/computadores/{codigo}/detalles", dependencies=[Depends(solo_admin)])
 def eliminar_detalle(codigo: str, db: Session = Depends(get_db)):
     detalle = db.query(Detalle).filter(Detalle.codigo_computador == codigo).first()
     if not detalle:
         raise HTTPException(status_code=404, detail="Detalle no encontrado")
 
+    detalle_id = detalle.id
     db.delete(detalle)
     db.commit()
+    cache_http.invalidar("detalle")
+    cache_http.invalidar_fichas(codigo)
+    eventos.publicar("detalle", codigo, "eliminar")
+    busqueda.quitar("detalle", detalle_id)
     return {"mensaje": "Detalle eliminado correctamente"}
 
 
 @router.get("/detalles/{codigo_computador}", response_model=DetalleOut)
-def obtener_detalle_por_computador(codigo_computador: str, db: Session = Depends(get_db)):
+def obtener_detalle_por_computador(codigo_computador: str, response: Response, db: Session = Depends(get_db)):
     detalle = db.query(Detalle).filter(Detalle.codigo_computador == codigo_computador).first()
     if not detalle:
         raise HTTPException(status_code=404, detail="Detalle no encontrado")
+    response.headers["ETag"] = versionado.etag(detalle.version)
     return detalle
\ No newline at end of file
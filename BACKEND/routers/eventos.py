@@ -0,0 +1,40 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+import eventos
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+ENTIDADES = {"computadores", "trabajadores", "mantenimientos", "permisos", "detalle", "asignar_usuario"}
+
+
+# 🔢 Versión actual: se pide antes de cargar los listados y se usa como `desde`
+@router.get("/version")
+def version_actual():
+    return {"version": eventos.registro.ultima()}
+
+
+# 📡 Cambios en vivo (Server-Sent Events) con reanudación por versión
+@router.get("/")
+async def flujo_eventos(
+    request: Request,
+    desde: Optional[int] = Query(None, description="Última versión vista; sin ella, solo los nuevos"),
+    entidades: Optional[str] = Query(None, description="Separadas por coma, p. ej. computadores,permisos"),
+    last_event_id: Optional[int] = Header(None),
+):
+    filtro = None
+    if entidades:
+        filtro = {e.strip() for e in entidades.split(",") if e.strip()}
+        desconocidas = filtro - ENTIDADES
+        if desconocidas:
+            raise HTTPException(status_code=400, detail=f"Entidades desconocidas: {', '.join(sorted(desconocidas))}")
+
+    # Al reconectar, EventSource manda Last-Event-ID: es más reciente que el `desde` de la URL
+    inicio = last_event_id if last_event_id is not None else desde
+    return StreamingResponse(
+        eventos.flujo(inicio, filtro, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
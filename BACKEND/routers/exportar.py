@@ -0,0 +1,190 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, Integer, Time, select
+import database
+from sesiones import solo_admin
+import config
+from models import Computador, Detalle, Trabajador, Mantenimiento, PermisoSalida
+from typing import Literal
+import csv
+import enum
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional
+    pa = None
+
+router = APIRouter(prefix="/export", tags=["Exportar"], dependencies=[Depends(solo_admin)])
+
+
+def consulta_inventario():
+    return (
+        select(
+            Computador.codigo,
+            Computador.nombre,
+            Computador.marca,
+            Computador.foto,
+            Computador.trabajador_id,
+            Trabajador.nombre.label("trabajador_nombre"),
+            Trabajador.apellidos.label("trabajador_apellidos"),
+            Trabajador.cargo.label("trabajador_cargo"),
+            Trabajador.area_de_trabajo.label("trabajador_area"),
+            Detalle.procesador,
+            Detalle.ram,
+            Detalle.almacenamiento,
+            Detalle.sistema_operativo,
+            Detalle.serial,
+            Detalle.observaciones,
+        )
+        .outerjoin(Trabajador, Computador.trabajador_id == Trabajador.cedula)
+        .outerjoin(Detalle, Detalle.codigo_computador == Computador.codigo)
+        .order_by(Computador.codigo)
+    )
+
+
+def consulta_mantenimientos():
+    return select(*Mantenimiento.__table__.columns).order_by(Mantenimiento.id)
+
+
+def consulta_permisos():
+    return (
+        select(
+            *PermisoSalida.__table__.columns,
+            Trabajador.nombre.label("trabajador_nombre"),
+            Trabajador.apellidos.label("trabajador_apellidos"),
+        )
+        .outerjoin(Trabajador, PermisoSalida.cedula_trabajador == Trabajador.cedula)
+        .order_by(PermisoSalida.id)
+    )
+
+
+CONSULTAS = {
+    "inventario": consulta_inventario,
+    "mantenimientos": consulta_mantenimientos,
+    "permisos": consulta_permisos,
+}
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def valor_plano(valor):
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return valor
+
+
+def leer_bloques(consulta):
+    """Recorre la consulta con un cursor del lado del servidor, bloque a bloque."""
+    with database.engine.connect() as conn:
+        resultado = conn.execution_options(
+            stream_results=True, yield_per=config.EXPORT_YIELD_PER
+        ).execute(consulta)
+        for bloque in resultado.partitions():
+            yield bloque
+
+
+def generar_csv(consulta):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c.name for c in consulta.selected_columns])
+    # La cabecera sale de inmediato: el primer byte no espera a la base de datos
+    yield buffer.getvalue()
+    for bloque in leer_bloques(consulta):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([valor_plano(v) for v in fila] for fila in bloque)
+        yield buffer.getvalue()
+
+
+def generar_jsonl(consulta):
+    columnas = [c.name for c in consulta.selected_columns]
+    for bloque in leer_bloques(consulta):
+        yield "".join(
+            json.dumps(dict(zip(columnas, (valor_plano(v) for v in fila))), ensure_ascii=False) + "\n"
+            for fila in bloque
+        )
+
+
+class _SalidaIncremental:
+    """Archivo de solo escritura que entrega lo escrito y recuerda la posición total."""
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+def tipo_arrow(columna):
+    if isinstance(columna.type, Integer):
+        return pa.int64()
+    if isinstance(columna.type, Date):
+        return pa.date32()
+    if isinstance(columna.type, Time):
+        return pa.time64("us")
+    return pa.string()
+
+
+def generar_parquet(consulta):
+    esquema = pa.schema([(c.name, tipo_arrow(c)) for c in consulta.selected_columns])
+    salida = _SalidaIncremental()
+    # Cada bloque de la consulta es un row group del archivo
+    with pq.ParquetWriter(pa.PythonFile(salida, mode="w"), esquema) as writer:
+        for bloque in leer_bloques(consulta):
+            columnas = list(zip(*bloque))
+            writer.write_table(pa.table(
+                [
+                    pa.array([v.value if isinstance(v, enum.Enum) else v for v in valores], type=campo.type)
+                    for valores, campo in zip(columnas, esquema)
+                ],
+                schema=esquema,
+            ))
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+GENERADORES = {"csv": generar_csv, "jsonl": generar_jsonl, "parquet": generar_parquet}
+
+
+# ✅ Exportar inventario, mantenimientos o permisos en streaming
+@router.get("/{entidad}")
+def exportar(
+    entidad: Literal["inventario", "mantenimientos", "permisos"],
+    formato: Literal["csv", "jsonl", "parquet"] = "csv",
+):
+    if formato == "parquet" and pa is None:
+        raise HTTPException(status_code=400, detail="Para exportar en Parquet hace falta instalar pyarrow")
+
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        GENERADORES[formato](CONSULTAS[entidad]()),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{entidad}.{extension}"'},
+    )
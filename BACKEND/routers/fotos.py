@@ -0,0 +1,135 @@
+import email.utils
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers
+
+import almacen_fotos
+import config
+
+router = APIRouter(tags=["Fotos"])
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+RAIZ = os.path.realpath(config.FOTOS_DIR)
+# Nombre = hash del contenido (original, miniatura o variante): la URL nunca cambia de archivo
+POR_CONTENIDO = re.compile(r"(?:^|/)[0-9a-f]{64}\.\w+$")
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "public, no-cache"
+# Original servido en lugar de una variante que todavía no existe: caduca pronto
+CACHE_PROVISIONAL = "public, max-age=300"
+# Originales y miniaturas que pueden tener versión AVIF / WebP
+NEGOCIABLES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class RespuestaFoto(FileResponse):
+    """FileResponse que deja el envío al servidor cuando ofrece `http.response.pathsend`.
+
+    Así un servidor ASGI que lo soporte (Granian, por ejemplo) manda el archivo
+    con sendfile, sin pasar los bytes por Python. Si no, Starlette lo lee por
+    bloques y atiende Range / If-Range.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if (
+            "http.response.pathsend" in scope.get("extensions", {})
+            and scope["method"] == "GET"
+            and "range" not in Headers(scope=scope)
+        ):
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        await super().__call__(scope, receive, send)
+
+
+def resolver(ruta: str):
+    """Ruta absoluta dentro de fotos/, o None si intenta salir o es un archivo interno."""
+    partes = ruta.split("/")
+    if "\\" in ruta or any(not p or p == ".." or p.startswith(".") for p in partes):
+        return None
+    absoluta = os.path.realpath(os.path.join(RAIZ, ruta))
+    if not absoluta.startswith(RAIZ + os.sep):
+        return None
+    return absoluta
+
+
+def formatos_aceptados(ruta: str, accept: str):
+    """Formatos AVIF / WebP, en orden de preferencia, que el cliente acepta para esta ruta."""
+    return [f for f in ("avif", "webp") if f"image/{f}" in accept and not ruta.endswith(f".{f}")]
+
+
+def elegir_variante(ruta: str, accept: str):
+    """(ruta, stat) de la mejor versión AVIF / WebP que acepte el cliente, si existe."""
+    for formato in formatos_aceptados(ruta, accept):
+        variante = almacen_fotos.ruta_variante(ruta, formato)
+        try:
+            return variante, os.stat(os.path.join(RAIZ, variante))
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def no_modificado(headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidatos = [e.strip() for e in if_none_match.split(",")]
+        return "*" in candidatos or etag in [c[2:] if c.startswith("W/") else c for c in candidatos]
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# 🖼️ Fotos, miniaturas y variantes (reemplaza al StaticFiles de /fotos)
+@router.api_route("/fotos/{ruta:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def servir_foto(ruta: str, request: Request):
+    absoluta = resolver(ruta)
+    try:
+        info = os.stat(absoluta) if absoluta else None
+    except FileNotFoundError:
+        info = None
+    if info is None or not os.path.isfile(absoluta):
+        raise HTTPException(status_code=404, detail="Foto no encontrada")
+
+    servida = ruta
+    headers = {}
+    provisional = False
+    if os.path.splitext(ruta)[1].lower() in NEGOCIABLES and not ruta.startswith("variantes/"):
+        # La respuesta depende de Accept: los caches intermedios guardan una por formato
+        headers["Vary"] = "Accept"
+        accept = request.headers.get("accept", "")
+        variante = elegir_variante(ruta, accept)
+        if variante is not None:
+            servida, info = variante
+        else:
+            # El cliente acepta un formato que se genera pero aún no está: el original
+            # no se fija por un año, así la variante le llega cuando exista
+            provisional = any(f in almacen_fotos.FORMATOS_VARIANTE for f in formatos_aceptados(ruta, accept))
+
+    if POR_CONTENIDO.search(servida):
+        headers["Cache-Control"] = CACHE_PROVISIONAL if provisional else CACHE_INMUTABLE
+        etag = '"' + hashlib.sha1(servida.encode()).hexdigest()[:20] + '"'
+    else:
+        # Nombres heredados (foto.jpg): el contenido puede cambiar, se revalida
+        headers["Cache-Control"] = CACHE_REVALIDAR
+        etag = '"' + hashlib.md5(f"{info.st_mtime}-{info.st_size}".encode()).hexdigest() + '"'
+    headers["ETag"] = etag
+    headers["Last-Modified"] = email.utils.formatdate(info.st_mtime, usegmt=True)
+
+    if no_modificado(request.headers, etag, info.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(servida)[0] or "application/octet-stream"
+    if config.FOTOS_X_ACCEL:
+        # nginx sirve el archivo (sendfile, Range) desde su location interna
+        headers["X-Accel-Redirect"] = config.FOTOS_X_ACCEL.rstrip("/") + "/" + servida
+        return Response(headers=headers, media_type=media_type)
+    return RespuestaFoto(os.path.join(RAIZ, servida), headers=headers, media_type=media_type, stat_result=info)
@@ -0,0 +1,186 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from database import get_db
+import cache_http
+import versionado
+import eventos
+import estadisticas
+import busqueda
+import almacen_fotos
+from sesiones import solo_admin
+import config
+from models import Computador, Detalle, Trabajador
+from schemas import ComputadorCreate, DetalleCreate, TrabajadorCreate, ErrorFila, ImportacionResultado
+from typing import Literal, Optional
+from collections import Counter
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/import", tags=["Importar"], dependencies=[Depends(solo_admin)])
+
+# entidad -> (modelo, schema de validación, clave natural, tabla padre requerida)
+ENTIDADES = {
+    "trabajadores": (Trabajador, TrabajadorCreate, "cedula", None),
+    "computadores": (Computador, ComputadorCreate, "codigo", ("trabajador_id", Trabajador.cedula)),
+    "detalles": (Detalle, DetalleCreate, "codigo_computador", ("codigo_computador", Computador.codigo)),
+}
+
+
+def leer_filas(archivo: UploadFile, formato: str):
+    """Genera (número de fila, dict) leyendo el archivo línea a línea."""
+    texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        # La fila 1 es la cabecera
+        for numero, fila in enumerate(csv.DictReader(texto), start=2):
+            yield numero, {k: (v if v != "" else None) for k, v in fila.items() if k}
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            dato = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, e
+            continue
+        yield numero, dato if isinstance(dato, dict) else ValueError("La línea no es un objeto JSON")
+
+
+def en_bloques(filas, tamano: int):
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= tamano:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def guardar_bloque(db: Session, entidad: str, bloque, resultado: ImportacionResultado):
+    modelo, schema, clave, padre = ENTIDADES[entidad]
+    validas = {}  # clave -> (fila, datos); la última aparición gana
+
+    for numero, dato in bloque:
+        if isinstance(dato, Exception):
+            registrar_error(resultado, numero, [str(dato)])
+            continue
+        try:
+            datos = schema.model_validate(dato).model_dump()
+        except ValidationError as e:
+            registrar_error(resultado, numero, [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ])
+            continue
+        validas[datos[clave]] = (numero, datos)
+
+    # ✅ Una sola consulta IN para comprobar que existen los registros padre
+    if padre and validas:
+        campo, columna = padre
+        referencias = {d[campo] for _, d in validas.values() if d[campo] is not None}
+        existentes = {v for (v,) in db.query(columna).filter(columna.in_(referencias))} if referencias else set()
+        for valor_clave, (numero, datos) in list(validas.items()):
+            if datos[campo] is not None and datos[campo] not in existentes:
+                registrar_error(resultado, numero, [f"{campo}: no existe '{datos[campo]}'"])
+                del validas[valor_clave]
+
+    if not validas:
+        return
+
+    # ✅ Otra consulta IN para separar inserciones de actualizaciones (upsert)
+    columna_clave = getattr(modelo, clave)
+    fotos_anteriores = {}
+    if modelo is Detalle:
+        ids = dict(db.query(Detalle.codigo_computador, Detalle.id).filter(columna_clave.in_(validas)))
+    else:
+        fotos_anteriores = dict(db.query(columna_clave, modelo.foto).filter(columna_clave.in_(validas)))
+        ids = {v: v for v in fotos_anteriores}
+
+    nuevos, cambios = [], []
+    for valor_clave, (_, datos) in validas.items():
+        if valor_clave in ids:
+            if modelo is Detalle:
+                datos["id"] = ids[valor_clave]
+            cambios.append(datos)
+        else:
+            nuevos.append(datos)
+
+    try:
+        # Tampoco pasa por versionado: la versión del bloque va en cada fila
+        extra = versionado.version_masiva(db, modelo)
+        for datos in nuevos + cambios:
+            datos.update(extra)
+        if nuevos:
+            db.execute(insert(modelo), nuevos)
+        if cambios:
+            db.execute(update(modelo), cambios)
+        if modelo is not Detalle:
+            # El INSERT/UPDATE masivo no pasa por before_flush: referencias a mano
+            deltas = Counter(d["foto"] for d in nuevos + cambios if d["foto"])
+            deltas.subtract(f for f in fotos_anteriores.values() if f)
+            almacen_fotos.ajustar_referencias(db, deltas)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        mensaje = str(e.orig if getattr(e, "orig", None) else e)
+        for numero, _ in validas.values():
+            registrar_error(resultado, numero, [f"Error de base de datos: {mensaje}"])
+        return
+
+    resultado.insertadas += len(nuevos)
+    resultado.actualizadas += len(cambios)
+
+
+def registrar_error(resultado: ImportacionResultado, fila: int, errores):
+    resultado.con_error += 1
+    # El reporte se corta para que la memoria no crezca con el archivo
+    if len(resultado.errores) < config.IMPORT_MAX_ERRORES:
+        resultado.errores.append(ErrorFila(fila=fila, errores=errores))
+
+
+# ✅ Importar trabajadores, computadores o detalles desde CSV / JSONL
+@router.post("/{entidad}", response_model=ImportacionResultado)
+def importar(
+    entidad: Literal["trabajadores", "computadores", "detalles"],
+    archivo: UploadFile = File(...),
+    formato: Optional[Literal["csv", "jsonl"]] = None,
+    chunk: int = Query(config.IMPORT_CHUNK, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    """Inserta o actualiza por bloques de `chunk` filas.
+
+    Los computadores referencian trabajadores y los detalles computadores:
+    conviene importar en ese orden.
+    """
+    if formato is None:
+        nombre = (archivo.filename or "").lower()
+        if nombre.endswith(".csv"):
+            formato = "csv"
+        elif nombre.endswith((".jsonl", ".ndjson", ".json")):
+            formato = "jsonl"
+        else:
+            raise HTTPException(status_code=400, detail="Indique formato=csv o formato=jsonl")
+
+    resultado = ImportacionResultado()
+    try:
+        for bloque in en_bloques(leer_filas(archivo, formato), chunk):
+            resultado.procesadas += len(bloque)
+            guardar_bloque(db, entidad, bloque, resultado)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Archivo no válido: {e}")
+    finally:
+        tablas = {"trabajadores": ("trabajadores",), "computadores": ("computadores",), "detalles": ("detalle",)}
+        cache_http.invalidar(*tablas[entidad])
+        cache_http.invalidar_fichas()
+        if entidad == "computadores":
+            estadisticas.contadores.invalidar()
+        # Las cargas masivas no pasan por los hooks de fila: se reconstruye aparte
+        if resultado.insertadas or resultado.actualizadas:
+            busqueda.reconstruir_en_segundo_plano()
+            eventos.publicar(tablas[entidad][0], None, "recargar")
+
+    return resultado
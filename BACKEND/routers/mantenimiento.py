@@ -1,59 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from database import SessionLocal
-from models import Mantenimiento, Computador
-from schemas import MantenimientoCreate, MantenimientoUpdate, MantenimientoOut
-from typing import List, Optional
-from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from database import get_db, get_sesion, en_sesion
+from asincrono import ejecutar, validada
+from sesiones import solo_admin
+import cache_http
+import eventos
+import versionado
+import estadisticas
+import config
+import consultas
+import respuestas
+from models import Mantenimiento, Computador, Trabajador
+from schemas import (
+    MantenimientoCreate, MantenimientoUpdate, MantenimientoCambios, MantenimientoOut, MantenimientoResumen,
+    DeltaMantenimientos,
+    MantenimientoLoteCreate, MantenimientoLoteUpdate, ProgramacionMantenimiento, ProgramacionResultado,
+)
+from typing import List, Optional, Union
+from datetime import date, timedelta
 
 router = APIRouter(prefix="/mantenimientos", tags=["Mantenimientos"])
 
-# ✅ Dependencia para DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+# Respuestas que se validan en el threadpool (asincrono.validada)
+DELTA = TypeAdapter(DeltaMantenimientos)
+LISTA = TypeAdapter(List[MantenimientoOut])
 
-def normalize_enum(mantenimiento: Mantenimiento):
-    if hasattr(mantenimiento.tipo, "value"):
-        mantenimiento.tipo = mantenimiento.tipo.value
-    if hasattr(mantenimiento.estado, "value"):
-        mantenimiento.estado = mantenimiento.estado.value
-    return mantenimiento
+# Columnas que el PATCH por lotes lee antes de escribir (404, cachés, estadísticas)
+COLUMNAS = ("id", "computador_id", "fecha", "hora", "tipo", "observaciones", "estado")
+
+
+def _valor(v):
+    return v.value if hasattr(v, "value") else v
+
+
+def con_computador(db: Session, ids: list) -> list:
+    """Respuesta por lotes: los mantenimientos `ids` (en ese orden) con su computador, en una consulta."""
+    consulta = consultas.mantenimientos_out(select(Mantenimiento)).where(Mantenimiento.id.in_(ids))
+    por_id = {m.id: m for m in db.scalars(consulta)}
+    return [por_id[id] for id in ids]
+
+
+def validar_lote(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="El lote está vacío")
+    if len(items) > config.MANTENIMIENTOS_LOTE_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {config.MANTENIMIENTOS_LOTE_MAX} mantenimientos por lote",
+        )
+
+
+def verificar_computadores(db: Session, codigos) -> None:
+    """Una sola consulta IN para todos los códigos del lote."""
+    codigos = set(codigos)
+    if not codigos:
+        return
+    existentes = set(db.scalars(select(Computador.codigo).where(Computador.codigo.in_(codigos))))
+    faltantes = sorted(codigos - existentes)
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Computadores no encontrados: {', '.join(faltantes[:20])}")
 
 
 # ✅ 1. Listar mantenimientos con rango de fechas
-@router.get("/", response_model=List[MantenimientoOut])
-def listar_mantenimientos(
+@router.get(
+    "/",
+    response_model=Union[DeltaMantenimientos, List[MantenimientoOut], List[MantenimientoResumen]],
+)
+async def listar_mantenimientos(
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
     estado: Optional[str] = None,
     tipo: Optional[str] = None,
-    db: Session = Depends(get_db)
+    since: Optional[int] = Query(None, ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    resumen: bool = Query(False, description="Filas planas (MantenimientoResumen), sin el computador anidado"),
+    db=Depends(get_sesion)
 ):
-    query = db.query(Mantenimiento).options(joinedload(Mantenimiento.computador))
+    if since is not None:
+        if fecha_inicio or fecha_fin or estado or tipo or resumen:
+            raise HTTPException(status_code=400, detail="since no se combina con filtros")
+        delta = await en_sesion(db, lambda sesion: versionado.delta(
+            sesion, consultas.mantenimientos_out(sesion.query(Mantenimiento)), Mantenimiento, since
+        ))
+        return await validada(DELTA, delta)
 
+    condiciones = []
     if fecha_inicio and fecha_fin:
-        query = query.filter(Mantenimiento.fecha.between(fecha_inicio, fecha_fin))
+        condiciones.append(Mantenimiento.fecha.between(fecha_inicio, fecha_fin))
     elif fecha_inicio:
-        query = query.filter(Mantenimiento.fecha >= fecha_inicio)
+        condiciones.append(Mantenimiento.fecha >= fecha_inicio)
     elif fecha_fin:
-        query = query.filter(Mantenimiento.fecha <= fecha_fin)
+        condiciones.append(Mantenimiento.fecha <= fecha_fin)
 
     if tipo:
-        query = query.filter(Mantenimiento.tipo == tipo)
+        condiciones.append(Mantenimiento.tipo == tipo)
     if estado:
-        query = query.filter(Mantenimiento.estado == estado)
+        condiciones.append(Mantenimiento.estado == estado)
+
+    if resumen:
+        # Camino rápido: tuplas -> dicts -> orjson, sin ORM ni response_model
+        consulta = consultas.mantenimientos_resumen().where(*condiciones).order_by(Mantenimiento.fecha.desc())
+        return await run_in_threadpool(respuestas.filas, await ejecutar(db, consulta))
 
-    mantenimientos = query.order_by(Mantenimiento.fecha.desc()).all()
-    return [normalize_enum(m) for m in mantenimientos]
+    consulta = consultas.mantenimientos_out(select(Mantenimiento)).where(*condiciones)
+    resultado = await ejecutar(db, consulta.order_by(Mantenimiento.fecha.desc()))
+    return await validada(LISTA, resultado.scalars().all())
 
 
 # ✅ 2. Crear mantenimiento
-@router.post("/", response_model=MantenimientoOut)
+@router.post("/", response_model=MantenimientoOut, dependencies=[Depends(solo_admin)])
 def crear_mantenimiento(mantenimiento: MantenimientoCreate, db: Session = Depends(get_db)):
     computador = db.query(Computador).filter(Computador.codigo == mantenimiento.computador_id).first()
     if not computador:
@@ -62,34 +120,220 @@ def crear_mantenimiento(mantenimiento: MantenimientoCreate, db: Session = Depend
     nuevo = Mantenimiento(**mantenimiento.dict())
     db.add(nuevo)
     db.commit()
+    cache_http.invalidar("mantenimientos")
+    cache_http.invalidar_fichas(mantenimiento.computador_id)
+    estadisticas.mantenimiento_cambiado(despues=(mantenimiento.tipo, mantenimiento.estado))
     db.refresh(nuevo)
-    return normalize_enum(nuevo)
+    eventos.publicar("mantenimientos", nuevo.id, "crear")
+    return nuevo
+
+
+# 📦 Crear muchos mantenimientos en una sola transacción
+@router.post("/batch", response_model=List[MantenimientoOut], dependencies=[Depends(solo_admin)])
+def crear_mantenimientos_lote(lote: MantenimientoLoteCreate, db: Session = Depends(get_db)):
+    validar_lote(lote.items)
+    verificar_computadores(db, (m.computador_id for m in lote.items))
+
+    nuevos = [Mantenimiento(**m.dict()) for m in lote.items]
+    db.add_all(nuevos)
+    # Un solo flush: SQLAlchemy agrupa los INSERT (con RETURNING donde el motor lo permite)
+    db.flush()
+    ids = [nuevo.id for nuevo in nuevos]
+    db.commit()
+
+    cache_http.invalidar("mantenimientos")
+    cache_http.invalidar_fichas(*{m.computador_id for m in lote.items})
+    eventos.publicar("mantenimientos", ids, "crear")
+    for m in lote.items:
+        estadisticas.mantenimiento_cambiado(despues=(m.tipo, m.estado))
+    # La versión definitiva y el computador de todo el lote en una consulta
+    return con_computador(db, ids)
+
+
+# 📦 Actualizar parcialmente muchos mantenimientos (solo los campos enviados)
+@router.patch("/batch", response_model=List[MantenimientoOut], dependencies=[Depends(solo_admin)])
+def actualizar_mantenimientos_lote(lote: MantenimientoLoteUpdate, db: Session = Depends(get_db)):
+    validar_lote(lote.items)
+
+    cambios = {}
+    for item in lote.items:
+        datos = item.dict(exclude_unset=True)
+        nulos = [k for k, v in datos.items() if v is None and k != "observaciones"]
+        if nulos:
+            raise HTTPException(status_code=400, detail=f"Mantenimiento {item.id}: {', '.join(nulos)} no puede ser nulo")
+        # Si el id se repite, gana el último
+        cambios.setdefault(item.id, {}).update(datos)
+
+    filas = db.execute(
+        select(*(getattr(Mantenimiento, c) for c in COLUMNAS)).where(Mantenimiento.id.in_(cambios))
+    ).all()
+    actuales = {fila.id: {c: _valor(getattr(fila, c)) for c in COLUMNAS} for fila in filas}
+    faltantes = sorted(set(cambios) - set(actuales))
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Mantenimientos no encontrados: {', '.join(map(str, faltantes[:20]))}")
+    verificar_computadores(db, (c["computador_id"] for c in cambios.values() if "computador_id" in c))
+
+    # UPDATE masivo por clave primaria (executemany agrupado por columnas)
+    filas = [datos for datos in cambios.values() if len(datos) > 1]
+    if filas:
+        extra = versionado.version_masiva(db, Mantenimiento)
+        db.execute(update(Mantenimiento), [dict(datos, **extra) for datos in filas])
+        db.commit()
+
+    cache_http.invalidar("mantenimientos")
+    cache_http.invalidar_fichas(*{
+        c for id, datos in cambios.items()
+        for c in (actuales[id]["computador_id"], datos.get("computador_id"))
+    })
+    eventos.publicar("mantenimientos", [id for id, datos in cambios.items() if len(datos) > 1], "actualizar")
+    for id, datos in cambios.items():
+        antes = actuales[id]
+        despues = dict(antes, **datos)
+        estadisticas.mantenimiento_cambiado(
+            (antes["tipo"], antes["estado"]), (despues["tipo"], despues["estado"])
+        )
+    return con_computador(db, list(cambios))
+
+
+# 🗓️ Programación recurrente: "todos los equipos del área X cada 90 días"
+@router.post("/programar", response_model=ProgramacionResultado, dependencies=[Depends(solo_admin)])
+def programar_mantenimientos(programa: ProgramacionMantenimiento, db: Session = Depends(get_db)):
+    if not programa.area and not programa.computadores:
+        raise HTTPException(status_code=400, detail="Indique un área o una lista de computadores")
+    if programa.cada_dias < 1:
+        raise HTTPException(status_code=400, detail="cada_dias debe ser mayor que cero")
+    if programa.fecha_fin < programa.fecha_inicio:
+        raise HTTPException(status_code=400, detail="fecha_fin no puede ser anterior a fecha_inicio")
+
+    consulta = select(Computador.codigo)
+    if programa.area:
+        consulta = consulta.join(Trabajador, Computador.trabajador_id == Trabajador.cedula).where(
+            Trabajador.area_de_trabajo == programa.area
+        )
+    if programa.computadores:
+        consulta = consulta.where(Computador.codigo.in_(programa.computadores))
+    if programa.computadores and not programa.area:
+        verificar_computadores(db, programa.computadores)
+    codigos = list(db.scalars(consulta))
+
+    fechas = []
+    fecha = programa.fecha_inicio
+    while fecha <= programa.fecha_fin:
+        fechas.append(fecha)
+        fecha += timedelta(days=programa.cada_dias)
+    if len(codigos) * len(fechas) > config.MANTENIMIENTOS_PROGRAMA_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"La programación generaría {len(codigos) * len(fechas)} mantenimientos (máximo {config.MANTENIMIENTOS_PROGRAMA_MAX})",
+        )
+
+    # No duplicar: equipos que ya tienen un mantenimiento de ese tipo en esa fecha
+    existentes = set()
+    if codigos:
+        existentes = {
+            (codigo, fecha)
+            for codigo, fecha in db.execute(
+                select(Mantenimiento.computador_id, Mantenimiento.fecha).where(
+                    Mantenimiento.computador_id.in_(codigos),
+                    Mantenimiento.fecha.between(programa.fecha_inicio, programa.fecha_fin),
+                    Mantenimiento.tipo == programa.tipo,
+                )
+            )
+        }
+
+    filas = [
+        {
+            "computador_id": codigo,
+            "fecha": fecha,
+            "hora": programa.hora,
+            "tipo": programa.tipo,
+            "observaciones": programa.observaciones,
+            "estado": "pendiente",
+        }
+        for codigo in codigos
+        for fecha in fechas
+        if (codigo, fecha) not in existentes
+    ]
+    if filas:
+        # INSERT masivo sin recuperar ids: executemany en una sola transacción
+        extra = versionado.version_masiva(db, Mantenimiento)
+        db.execute(insert(Mantenimiento), [dict(f, **extra) for f in filas])
+        db.commit()
+        cache_http.invalidar("mantenimientos")
+        cache_http.invalidar_fichas(*{f["computador_id"] for f in filas})
+        # El INSERT masivo no devuelve los ids
+        eventos.publicar("mantenimientos", None, "recargar")
+        for _ in filas:
+            estadisticas.mantenimiento_cambiado(despues=(programa.tipo, "pendiente"))
+
+    return {
+        "computadores": len(codigos),
+        "creados": len(filas),
+        "omitidos": len(codigos) * len(fechas) - len(filas),
+    }
 
 
 # ✅ 3. Actualizar mantenimiento
-@router.put("/{id}", response_model=MantenimientoOut)
-def actualizar_mantenimiento(id: int, mantenimiento: MantenimientoUpdate, db: Session = Depends(get_db)):
-    db_mantenimiento = db.query(Mantenimiento).filter(Mantenimiento.id == id).first()
-    if not db_mantenimiento:
-        raise HTTPException(status_code=404, detail="Mantenimiento no encontrado")
+@router.put("/{id}", response_model=MantenimientoOut, dependencies=[Depends(solo_admin)])
+def actualizar_mantenimiento(
+    id: int,
+    mantenimiento: MantenimientoUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, id, mantenimiento.dict(), if_match, response)
 
-    for key, value in mantenimiento.dict().items():
-        setattr(db_mantenimiento, key, value)
 
-    db.commit()
-    db.refresh(db_mantenimiento)
-    return normalize_enum(db_mantenimiento)
+# ✏️ Actualización parcial: solo se escriben los campos enviados
+@router.patch("/{id}", response_model=MantenimientoOut, dependencies=[Depends(solo_admin)])
+def modificar_mantenimiento(
+    id: int,
+    mantenimiento: MantenimientoCambios,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, id, mantenimiento.model_dump(exclude_unset=True), if_match, response)
+
+
+def guardar_cambios(db: Session, id: int, cambios: dict, if_match: Optional[str], response: Response) -> dict:
+    anteriores, fila = versionado.actualizar_condicional(
+        db, Mantenimiento, [Mantenimiento.id == id], cambios,
+        versiones=versionado.versiones_if_match(if_match),
+        previas=("tipo", "estado", "computador_id"),
+        no_encontrado="Mantenimiento no encontrado",
+    )
+    versionado.confirmar(db, fila)
+
+    cache_http.invalidar("mantenimientos")
+    cache_http.invalidar_fichas(*{anteriores.get("computador_id", fila["computador_id"]), fila["computador_id"]})
+    eventos.publicar("mantenimientos", id, "actualizar")
+    estadisticas.mantenimiento_cambiado(
+        (anteriores.get("tipo", fila["tipo"]), anteriores.get("estado", fila["estado"])),
+        (fila["tipo"], fila["estado"]),
+    )
+    response.headers["ETag"] = versionado.etag(fila["version"])
+    # RETURNING no trae la relación: el computador (y su responsable) en una consulta más
+    consulta = consultas.computadores_out(select(Computador)).where(Computador.codigo == fila["computador_id"])
+    return dict(fila, computador=db.scalars(consulta).first())
 
 
 # ✅ 4. Eliminar mantenimiento
-@router.delete("/{id}")
+@router.delete("/{id}", dependencies=[Depends(solo_admin)])
 def eliminar_mantenimiento(id: int, db: Session = Depends(get_db)):
     mantenimiento = db.query(Mantenimiento).filter(Mantenimiento.id == id).first()
     if not mantenimiento:
         raise HTTPException(status_code=404, detail="Mantenimiento no encontrado")
 
+    antes = (mantenimiento.tipo, mantenimiento.estado)
+    codigo = mantenimiento.computador_id
     db.delete(mantenimiento)
     db.commit()
+    cache_http.invalidar("mantenimientos")
+    cache_http.invalidar_fichas(codigo)
+    eventos.publicar("mantenimientos", id, "eliminar")
+    estadisticas.mantenimiento_cambiado(antes=antes)
     return {"mensaje": "✅ Mantenimiento eliminado exitosamente"}
 
 
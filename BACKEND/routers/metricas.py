@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import database
+import metricas
+
+router = APIRouter(tags=["Métricas"])
+
+
+# 📈 Métricas del proceso en formato de texto de Prometheus
+@router.get("/metrics", response_class=PlainTextResponse)
+def obtener_metricas():
+    engines = {"sync": database.engine}
+    if database._async_engine is not None:
+        engines["async"] = database._async_engine.sync_engine
+    cuerpo = metricas.registro.prometheus() + metricas.prometheus_pool(engines)
+    return PlainTextResponse(cuerpo, media_type="text/plain; version=0.0.4; charset=utf-8")
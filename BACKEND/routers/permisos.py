@@ -1,48 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from database import SessionLocal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import get_db, get_sesion, en_sesion
+from asincrono import ejecutar, validada
+from sesiones import solo_admin
+import cache_http
+import eventos
+import versionado
+import estadisticas
+import consultas
+import busqueda
+import respuestas
 from models import PermisoSalida, Computador, Trabajador
-from schemas import PermisoSalidaCreate, PermisoSalidaUpdate, PermisoSalidaOut
-from typing import List, Optional
+from schemas import PermisoSalidaCreate, PermisoSalidaUpdate, PermisoSalidaOut, PermisoResumen, DeltaPermisos
+from types import SimpleNamespace
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/permisos", tags=["Permisos"])
 
-# ✅ Dependencia DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Respuestas que se validan en el threadpool (asincrono.validada)
+DELTA = TypeAdapter(DeltaPermisos)
+LISTA = TypeAdapter(List[PermisoSalidaOut])
 
-# ✅ Normalizar Enum
-def normalize_enum(permiso: PermisoSalida):
-    if hasattr(permiso.estado, "value"):
-        permiso.estado = permiso.estado.value
-    return permiso
+# 🔎 Mantener el índice de búsqueda (incluye el nombre del trabajador)
+def indexar_permiso(permiso: PermisoSalida):
+    trabajador = permiso.trabajador
+    busqueda.indexar(busqueda.doc_permiso(
+        permiso,
+        trabajador.nombre if trabajador else "",
+        trabajador.apellidos if trabajador else "",
+    ))
 
 # ✅ 1. Listar permisos con filtros
-@router.get("/", response_model=List[PermisoSalidaOut])
-def listar_permisos(
+@router.get("/", response_model=Union[DeltaPermisos, List[PermisoSalidaOut], List[PermisoResumen]])
+async def listar_permisos(
     estado: Optional[str] = None,
     nombre: Optional[str] = None,
     apellido: Optional[str] = None,
-    db: Session = Depends(get_db)
+    since: Optional[int] = Query(None, ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    resumen: bool = Query(False, description="Filas planas (PermisoResumen), sin objetos anidados"),
+    db=Depends(get_sesion)
 ):
-    query = db.query(PermisoSalida).options(joinedload(PermisoSalida.computador), joinedload(PermisoSalida.trabajador))
+    if since is not None:
+        if estado or nombre or apellido or resumen:
+            raise HTTPException(status_code=400, detail="since no se combina con filtros")
+        delta = await en_sesion(db, lambda sesion: versionado.delta(
+            sesion, consultas.permisos_out(sesion.query(PermisoSalida)), PermisoSalida, since
+        ))
+        return await validada(DELTA, delta)
 
+    # Las dos consultas ya traen el JOIN con trabajadores que usan los filtros
+    condiciones = []
     if estado:
-        query = query.filter(PermisoSalida.estado == estado)
+        condiciones.append(PermisoSalida.estado == estado)
     if nombre:
-        query = query.join(PermisoSalida.trabajador).filter(Trabajador.nombre.ilike(f"%{nombre}%"))
+        condiciones.append(Trabajador.nombre.ilike(f"%{nombre}%"))
     if apellido:
-        query = query.join(PermisoSalida.trabajador).filter(Trabajador.apellidos.ilike(f"%{apellido}%"))
+        condiciones.append(Trabajador.apellidos.ilike(f"%{apellido}%"))
 
-    permisos = query.order_by(PermisoSalida.id.desc()).all()
-    return [normalize_enum(p) for p in permisos]
+    if resumen:
+        consulta = consultas.permisos_resumen().where(*condiciones).order_by(PermisoSalida.id.desc())
+        return await run_in_threadpool(respuestas.filas, await ejecutar(db, consulta))
+
+    consulta = consultas.permisos_out(select(PermisoSalida)).where(*condiciones)
+    resultado = await ejecutar(db, consulta.order_by(PermisoSalida.id.desc()))
+    return await validada(LISTA, resultado.scalars().all())
 
 # ✅ 2. Crear permiso
-@router.post("/", response_model=PermisoSalidaOut)
+@router.post("/", response_model=PermisoSalidaOut, dependencies=[Depends(solo_admin)])
 def crear_permiso(permiso: PermisoSalidaCreate, db: Session = Depends(get_db)):
     computador = db.query(Computador).filter(Computador.codigo == permiso.codigo_computador).first()
     trabajador = db.query(Trabajador).filter(Trabajador.cedula == permiso.cedula_trabajador).first()
@@ -55,30 +82,77 @@ def crear_permiso(permiso: PermisoSalidaCreate, db: Session = Depends(get_db)):
     nuevo = PermisoSalida(**permiso.dict())
     db.add(nuevo)
     db.commit()
+    cache_http.invalidar("permisos")
+    cache_http.invalidar_fichas(permiso.codigo_computador)
+    estadisticas.permiso_cambiado(despues=permiso.estado)
     db.refresh(nuevo)
-    return normalize_enum(nuevo)
+    eventos.publicar("permisos", nuevo.id, "crear")
+    indexar_permiso(nuevo)
+    return nuevo
 
 # ✅ 3. Actualizar permiso
-@router.put("/{id}", response_model=PermisoSalidaOut)
-def actualizar_permiso(id: int, permiso: PermisoSalidaUpdate, db: Session = Depends(get_db)):
-    db_permiso = db.query(PermisoSalida).filter(PermisoSalida.id == id).first()
-    if not db_permiso:
-        raise HTTPException(status_code=404, detail="Permiso no encontrado")
+@router.put("/{id}", response_model=PermisoSalidaOut, dependencies=[Depends(solo_admin)])
+def actualizar_permiso(
+    id: int,
+    permiso: PermisoSalidaUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    # Todos los campos son opcionales: PUT y PATCH escriben solo los enviados
+    return guardar_cambios(db, id, permiso.model_dump(exclude_unset=True), if_match, response)
 
-    for key, value in permiso.dict().items():
-        setattr(db_permiso, key, value)
+# ✏️ Actualización parcial
+@router.patch("/{id}", response_model=PermisoSalidaOut, dependencies=[Depends(solo_admin)])
+def modificar_permiso(
+    id: int,
+    permiso: PermisoSalidaUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, id, permiso.model_dump(exclude_unset=True), if_match, response)
 
-    db.commit()
-    db.refresh(db_permiso)
-    return normalize_enum(db_permiso)
+
+def guardar_cambios(db: Session, id: int, cambios: dict, if_match: Optional[str], response: Response) -> dict:
+    anteriores, fila = versionado.actualizar_condicional(
+        db, PermisoSalida, [PermisoSalida.id == id], cambios,
+        versiones=versionado.versiones_if_match(if_match),
+        previas=("estado", "codigo_computador"),
+        no_encontrado="Permiso no encontrado",
+    )
+    versionado.confirmar(db, fila)
+
+    cache_http.invalidar("permisos")
+    cache_http.invalidar_fichas(*{anteriores.get("codigo_computador", fila["codigo_computador"]), fila["codigo_computador"]})
+    eventos.publicar("permisos", id, "actualizar")
+    if "estado" in anteriores:
+        estadisticas.permiso_cambiado(anteriores["estado"], fila["estado"])
+    trabajador = db.get(Trabajador, fila["cedula_trabajador"])
+    busqueda.indexar(busqueda.doc_permiso(
+        SimpleNamespace(**fila),
+        trabajador.nombre if trabajador else "",
+        trabajador.apellidos if trabajador else "",
+    ))
+    response.headers["ETag"] = versionado.etag(fila["version"])
+    # RETURNING no trae las relaciones: el computador (y su responsable) en una consulta más
+    consulta = consultas.computadores_out(select(Computador)).where(Computador.codigo == fila["codigo_computador"])
+    return dict(fila, trabajador=trabajador, computador=db.scalars(consulta).first())
 
 # ✅ 4. Eliminar permiso
-@router.delete("/{id}")
+@router.delete("/{id}", dependencies=[Depends(solo_admin)])
 def eliminar_permiso(id: int, db: Session = Depends(get_db)):
     permiso = db.query(PermisoSalida).filter(PermisoSalida.id == id).first()
     if not permiso:
         raise HTTPException(status_code=404, detail="Permiso no encontrado")
 
+    antes = permiso.estado
+    codigo = permiso.codigo_computador
     db.delete(permiso)
     db.commit()
+    cache_http.invalidar("permisos")
+    cache_http.invalidar_fichas(codigo)
+    eventos.publicar("permisos", id, "eliminar")
+    estadisticas.permiso_cambiado(antes=antes)
+    busqueda.quitar("permiso", id)
     return {"mensaje": "✅ Permiso eliminado exitosamente"}
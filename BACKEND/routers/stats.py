@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from estadisticas import contadores
+from schemas import EstadisticasOut
+
+router = APIRouter(prefix="/stats", tags=["Estadísticas"])
+
+
+# ✅ Resumen para el tablero: contadores en memoria, sin recorrer las tablas
+@router.get("/", response_model=EstadisticasOut)
+async def obtener_estadisticas():
+    # Solo consulta la base si hubo una cascada desde la última reconciliación
+    return await run_in_threadpool(contadores.resumen)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from sesiones import solo_admin
+import tareas
+import almacen_fotos
+from models import Tarea
+from schemas import TareaOut
+
+router = APIRouter(prefix="/jobs", tags=["Tareas"], dependencies=[Depends(solo_admin)])
+
+
+# 🧹 Recorrido del recolector de fotos huérfanas (una tarea por fragmento del almacén)
+@router.post("/barrer-fotos", response_model=TareaOut, status_code=202)
+def barrer_fotos(db: Session = Depends(get_db)):
+    tarea = almacen_fotos.programar_barrido(db)
+    db.commit()
+    return tareas.como_dict(tarea)
+
+
+# 🔍 Estado de una tarea (p. ej. el job_id de un borrado en segundo plano)
+@router.get("/{id}", response_model=TareaOut)
+def obtener_tarea(id: int, db: Session = Depends(get_db)):
+    tarea = db.get(Tarea, id)
+    if not tarea:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return tareas.como_dict(tarea)
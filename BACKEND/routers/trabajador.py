@@ -1,86 +1,169 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Query, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Trabajador
-from schemas import TrabajadorCreate, TrabajadorUpdate, TrabajadorOut
-import os
-import shutil
+from database import get_db, get_sesion, en_sesion
+from asincrono import ejecutar, validada
+from sesiones import solo_admin
+import cache_http
+import eventos
+import versionado
+import estadisticas
+import busqueda
+import config
+import tareas
+from almacen_fotos import guardar_foto, eliminar_foto_si_huerfana, foto_reemplazada, programar_eliminacion
+from models import Trabajador, Computador, PermisoSalida, AsignarUsuario
+from schemas import TrabajadorCreate, TrabajadorUpdate, TrabajadorCambios, TrabajadorOut, DeltaTrabajadores
+from types import SimpleNamespace
+from typing import Optional, Union
 
 router = APIRouter()
 
-# Carpeta para fotos
-FOTOS_DIR = os.path.join(os.path.dirname(__file__), "..", "fotos")
-os.makedirs(FOTOS_DIR, exist_ok=True)
-
-# Dependencia DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Respuestas que se validan en el threadpool (asincrono.validada)
+DELTA = TypeAdapter(DeltaTrabajadores)
+LISTA = TypeAdapter(list[TrabajadorOut])
 
 # ✅ Listar trabajadores
-@router.get("/trabajadores/", response_model=list[TrabajadorOut])
-def listar_trabajadores(db: Session = Depends(get_db)):
-    return db.query(Trabajador).all()
+@router.get("/trabajadores/", response_model=Union[DeltaTrabajadores, list[TrabajadorOut]])
+async def listar_trabajadores(
+    since: Optional[int] = Query(None, ge=0, description="Solo lo cambiado / borrado después de esta versión"),
+    db=Depends(get_sesion),
+):
+    if since is not None:
+        delta = await en_sesion(db, lambda sesion: versionado.delta(sesion, sesion.query(Trabajador), Trabajador, since))
+        return await validada(DELTA, delta)
+    resultado = await ejecutar(db, select(Trabajador))
+    return await validada(LISTA, resultado.scalars().all())
 
 # ✅ Crear trabajador
-@router.post("/trabajadores/", response_model=TrabajadorOut)
+@router.post("/trabajadores/", response_model=TrabajadorOut, dependencies=[Depends(solo_admin)])
 def crear_trabajador(trabajador: TrabajadorCreate, db: Session = Depends(get_db)):
     nuevo = Trabajador(**trabajador.dict())
     db.add(nuevo)
     db.commit()
+    cache_http.invalidar("trabajadores")
+    eventos.publicar("trabajadores", trabajador.cedula, "crear")
     db.refresh(nuevo)
+    busqueda.indexar(busqueda.doc_trabajador(nuevo))
     return nuevo
 
 # ✅ Actualizar trabajador
-@router.put("/trabajadores/{cedula}", response_model=TrabajadorOut)
-def actualizar_trabajador(cedula: str, trabajador: TrabajadorUpdate, db: Session = Depends(get_db)):
-    db_trabajador = db.query(Trabajador).filter(Trabajador.cedula == cedula).first()
-    if not db_trabajador:
-        raise HTTPException(status_code=404, detail="Trabajador no encontrado")
+@router.put("/trabajadores/{cedula}", response_model=TrabajadorOut, dependencies=[Depends(solo_admin)])
+def actualizar_trabajador(
+    cedula: str,
+    trabajador: TrabajadorUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, cedula, trabajador.dict(), if_match, response)
 
-    for key, value in trabajador.dict().items():
-        setattr(db_trabajador, key, value)
+# ✏️ Actualización parcial: solo se escriben los campos enviados
+@router.patch("/trabajadores/{cedula}", response_model=TrabajadorOut, dependencies=[Depends(solo_admin)])
+def modificar_trabajador(
+    cedula: str,
+    trabajador: TrabajadorCambios,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    return guardar_cambios(db, cedula, trabajador.model_dump(exclude_unset=True), if_match, response)
 
-    db.commit()
-    db.refresh(db_trabajador)
-    return db_trabajador
+
+def guardar_cambios(db: Session, cedula: str, cambios: dict, if_match: Optional[str], response: Response) -> dict:
+    anteriores, fila = versionado.actualizar_condicional(
+        db, Trabajador, [Trabajador.cedula == cedula], cambios,
+        versiones=versionado.versiones_if_match(if_match),
+        previas=("foto",),
+        no_encontrado="Trabajador no encontrado",
+    )
+    if "foto" in anteriores:
+        foto_reemplazada(db, anteriores["foto"], fila["foto"])
+    versionado.confirmar(db, fila)
+
+    cache_http.invalidar("trabajadores")
+    eventos.publicar("trabajadores", cedula, "actualizar")
+    busqueda.indexar(busqueda.doc_trabajador(SimpleNamespace(**fila)))
+    if "nombre" in cambios or "apellidos" in cambios:
+        # Los permisos se buscan también por el nombre del trabajador
+        busqueda.indexar_permisos_de_trabajador(db, cedula)
+    response.headers["ETag"] = versionado.etag(fila["version"])
+    return fila
 
 # ✅ Eliminar trabajador
-@router.delete("/trabajadores/{cedula}")
+@router.delete("/trabajadores/{cedula}", dependencies=[Depends(solo_admin)])
 def eliminar_trabajador(cedula: str, db: Session = Depends(get_db)):
     trabajador = db.query(Trabajador).filter(Trabajador.cedula == cedula).first()
     if not trabajador:
         raise HTTPException(status_code=404, detail="Trabajador no encontrado")
 
-    # Eliminar foto física si existe
-    if trabajador.foto and trabajador.foto.startswith("http://192.168.1.233:8000/fotos/"):
-        nombre_foto = trabajador.foto.split("/fotos/")[-1]
-        ruta_foto = os.path.join(FOTOS_DIR, nombre_foto)
-        if os.path.exists(ruta_foto):
-            os.remove(ruta_foto)
+    # Con muchos dependientes la cascada se hace por lotes en segundo plano
+    dependientes = contar_dependientes(db, cedula)
+    if dependientes >= config.TAREAS_CASCADA_MIN:
+        tarea = tareas.encolar(db, "eliminar_trabajador", {"cedula": cedula})
+        db.commit()
+        return JSONResponse(status_code=202, content={"mensaje": "Eliminación en curso", "job_id": tarea.id})
 
+    # Eliminar foto física si ya no la usa nadie (tras el commit)
+    if trabajador.foto:
+        programar_eliminacion(db, trabajador.foto)
     db.delete(trabajador)
     db.commit()
+    trabajador_eliminado(cedula, dependientes)
     return {"mensaje": "Trabajador eliminado"}
 
-# ✅ Subir foto
-@router.post("/trabajadores/upload-foto/")
-def subir_foto(foto: UploadFile = File(...)):
-    ruta_destino = os.path.join(FOTOS_DIR, foto.filename)
-    with open(ruta_destino, "wb") as buffer:
-        shutil.copyfileobj(foto.file, buffer)
 
-    url_foto = f"http://192.168.1.233:8000/fotos/{foto.filename}"
-    return {"foto_url": url_foto}
+def contar_dependientes(db: Session, cedula: str) -> int:
+    return (
+        db.query(func.count()).select_from(PermisoSalida).filter(PermisoSalida.cedula_trabajador == cedula).scalar()
+        + db.query(func.count()).select_from(Computador).filter(Computador.trabajador_id == cedula).scalar()
+    )
+
+
+def trabajador_eliminado(cedula: str, dependientes: int):
+    cache_http.invalidar("trabajadores", "computadores", "permisos", "asignar_usuario")
+    eventos.publicar("trabajadores", cedula, "eliminar")
+    if dependientes:
+        # Sus computadores quedan sin asignar y sus permisos se borran: aviso en bloque
+        eventos.publicar("computadores", None, "recargar")
+        eventos.publicar("permisos", None, "recargar")
+    estadisticas.contadores.invalidar()
+    # La cascada borra sus permisos; los computadores solo quedan sin asignar
+    busqueda.quitar("trabajador", cedula, relacionados=True)
+
+
+@tareas.tarea("eliminar_trabajador")
+def _tarea_eliminar_trabajador(db: Session, datos: dict):
+    cedula = datos["cedula"]
+    cambios = {
+        "permisos": tareas.borrar_por_lotes(db, PermisoSalida, PermisoSalida.cedula_trabajador == cedula),
+        "asignaciones": tareas.borrar_por_lotes(db, AsignarUsuario, AsignarUsuario.trabajador_id == cedula),
+        "computadores_sin_asignar": tareas.actualizar_por_lotes(
+            db, Computador, {"trabajador_id": None}, Computador.trabajador_id == cedula
+        ),
+    }
+    trabajador = db.get(Trabajador, cedula)
+    if trabajador is not None:
+        foto = trabajador.foto
+        db.delete(trabajador)
+        db.commit()
+        eliminar_foto_si_huerfana(db, foto)
+    trabajador_eliminado(cedula, cambios["permisos"] + cambios["computadores_sin_asignar"])
+    return cambios
+
+# ✅ Subir foto
+@router.post("/trabajadores/upload-foto/", dependencies=[Depends(solo_admin)])
+async def subir_foto(foto: UploadFile = File(...)):
+    return await guardar_foto(foto)
 
 
 # ✅ Obtener un trabajador por su cédula
 @router.get("/trabajadores/{cedula}", response_model=TrabajadorOut)
-def obtener_trabajador(cedula: str, db: Session = Depends(get_db)):
-    trabajador = db.query(Trabajador).filter(Trabajador.cedula == cedula).first()
+async def obtener_trabajador(cedula: str, response: Response, db=Depends(get_sesion)):
+    trabajador = (await ejecutar(db, select(Trabajador).where(Trabajador.cedula == cedula))).scalars().first()
     if not trabajador:
         raise HTTPException(status_code=404, detail="Trabajador no encontrado")
+    response.headers["ETag"] = versionado.etag(trabajador.version)
     return trabajador
@@ -1,54 +1,88 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import get_db, get_sesion, en_sesion
 from models import Usuario, RolEnum
-from schemas import UsuarioCreate, UsuarioLogin, UsuarioOut
-import hashlib
+from schemas import UsuarioCreate, UsuarioLogin, UsuarioOut, LoginOut, RefreshIn
+from typing import Optional
+from seguridad import hash_password_async, verificar_login, necesita_rehash, cache_logins
+from sesiones import emitir_tokens, decodificar_token, claims_actuales, revocados, solo_admin
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def hash_password(password: str):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-@router.post("/usuarios/registrar", response_model=UsuarioOut)
-def registrar_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
-    existe = db.query(Usuario).filter(Usuario.username == usuario.username).first()
+@router.post("/usuarios/registrar", response_model=UsuarioOut, dependencies=[Depends(solo_admin)])
+async def registrar_usuario(usuario: UsuarioCreate, db=Depends(get_sesion)):
+    existe = await en_sesion(
+        db, lambda sesion: sesion.query(Usuario).filter(Usuario.username == usuario.username).first()
+    )
     if existe:
         raise HTTPException(status_code=400, detail="El usuario ya existe")
 
+    # El KDF va al pool acotado de seguridad, no al threadpool general
     nuevo = Usuario(
         username=usuario.username,
-        password=hash_password(usuario.password),
+        password=await hash_password_async(usuario.password),
         rol=usuario.rol
     )
-    db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
-    return nuevo
 
-@router.post("/usuarios/login", response_model=UsuarioOut)
-def login(usuario: UsuarioLogin, db: Session = Depends(get_db)):
-    user = db.query(Usuario).filter(Usuario.username == usuario.username).first()
-    if not user or user.password != hash_password(usuario.password):
+    def guardar(sesion):
+        sesion.add(nuevo)
+        sesion.commit()
+        sesion.refresh(nuevo)
+        return UsuarioOut.model_validate(nuevo)
+
+    return await en_sesion(db, guardar)
+
+@router.post("/usuarios/login", response_model=LoginOut)
+async def login(usuario: UsuarioLogin, db=Depends(get_sesion)):
+    # La consulta va al threadpool (o a run_sync en modo async) y el KDF a su propio pool acotado
+    user = await en_sesion(
+        db, lambda sesion: sesion.query(Usuario).filter(Usuario.username == usuario.username).first()
+    )
+    guardado = user.password if user else None
+    if not await verificar_login(usuario.username, usuario.password, guardado) or not user:
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
-    return user
 
-@router.get("/usuarios/", response_model=list[UsuarioOut])
+    respuesta = UsuarioOut.model_validate(user)
+
+    # Hash legado (SHA-256) o con parámetros viejos: se actualiza de forma transparente
+    if necesita_rehash(user.password):
+        nuevo_hash = await hash_password_async(usuario.password)
+        user.password = nuevo_hash
+        await en_sesion(db, lambda sesion: sesion.commit())
+        cache_logins.recordar(usuario.username, usuario.password, nuevo_hash)
+    return LoginOut(**respuesta.model_dump(), **emitir_tokens(respuesta.username, respuesta.rol))
+
+# ✅ Renovar tokens con el refresh token (se revoca el anterior)
+@router.post("/usuarios/refresh", response_model=LoginOut)
+def refrescar(datos: RefreshIn, db: Session = Depends(get_db)):
+    claims = decodificar_token(datos.refresh_token, "refresh")
+    # Única consulta de la sesión: recoge cambios de rol o usuarios eliminados
+    user = db.query(Usuario).filter(Usuario.username == claims["sub"]).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    revocados.revocar(claims["jti"], claims["exp"])
+    respuesta = UsuarioOut.model_validate(user)
+    return LoginOut(**respuesta.model_dump(), **emitir_tokens(respuesta.username, respuesta.rol))
+
+# ✅ Cerrar sesión: revoca el access token (y el refresh si se envía)
+@router.post("/usuarios/logout")
+def logout(datos: Optional[RefreshIn] = None, claims: dict = Depends(claims_actuales)):
+    revocados.revocar(claims["jti"], claims["exp"])
+    if datos:
+        refresh = decodificar_token(datos.refresh_token, "refresh")
+        revocados.revocar(refresh["jti"], refresh["exp"])
+    return {"mensaje": "Sesión cerrada"}
+
+@router.get("/usuarios/", response_model=list[UsuarioOut], dependencies=[Depends(solo_admin)])
 def listar_usuarios(db: Session = Depends(get_db)):
     return db.query(Usuario).all()
 
-@router.delete("/usuarios/{username}")
+@router.delete("/usuarios/{username}", dependencies=[Depends(solo_admin)])
 def eliminar_usuario(username: str, db: Session = Depends(get_db)):
     user = db.query(Usuario).filter(Usuario.username == username).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     db.delete(user)
     db.commit()
+    cache_logins.olvidar(username)
     return {"mensaje": "Usuario eliminado"}
@@ -1,6 +1,16 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Literal,List
-from datetime import date, time
+from pydantic import BaseModel, BeforeValidator, EmailStr
+from typing import Annotated, Optional, Literal, List, Dict
+from datetime import date, time, datetime
+from enum import Enum
+
+
+# Las columnas Enum de SQLAlchemy llegan como miembros del enum: se validan por su valor
+def _valor_enum(valor):
+    return valor.value if isinstance(valor, Enum) else valor
+
+TipoMantenimiento = Annotated[Literal["preventivo", "correctivo"], BeforeValidator(_valor_enum)]
+EstadoMantenimiento = Annotated[Literal["pendiente", "hecho"], BeforeValidator(_valor_enum)]
+EstadoPermiso = Annotated[Literal["activo", "inactivo"], BeforeValidator(_valor_enum)]
 
 class UsuarioCreate(BaseModel):
     username: str
@@ -19,6 +29,15 @@ class UsuarioOut(BaseModel):
         "from_attributes": True
     }
 
+class LoginOut(UsuarioOut):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expira_en: int
+
+class RefreshIn(BaseModel):
+    refresh_token: str
+
 class DetalleBase(BaseModel):
     procesador: str
     ram: str
@@ -30,8 +49,19 @@ class DetalleBase(BaseModel):
 class DetalleCreate(DetalleBase):
     codigo_computador: str
 
+class DetalleCambios(BaseModel):
+    # PATCH: solo viajan (y se escriben) los campos enviados
+    codigo_computador: Optional[str] = None
+    procesador: Optional[str] = None
+    ram: Optional[str] = None
+    almacenamiento: Optional[str] = None
+    sistema_operativo: Optional[str] = None
+    observaciones: Optional[str] = None
+    serial: Optional[str] = None
+
 class DetalleOut(DetalleCreate):
     id: int
+    version: Optional[int] = None  # ETag para If-Match
 
     model_config = {
         "from_attributes": True
@@ -54,8 +84,20 @@ class TrabajadorCreate(TrabajadorBase):
 class TrabajadorUpdate(TrabajadorBase):
     pass
 
+class TrabajadorCambios(BaseModel):
+    nombre: Optional[str] = None
+    apellidos: Optional[str] = None
+    cargo: Optional[str] = None
+    area_de_trabajo: Optional[str] = None
+    edad: Optional[int] = None
+    residencia: Optional[str] = None
+    telefono: Optional[str] = None
+    correo: Optional[EmailStr] = None
+    foto: Optional[str] = None
+
 class TrabajadorOut(TrabajadorBase):
     cedula: str
+    version: Optional[int] = None
 
     model_config = {
         "from_attributes": True
@@ -69,6 +111,7 @@ class AsignarUsuarioOut(BaseModel):
     id: int
     usuario_id: str
     trabajador_id: str
+    version: Optional[int] = None
 
     model_config = {
         "from_attributes": True
@@ -90,20 +133,31 @@ class ComputadorCreate(ComputadorBase):
 class ComputadorUpdate(ComputadorBase):
     pass
 
+class ComputadorCambios(BaseModel):
+    nombre: Optional[str] = None
+    marca: Optional[str] = None
+    trabajador_id: Optional[str] = None
+    foto: Optional[str] = None
+
 class ComputadorOut(ComputadorCreate):
+    version: Optional[int] = None
     trabajador: Optional[TrabajadorOut] = None
 
     model_config = {
         "from_attributes": True
     }
 
+class ComputadorPagina(BaseModel):
+    items: List[dict]
+    siguiente_cursor: Optional[str] = None
+
 class MantenimientoBase(BaseModel):
     computador_id: str
     fecha: date
     hora: time
-    tipo: Literal["preventivo", "correctivo"]
+    tipo: TipoMantenimiento
     observaciones: Optional[str] = None
-    estado: Literal["pendiente", "hecho"]
+    estado: EstadoMantenimiento
 
 class MantenimientoCreate(MantenimientoBase):
     pass
@@ -113,21 +167,68 @@ class MantenimientoUpdate(MantenimientoBase):
 
 class MantenimientoOut(MantenimientoBase):
     id: int
+    version: Optional[int] = None
     computador: Optional[ComputadorOut] = None  # ✅ incluir datos del computador
 
     model_config = {
         "from_attributes": True
     }
 
+class MantenimientoResumen(MantenimientoBase):
+    # ?resumen=true: filas planas (sin el computador anidado), sin pasar por el ORM
+    id: int
+    version: Optional[int] = None
+    computador_nombre: Optional[str] = None
+
+
+class MantenimientoFicha(MantenimientoBase):
+    id: int
+
+class MantenimientoLoteCreate(BaseModel):
+    items: List[MantenimientoCreate]
+
+class MantenimientoCambios(BaseModel):
+    computador_id: Optional[str] = None
+    fecha: Optional[date] = None
+    hora: Optional[time] = None
+    tipo: Optional[Literal["preventivo", "correctivo"]] = None
+    observaciones: Optional[str] = None
+    estado: Optional[Literal["pendiente", "hecho"]] = None
+
+class MantenimientoParcial(MantenimientoCambios):
+    id: int
+
+class MantenimientoLoteUpdate(BaseModel):
+    items: List[MantenimientoParcial]
+
+class ProgramacionMantenimiento(BaseModel):
+    # Alcance: los equipos de un área (la del trabajador asignado) y/o una lista de códigos
+    area: Optional[str] = None
+    computadores: Optional[List[str]] = None
+    fecha_inicio: date
+    fecha_fin: date
+    cada_dias: int = 90
+    hora: time = time(8, 0)
+    tipo: Literal["preventivo", "correctivo"] = "preventivo"
+    observaciones: Optional[str] = None
+
+class ProgramacionResultado(BaseModel):
+    computadores: int
+    creados: int
+    omitidos: int
+
 
 class PermisoSalidaBase(BaseModel):
     codigo_computador: str
     cedula_trabajador: str
-    estado: Literal["activo", "inactivo"]
+    estado: EstadoPermiso
 
 class PermisoSalidaCreate(PermisoSalidaBase):
     pass
 
+class PermisoFicha(PermisoSalidaBase):
+    id: int
+
 class PermisoSalidaUpdate(BaseModel):
     codigo_computador: Optional[str] = None
     cedula_trabajador: Optional[str] = None
@@ -135,9 +236,96 @@ class PermisoSalidaUpdate(BaseModel):
 
 class PermisoSalidaOut(PermisoSalidaBase):
     id: int
+    version: Optional[int] = None
     computador: Optional[ComputadorOut] = None
     trabajador: Optional[TrabajadorOut] = None
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class PermisoResumen(PermisoSalidaBase):
+    id: int
+    version: Optional[int] = None
+    computador_nombre: Optional[str] = None
+    trabajador_nombre: Optional[str] = None
+    trabajador_apellidos: Optional[str] = None
+
+
+class ErrorFila(BaseModel):
+    fila: int
+    errores: List[str]
+
+class ImportacionResultado(BaseModel):
+    procesadas: int = 0
+    insertadas: int = 0
+    actualizadas: int = 0
+    con_error: int = 0
+    errores: List[ErrorFila] = []
+
+
+class EstadisticasOut(BaseModel):
+    computadores_total: int
+    computadores_por_marca: Dict[str, int]
+    computadores_sin_asignar: int
+    mantenimientos_pendientes: int
+    mantenimientos_hechos: int
+    mantenimientos_preventivos: int
+    mantenimientos_correctivos: int
+    permisos_activos: int
+    permisos_inactivos: int
+    actualizado: Optional[float] = None
+
+
+class ResultadoBusqueda(BaseModel):
+    tipo: Literal["trabajador", "computador", "detalle", "permiso"]
+    clave: str
+    titulo: str
+    subtitulo: Optional[str] = None
+    puntaje: float
+
+
+class FichaComputador(BaseModel):
+    # Con ?fields= solo viajan las secciones pedidas
+    computador: Optional[ComputadorCreate] = None
+    trabajador: Optional[TrabajadorOut] = None
+    detalle: Optional[DetalleOut] = None
+    mantenimientos: Optional[List[MantenimientoFicha]] = None
+    permisos_activos: Optional[List[PermisoFicha]] = None
+
+
+class TareaOut(BaseModel):
+    id: int
+    tipo: str
+    estado: Literal["pendiente", "en_curso", "hecha", "fallida"]
+    intentos: int
+    max_intentos: int
+    creada: datetime
+    actualizada: datetime
+    disponible_desde: datetime
+    resultado: Optional[dict] = None
+    error: Optional[str] = None
+
+
+# Sincronización incremental (?since=): filas cambiadas + claves borradas
+class DeltaBase(BaseModel):
+    version: int  # se manda como `since` en la próxima llamada
+    eliminados: List[str]
+
+class DeltaComputadores(DeltaBase):
+    items: List[ComputadorOut]
+
+class DeltaTrabajadores(DeltaBase):
+    items: List[TrabajadorOut]
+
+class DeltaDetalles(DeltaBase):
+    items: List[DetalleOut]
+
+class DeltaMantenimientos(DeltaBase):
+    items: List[MantenimientoOut]
+
+class DeltaPermisos(DeltaBase):
+    items: List[PermisoSalidaOut]
+
+class DeltaAsignaciones(DeltaBase):
+    items: List[AsignarUsuarioOut]
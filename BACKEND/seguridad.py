@@ -0,0 +1,181 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi es opcional; scrypt viene con hashlib
+    PasswordHasher = None
+
+# 🔐 Hash de contraseñas: scrypt/argon2 con sal, comparación en tiempo constante
+
+_LEGADO_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+# Pool acotado: el KDF es CPU y no debe quedarse con todos los hilos del servidor
+_pool = ThreadPoolExecutor(max_workers=config.PASSWORD_WORKERS, thread_name_prefix="kdf")
+
+
+def _b64(datos: bytes) -> str:
+    return base64.b64encode(datos).decode().rstrip("=")
+
+
+def _unb64(texto: str) -> bytes:
+    return base64.b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _scrypt(password: str, sal: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=sal, n=n, r=r, p=p, dklen=32,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+    )
+
+
+def _argon2(**parametros):
+    return PasswordHasher(
+        time_cost=parametros.get("time_cost", config.ARGON2_TIME_COST),
+        memory_cost=parametros.get("memory_cost", config.ARGON2_MEMORY_COST),
+        parallelism=parametros.get("parallelism", config.ARGON2_PARALLELISM),
+    )
+
+
+def hash_password(password: str, algoritmo: str = None, **parametros) -> str:
+    algoritmo = algoritmo or config.PASSWORD_ALGORITMO
+    if algoritmo == "argon2":
+        if PasswordHasher is None:
+            raise RuntimeError("PASSWORD_ALGORITMO=argon2 requiere instalar argon2-cffi")
+        return _argon2(**parametros).hash(password)
+
+    n = parametros.get("n", config.SCRYPT_N)
+    r = parametros.get("r", config.SCRYPT_R)
+    p = parametros.get("p", config.SCRYPT_P)
+    sal = secrets.token_bytes(16)
+    return f"scrypt${n}${r}${p}${_b64(sal)}${_b64(_scrypt(password, sal, n, r, p))}"
+
+
+def verificar_password(password: str, guardado: str) -> bool:
+    if not guardado:
+        return False
+    if guardado.startswith("scrypt$"):
+        try:
+            _, n, r, p, sal, esperado = guardado.split("$")
+            calculado = _scrypt(password, _unb64(sal), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(calculado, _unb64(esperado))
+    if guardado.startswith("$argon2"):
+        if PasswordHasher is None:
+            return False
+        try:
+            return PasswordHasher().verify(guardado, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    if _LEGADO_SHA256.match(guardado):
+        # Filas antiguas: SHA-256 sin sal (se rehashean en el siguiente login)
+        calculado = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(calculado, guardado)
+    return False
+
+
+def necesita_rehash(guardado: str) -> bool:
+    """True si el hash es legado o se hizo con parámetros distintos a los actuales."""
+    if config.PASSWORD_ALGORITMO == "argon2" and PasswordHasher is not None:
+        if not guardado.startswith("$argon2"):
+            return True
+        try:
+            return _argon2().check_needs_rehash(guardado)
+        except InvalidHashError:
+            return True
+    if not guardado.startswith("scrypt$"):
+        return True
+    return guardado.split("$")[1:4] != [str(config.SCRYPT_N), str(config.SCRYPT_R), str(config.SCRYPT_P)]
+
+
+# Hash de referencia para no revelar por tiempo de respuesta si un usuario existe
+_HASH_FICTICIO = None
+
+
+def verificar_usuario_inexistente(password: str) -> bool:
+    global _HASH_FICTICIO
+    if _HASH_FICTICIO is None:
+        _HASH_FICTICIO = hash_password(secrets.token_hex(8))
+    verificar_password(password, _HASH_FICTICIO)
+    return False
+
+
+async def _en_pool(funcion, *args):
+    return await asyncio.wrap_future(_pool.submit(funcion, *args))
+
+
+async def hash_password_async(password: str) -> str:
+    return await _en_pool(hash_password, password)
+
+
+class CacheLogins:
+    """Recuerda logins ya verificados para no repetir el KDF en cada intento.
+
+    Solo guarda un HMAC de la contraseña con una clave aleatoria del proceso,
+    y la entrada deja de valer si cambia el hash almacenado en la base de datos.
+    """
+
+    def __init__(self, ttl: int, maximo: int):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._clave = secrets.token_bytes(32)
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _huella(self, username: str, password: str) -> bytes:
+        return hmac.new(self._clave, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+    def valido(self, username: str, password: str, guardado: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        with self._lock:
+            entrada = self._datos.get(username)
+        if entrada is None:
+            return False
+        huella, hash_guardado, expira = entrada
+        return (
+            expira > time.monotonic()
+            and hash_guardado == guardado
+            and hmac.compare_digest(huella, self._huella(username, password))
+        )
+
+    def recordar(self, username: str, password: str, guardado: str):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._datos[username] = (self._huella(username, password), guardado, time.monotonic() + self.ttl)
+            self._datos.move_to_end(username)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def olvidar(self, username: str):
+        with self._lock:
+            self._datos.pop(username, None)
+
+
+cache_logins = CacheLogins(config.LOGIN_CACHE_TTL, config.LOGIN_CACHE_MAX)
+
+
+async def verificar_login(username: str, password: str, guardado) -> bool:
+    """Verificación completa del login; el KDF corre en el pool acotado."""
+    if guardado is None:
+        return await _en_pool(verificar_usuario_inexistente, password)
+    if cache_logins.valido(username, password, guardado):
+        return True
+    if not await _en_pool(verificar_password, password, guardado):
+        return False
+    cache_logins.recordar(username, password, guardado)
+    return True
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+import config
+from models import RolEnum
+from schemas import UsuarioOut
+
+logger = logging.getLogger(__name__)
+
+# 🎫 Tokens firmados (formato JWT, HS256) para no consultar la base en cada petición
+
+if config.TOKEN_SECRET:
+    _SECRETO = config.TOKEN_SECRET.encode()
+else:
+    _SECRETO = secrets.token_bytes(32)
+    logger.warning("TOKEN_SECRET no definido: los tokens solo valen en este proceso")
+
+_CABECERA = {"alg": "HS256", "typ": "JWT"}
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _b64(datos: bytes) -> str:
+    return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+
+def _unb64(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _firmar(contenido: str) -> str:
+    return _b64(hmac.new(_SECRETO, contenido.encode(), hashlib.sha256).digest())
+
+
+class ListaRevocacion:
+    """jti revocados hasta que su token expira por sí solo."""
+
+    def __init__(self):
+        self._revocados = {}
+        self._lock = threading.Lock()
+
+    def revocar(self, jti: str, expira: int):
+        if not config.TOKEN_REVOCACION:
+            return
+        ahora = time.time()
+        with self._lock:
+            self._revocados[jti] = expira
+            # Limpieza perezosa de los que ya expiraron
+            for clave in [j for j, exp in self._revocados.items() if exp < ahora]:
+                del self._revocados[clave]
+
+    def revocado(self, jti: str) -> bool:
+        with self._lock:
+            return jti in self._revocados
+
+
+revocados = ListaRevocacion()
+
+
+def crear_token(username: str, rol: str, tipo: str = "access") -> str:
+    ahora = int(time.time())
+    ttl = config.ACCESS_TOKEN_TTL if tipo == "access" else config.REFRESH_TOKEN_TTL
+    claims = {
+        "sub": username,
+        "rol": rol,
+        "typ": tipo,
+        "iat": ahora,
+        "exp": ahora + ttl,
+        "jti": secrets.token_urlsafe(12),
+    }
+    contenido = (
+        _b64(json.dumps(_CABECERA, separators=(",", ":")).encode())
+        + "."
+        + _b64(json.dumps(claims, separators=(",", ":")).encode())
+    )
+    return f"{contenido}.{_firmar(contenido)}"
+
+
+def decodificar_token(token: str, tipo: str = "access") -> dict:
+    try:
+        cabecera, cuerpo, firma = token.split(".")
+        if not hmac.compare_digest(firma, _firmar(f"{cabecera}.{cuerpo}")):
+            raise ValueError("firma")
+        if json.loads(_unb64(cabecera)) != _CABECERA:
+            raise ValueError("cabecera")
+        claims = json.loads(_unb64(cuerpo))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=401, detail="Token inválido", headers={"WWW-Authenticate": "Bearer"})
+
+    if claims.get("typ") != tipo:
+        raise HTTPException(status_code=401, detail="Tipo de token incorrecto", headers={"WWW-Authenticate": "Bearer"})
+    if claims.get("exp", 0) < time.time():
+        raise HTTPException(status_code=401, detail="Token expirado", headers={"WWW-Authenticate": "Bearer"})
+    if revocados.revocado(claims.get("jti", "")):
+        raise HTTPException(status_code=401, detail="Token revocado", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+
+def emitir_tokens(username: str, rol: str) -> dict:
+    return {
+        "access_token": crear_token(username, rol, "access"),
+        "refresh_token": crear_token(username, rol, "refresh"),
+        "token_type": "bearer",
+        "expira_en": config.ACCESS_TOKEN_TTL,
+    }
+
+
+# ✅ Dependencia: sesión actual a partir del token, sin consultar la base de datos
+async def claims_actuales(credenciales: HTTPAuthorizationCredentials = Depends(_bearer)) -> dict:
+    if credenciales is None or credenciales.scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="No autenticado", headers={"WWW-Authenticate": "Bearer"})
+    return decodificar_token(credenciales.credentials, "access")
+
+
+async def usuario_actual(claims: dict = Depends(claims_actuales)) -> UsuarioOut:
+    return UsuarioOut(username=claims["sub"], rol=claims["rol"])
+
+
+def requiere_rol(*roles: RolEnum):
+    permitidos = {r.value for r in roles}
+
+    async def verificar(usuario: UsuarioOut = Depends(usuario_actual)) -> UsuarioOut:
+        if usuario.rol not in permitidos:
+            raise HTTPException(status_code=403, detail="No tiene permisos para esta acción")
+        return usuario
+
+    return verificar
+
+
+solo_admin = requiere_rol(RolEnum.admin)
@@ -0,0 +1,337 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import config
+import versionado
+from database import SessionLocal, engine
+from models import EstadoTareaEnum, Tarea
+
+logger = logging.getLogger(__name__)
+
+# 🧵 Cola de tareas persistente para efectos lentos fuera de la petición
+#
+# Las tareas viven en la tabla `tareas` de la misma base: se encolan dentro de
+# la transacción de la escritura que las origina (si la escritura hace
+# rollback, la tarea tampoco existe) y las ejecuta un pool de hilos. Un worker
+# reclama una tarea con un UPDATE condicionado al estado, así que varias
+# instancias pueden compartir la cola sin tomar la misma tarea dos veces.
+# Los fallos se reintentan con backoff exponencial hasta max_intentos.
+# Mientras corre, el worker renueva `actualizada` (latido); solo vuelve a la
+# cola la tarea en curso cuyo latido lleva TAREAS_TIMEOUT sin llegar.
+
+MANEJADORES = {}
+
+_aviso = threading.Event()
+_detener = threading.Event()
+_hilos = []
+_mantenimiento_lock = threading.Lock()
+_proximo_mantenimiento = 0.0
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def tarea(tipo: str):
+    """Registra el manejador de un tipo de tarea: `def manejador(db, datos) -> dict | None`."""
+    def registrar(funcion):
+        MANEJADORES[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def despertar(*_):
+    _aviso.set()
+
+
+def encolar(db: Session, tipo: str, datos: dict, max_intentos: int = None, retraso: float = 0) -> Tarea:
+    """Agrega la tarea a la transacción de `db`; los workers se avisan tras el commit.
+
+    Con `retraso` (segundos) la tarea no se toma antes de ese tiempo.
+    """
+    ahora = _ahora()
+    nueva = Tarea(
+        tipo=tipo,
+        datos=json.dumps(datos),
+        estado=EstadoTareaEnum.pendiente,
+        intentos=0,
+        max_intentos=max_intentos or config.TAREAS_MAX_INTENTOS,
+        disponible_desde=ahora + timedelta(seconds=retraso),
+        creada=ahora,
+        actualizada=ahora,
+    )
+    db.add(nueva)
+    db.flush()
+    event.listen(db, "after_commit", despertar, once=True)
+    return nueva
+
+
+def encolar_aparte(tipo: str, datos: dict, max_intentos: int = None) -> int:
+    """Encola en una transacción propia (para código que no tiene sesión)."""
+    db = SessionLocal()
+    try:
+        nueva = encolar(db, tipo, datos, max_intentos)
+        db.commit()
+        return nueva.id
+    finally:
+        db.close()
+
+
+def como_dict(t: Tarea) -> dict:
+    return {
+        "id": t.id,
+        "tipo": t.tipo,
+        "estado": t.estado.value,
+        "intentos": t.intentos,
+        "max_intentos": t.max_intentos,
+        "creada": t.creada,
+        "actualizada": t.actualizada,
+        "disponible_desde": t.disponible_desde,
+        "resultado": json.loads(t.resultado) if t.resultado else None,
+        "error": t.error,
+    }
+
+
+# ======== OPERACIONES POR LOTES ========
+
+def borrar_por_lotes(db: Session, modelo, *condiciones) -> int:
+    """DELETE en transacciones cortas de config.TAREAS_LOTE filas: no retiene bloqueos largos."""
+    pk = modelo.__mapper__.primary_key[0]
+    total = 0
+    while True:
+        ids = db.scalars(select(pk).where(*condiciones).limit(config.TAREAS_LOTE)).all()
+        if not ids:
+            return total
+        versionado.registrar_eliminados(db, modelo, ids)
+        db.execute(delete(modelo).where(pk.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        total += len(ids)
+
+
+def actualizar_por_lotes(db: Session, modelo, valores: dict, *condiciones) -> int:
+    """Igual que borrar_por_lotes; `valores` debe dejar de cumplir `condiciones`."""
+    pk = modelo.__mapper__.primary_key[0]
+    total = 0
+    while True:
+        ids = db.scalars(select(pk).where(*condiciones).limit(config.TAREAS_LOTE)).all()
+        if not ids:
+            return total
+        db.execute(
+            update(modelo)
+            .where(pk.in_(ids))
+            .values(**valores, **versionado.version_masiva(db, modelo))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        total += len(ids)
+
+
+# ======== WORKERS ========
+
+def _reclamar(db: Session):
+    ahora = _ahora()
+    candidatas = db.scalars(
+        select(Tarea.id)
+        .where(Tarea.estado == EstadoTareaEnum.pendiente, Tarea.disponible_desde <= ahora)
+        .order_by(Tarea.id)
+        .limit(config.TAREAS_WORKERS * 2)
+    ).all()
+    for id in candidatas:
+        # Solo uno de los workers (o instancias) que compiten gana el UPDATE
+        tomada = db.execute(
+            update(Tarea)
+            .where(Tarea.id == id, Tarea.estado == EstadoTareaEnum.pendiente)
+            .values(estado=EstadoTareaEnum.en_curso, intentos=Tarea.intentos + 1, actualizada=ahora)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if tomada:
+            return db.get(Tarea, id)
+    return None
+
+
+def _latir(id: int, intentos: int, fin: threading.Event):
+    # Condicionado a `intentos`: si la tarea se dio por abandonada y otro worker
+    # la reclamó, este latido ya no le extiende el plazo
+    while not fin.wait(config.TAREAS_LATIDO):
+        try:
+            with engine.begin() as conexion:
+                vigente = conexion.execute(
+                    update(Tarea)
+                    .where(Tarea.id == id, Tarea.estado == EstadoTareaEnum.en_curso, Tarea.intentos == intentos)
+                    .values(actualizada=_ahora())
+                ).rowcount
+        except Exception:
+            logger.exception("Falló el latido de la tarea %s", id)
+            continue
+        if not vigente:
+            logger.warning("La tarea %s ya no es de este worker: se deja de renovar", id)
+            return
+
+
+@contextmanager
+def latido(id: int, intentos: int):
+    """Renueva el reclamo de la tarea cada TAREAS_LATIDO segundos mientras dura el bloque."""
+    fin = threading.Event()
+    hilo = threading.Thread(target=_latir, args=(id, intentos, fin), name=f"latido-{id}", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        fin.set()
+        hilo.join()
+
+
+def finalizar(db: Session, id: int, intentos: int, **valores) -> bool:
+    """Cierra la tarea solo si sigue siendo el reclamo `intentos`; False si ya no lo es.
+
+    Si el latido se perdió, `mantener` la devolvió a la cola y otro worker pudo
+    reclamarla: este worker no pisa ese reclamo y su resultado se descarta.
+    """
+    vigente = db.execute(
+        update(Tarea)
+        .where(Tarea.id == id, Tarea.estado == EstadoTareaEnum.en_curso, Tarea.intentos == intentos)
+        .values(**valores, actualizada=_ahora())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not vigente:
+        logger.warning("La tarea %s (intento %s) ya no es de este worker: se descarta su resultado", id, intentos)
+    return bool(vigente)
+
+
+def ejecutar_una() -> bool:
+    """Ejecuta una tarea disponible; False si no había ninguna."""
+    db = SessionLocal()
+    try:
+        actual = _reclamar(db)
+        if actual is None:
+            return False
+        id, tipo, intentos, max_intentos = actual.id, actual.tipo, actual.intentos, actual.max_intentos
+        manejador = MANEJADORES.get(tipo)
+        try:
+            if manejador is None:
+                raise LookupError(f"Tipo de tarea desconocido: {tipo}")
+            with latido(id, intentos):
+                resultado = manejador(db, json.loads(actual.datos))
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Falló la tarea %s (%s)", id, tipo)
+            valores = {"error": f"{type(e).__name__}: {e}"}
+            if manejador is not None and intentos < max_intentos:
+                espera = config.TAREAS_REINTENTO * 2 ** (intentos - 1)
+                valores.update(estado=EstadoTareaEnum.pendiente, disponible_desde=_ahora() + timedelta(seconds=espera))
+            else:
+                valores.update(estado=EstadoTareaEnum.fallida)
+        else:
+            valores = {
+                "estado": EstadoTareaEnum.hecha,
+                "resultado": json.dumps(resultado) if resultado is not None else None,
+                "error": None,
+            }
+        finalizar(db, id, intentos, **valores)
+        return True
+    finally:
+        db.close()
+
+
+def mantener():
+    """Devuelve a la cola las tareas sin latido y purga las terminadas viejas (y las lápidas)."""
+    db = SessionLocal()
+    try:
+        ahora = _ahora()
+        recuperadas = db.execute(
+            update(Tarea)
+            .where(
+                Tarea.estado == EstadoTareaEnum.en_curso,
+                Tarea.actualizada < ahora - timedelta(seconds=config.TAREAS_TIMEOUT),
+            )
+            .values(estado=EstadoTareaEnum.pendiente, disponible_desde=ahora, actualizada=ahora)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if recuperadas:
+            logger.warning("%s tareas abandonadas vuelven a la cola", recuperadas)
+        borrar_por_lotes(
+            db, Tarea,
+            Tarea.estado.in_([EstadoTareaEnum.hecha, EstadoTareaEnum.fallida]),
+            Tarea.actualizada < ahora - timedelta(seconds=config.TAREAS_RETENCION),
+        )
+        versionado.purgar_lapidas(db)
+    finally:
+        db.close()
+
+
+def _quizas_mantener():
+    global _proximo_mantenimiento
+    # Un solo worker por minuto; los demás siguen con la cola
+    if time.monotonic() < _proximo_mantenimiento or not _mantenimiento_lock.acquire(blocking=False):
+        return
+    try:
+        _proximo_mantenimiento = time.monotonic() + 60
+        mantener()
+    except Exception:
+        logger.exception("Falló el mantenimiento de la cola de tareas")
+    finally:
+        _mantenimiento_lock.release()
+
+
+def _bucle():
+    while not _detener.is_set():
+        _quizas_mantener()
+        try:
+            hubo = ejecutar_una()
+        except Exception:
+            logger.exception("Error en el worker de tareas")
+            hubo = False
+        if not hubo:
+            _aviso.wait(config.TAREAS_INTERVALO)
+            _aviso.clear()
+
+
+def iniciar(workers: int = None) -> bool:
+    """Arranca los workers; False si en este proceso no pueden correr."""
+    if _hilos:
+        return True
+    if isinstance(engine.pool, StaticPool):
+        # SQLite en memoria: una sola conexión compartida, los hilos pisarían las transacciones
+        logger.warning("Base en memoria: las tareas quedan en cola sin workers")
+        return False
+    _detener.clear()
+    for i in range(workers or config.TAREAS_WORKERS):
+        hilo = threading.Thread(target=_bucle, name=f"tareas-{i}", daemon=True)
+        hilo.start()
+        _hilos.append(hilo)
+    return True
+
+
+def detener(espera: float = 5):
+    _detener.set()
+    _aviso.set()
+    for hilo in _hilos:
+        hilo.join(espera)
+    _hilos.clear()
+
+
+if __name__ == "__main__":
+    # Worker dedicado (TAREAS=0 en los procesos web): python tareas.py
+    import main  # noqa: F401  registra los manejadores de fotos y de los routers
+    import almacen_fotos
+
+    logging.basicConfig(level=logging.INFO)
+    if iniciar():
+        almacen_fotos.iniciar_recolector()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        detener()
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Base en memoria propia (ARRANQUE_LOCAL crea tablas y admin en el lifespan)
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["CACHE_HTTP"] = "1"
+os.environ["METRICAS"] = "0"
+os.environ.setdefault("TOKEN_SECRET", "pruebas")
+os.environ["FOTOS_DIR"] = tempfile.mkdtemp(prefix="fotos-pruebas-")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    with TestClient(main.app) as cliente:
+        tokens = cliente.post("/usuarios/login", json={"username": "admin", "password": "admin"}).json()
+        cliente.headers["Authorization"] = "Bearer " + tokens["access_token"]
+        yield cliente
+
+
+@pytest.fixture
+def crear_trabajador(cliente):
+    def crear(cedula: str, **campos):
+        datos = dict(
+            cedula=cedula, nombre="Ana", apellidos="Pérez", cargo="Analista", area_de_trabajo="TI",
+            edad=30, residencia="Bogotá", telefono="300", correo="ana@empresa.co",
+        )
+        datos.update(campos)
+        respuesta = cliente.post("/trabajadores/", json=datos)
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def crear_usuario(cliente):
+    def crear(username: str, rol: str = "normal"):
+        respuesta = cliente.post("/usuarios/registrar", json={"username": username, "password": "clave", "rol": rol})
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def crear_computador(cliente):
+    def crear(codigo: str, **campos):
+        datos = dict(codigo=codigo, nombre="Equipo", marca="HP")
+        datos.update(campos)
+        respuesta = cliente.post("/computadores/", json=datos)
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def crear_mantenimiento(cliente):
+    def crear(computador_id: str, **campos):
+        datos = dict(computador_id=computador_id, fecha="2025-03-01", hora="08:00:00", tipo="preventivo", estado="pendiente")
+        datos.update(campos)
+        respuesta = cliente.post("/mantenimientos/", json=datos)
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def crear_permiso(cliente):
+    def crear(codigo_computador: str, cedula_trabajador: str, **campos):
+        datos = dict(codigo_computador=codigo_computador, cedula_trabajador=cedula_trabajador, estado="activo")
+        datos.update(campos)
+        respuesta = cliente.post("/permisos/", json=datos)
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def importar(cliente):
+    def subir(entidad: str, filas: list, **params):
+        contenido = "\n".join(f if isinstance(f, str) else json.dumps(f) for f in filas)
+        respuesta = cliente.post(
+            f"/import/{entidad}", params=params, files={"archivo": (f"{entidad}.jsonl", contenido.encode())},
+        )
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+    return subir
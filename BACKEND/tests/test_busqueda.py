@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Session
+
+import busqueda
+from database import engine
+from models import Trabajador
+
+
+def _otro_worker(funcion):
+    """Escribe en la base sin pasar por los routers, como lo haría otro proceso."""
+    with Session(engine) as db:
+        funcion(db)
+        db.commit()
+
+
+def _claves(consulta):
+    return {r["clave"] for r in busqueda.buscar(consulta, tipos={"trabajador"})}
+
+
+def test_sincroniza_escrituras_de_otro_worker(cliente):
+    busqueda.reconstruir()
+
+    _otro_worker(lambda db: db.add(Trabajador(
+        cedula="bus-1", nombre="Eustaquio", apellidos="Zamudio", cargo="Analista",
+        area_de_trabajo="TI", edad=30, residencia="Bogotá", telefono="300", correo="e@empresa.co",
+    )))
+    assert "bus-1" not in _claves("Eustaquio")
+    assert busqueda.sincronizar() >= 1
+    assert "bus-1" in _claves("Eustaquio")
+
+    def renombrar(db):
+        db.get(Trabajador, "bus-1").nombre = "Gumersindo"
+    _otro_worker(renombrar)
+    busqueda.sincronizar()
+    assert "bus-1" in _claves("Gumersindo")
+    assert "bus-1" not in _claves("Eustaquio")
+
+    _otro_worker(lambda db: db.delete(db.get(Trabajador, "bus-1")))
+    busqueda.sincronizar()
+    assert "bus-1" not in _claves("Gumersindo")
+
+    # Sin cambios nuevos no hay nada que aplicar
+    assert busqueda.sincronizar() == 0
@@ -0,0 +1,20 @@
+ORIGEN = "http://localhost:5173"
+
+
+def test_cors_en_respuestas_del_cache(cliente, crear_trabajador):
+    crear_trabajador("cors-1")
+    primera = cliente.get("/trabajadores/", headers={"Origin": ORIGEN})
+    assert primera.status_code == 200
+    assert "access-control-allow-origin" in primera.headers
+
+    # Segunda lectura: sale del LRU del cache
+    acierto = cliente.get("/trabajadores/", headers={"Origin": ORIGEN})
+    assert acierto.status_code == 200
+    assert acierto.headers["etag"] == primera.headers["etag"]
+    assert "access-control-allow-origin" in acierto.headers
+
+    no_modificado = cliente.get(
+        "/trabajadores/", headers={"Origin": ORIGEN, "If-None-Match": primera.headers["etag"]}
+    )
+    assert no_modificado.status_code == 304
+    assert "access-control-allow-origin" in no_modificado.headers
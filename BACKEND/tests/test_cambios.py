@@ -0,0 +1,44 @@
+def test_if_match(cliente, crear_computador):
+    creado = crear_computador("IFM-1")
+    etag = cliente.get("/computadores/IFM-1").headers["etag"]
+    assert etag == f'"{creado["version"]}"'
+
+    cambio = cliente.patch("/computadores/IFM-1", json={"nombre": "Nuevo"}, headers={"If-Match": etag})
+    assert cambio.status_code == 200, cambio.text
+    assert cambio.json()["nombre"] == "Nuevo"
+    assert cambio.headers["etag"] != etag
+
+    # La versión leída antes del cambio ya no vale
+    viejo = cliente.put("/computadores/IFM-1", json={"nombre": "Otro", "marca": "HP"}, headers={"If-Match": etag})
+    assert viejo.status_code == 412
+    assert cliente.get("/computadores/IFM-1").json()["nombre"] == "Nuevo"
+
+    actual = cliente.put(
+        "/computadores/IFM-1", json={"nombre": "Otro", "marca": "HP"}, headers={"If-Match": cambio.headers["etag"]}
+    )
+    assert actual.status_code == 200, actual.text
+    assert actual.json()["nombre"] == "Otro"
+
+
+def test_put_y_patch_devuelven_relaciones(cliente, crear_trabajador, crear_computador, crear_mantenimiento, crear_permiso):
+    crear_trabajador("rel-1", nombre="Rosa")
+    crear_computador("REL-1", trabajador_id="rel-1")
+    mantenimiento = crear_mantenimiento("REL-1")
+    permiso = crear_permiso("REL-1", "rel-1")
+
+    computador = cliente.put("/computadores/REL-1", json={"nombre": "Equipo", "marca": "Dell", "trabajador_id": "rel-1"})
+    assert computador.status_code == 200, computador.text
+    assert computador.json()["trabajador"]["nombre"] == "Rosa"
+    assert cliente.patch("/computadores/REL-1", json={"marca": "HP"}).json()["trabajador"]["cedula"] == "rel-1"
+
+    for metodo in (cliente.put, cliente.patch):
+        respuesta = metodo(f"/mantenimientos/{mantenimiento['id']}", json=dict(
+            {k: mantenimiento[k] for k in ("computador_id", "fecha", "hora", "tipo")}, estado="hecho",
+        ))
+        assert respuesta.status_code == 200, respuesta.text
+        assert respuesta.json()["computador"]["trabajador"]["nombre"] == "Rosa"
+
+        respuesta = metodo(f"/permisos/{permiso['id']}", json={"estado": "inactivo"})
+        assert respuesta.status_code == 200, respuesta.text
+        assert respuesta.json()["trabajador"]["nombre"] == "Rosa"
+        assert respuesta.json()["computador"]["trabajador"]["cedula"] == "rel-1"
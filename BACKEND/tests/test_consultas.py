@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import delete
+
+import cache_http
+from benchmarks.contar_consultas import PRESUPUESTO, ContadorSQL, medir, sembrar
+from database import engine
+from models import Computador, Mantenimiento, PermisoSalida, Trabajador
+
+
+@pytest.fixture
+def contador(cliente):
+    contador = ContadorSQL()
+    yield contador
+    contador.quitar()
+    # Las filas sembradas no se quedan para las demás pruebas
+    with engine.begin() as conn:
+        for modelo in (PermisoSalida, Mantenimiento, Computador, Trabajador):
+            conn.execute(delete(modelo))
+
+
+def _medir(cliente, contador, filas):
+    sembrar(filas)
+    # Las filas entran sin pasar por la API: la caché HTTP no se enteró
+    cache_http.respuestas.limpiar()
+    return medir(cliente, contador)
+
+
+def test_presupuesto_de_consultas(cliente, contador):
+    # Los mismos presupuestos que benchmarks/contar_consultas.py, con menos filas
+    pequeno = _medir(cliente, contador, 20)
+    grande = _medir(cliente, contador, 200)
+    for ruta, maximo in PRESUPUESTO.items():
+        assert grande[ruta] <= maximo, f"{ruta}: {grande[ruta]} consultas (presupuesto {maximo})"
+        assert grande[ruta] <= pequeno[ruta], f"{ruta}: crece con las filas ({pequeno[ruta]} -> {grande[ruta]})"
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import config
+import eventos
+
+
+def _leer_flujo(desde, entidades=None):
+    async def desconectado():
+        return True
+
+    async def leer():
+        return [mensaje async for mensaje in eventos.flujo(desde, entidades, desconectado)]
+
+    return asyncio.run(leer())
+
+
+def test_flujo_archivo_lee_fuera_del_event_loop(tmp_path, monkeypatch):
+    registro = eventos.EventosArchivo(str(tmp_path / "eventos.db"), 100)
+    hilos = []
+    desde = registro.desde
+
+    def desde_registrado(version):
+        hilos.append(threading.current_thread())
+        return desde(version)
+
+    monkeypatch.setattr(registro, "desde", desde_registrado)
+    monkeypatch.setattr(eventos, "registro", registro)
+    monkeypatch.setattr(config, "EVENTOS_INTERVALO", 0.01)
+
+    version = registro.ultima()
+    registro.agregar([("computadores", "PC-1", "crear")])
+    mensajes = _leer_flujo(version)
+
+    assert any('"clave":"PC-1"' in m for m in mensajes)
+    # asyncio.run corre el loop en este hilo: las lecturas de SQLite van al threadpool
+    assert hilos and threading.current_thread() not in hilos
+
+
+def test_asignaciones_publican_eventos(cliente, crear_trabajador, crear_usuario, monkeypatch):
+    monkeypatch.setattr(config, "EVENTOS_INTERVALO", 0.01)
+    crear_trabajador("ev-1")
+    crear_usuario("ev-a")
+    version = cliente.get("/eventos/version").json()["version"]
+
+    asignacion = cliente.post("/asignar-usuario/", json={"usuario_id": "ev-a", "trabajador_id": "ev-1"}).json()
+    assert cliente.delete(f"/asignar-usuario/{asignacion['id']}").status_code == 204
+
+    mensajes = "".join(_leer_flujo(version, {"asignar_usuario"}))
+    clave = f'"entidad":"asignar_usuario","clave":"{asignacion["id"]}"'
+    assert f'{clave},"op":"crear"' in mensajes
+    assert f'{clave},"op":"eliminar"' in mensajes
+    # El filtro del endpoint conoce la entidad: solo rechaza la otra
+    rechazo = cliente.get("/eventos/?entidades=asignar_usuario,otra")
+    assert rechazo.status_code == 400
+    assert rechazo.json()["detail"] == "Entidades desconocidas: otra"
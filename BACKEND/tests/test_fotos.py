@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+import almacen_fotos
+import config
+from database import SessionLocal
+from routers import fotos
+
+SHA = "ab" * 32
+ORIGINAL = f"ab/ab/{SHA}.jpg"
+
+
+@pytest.fixture
+def original():
+    destino = os.path.join(fotos.RAIZ, ORIGINAL)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, "wb") as archivo:
+        archivo.write(b"jpeg")
+    yield ORIGINAL
+    for ruta in (destino, os.path.join(fotos.RAIZ, almacen_fotos.ruta_variante(ORIGINAL, "webp"))):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+@pytest.mark.skipif("webp" not in almacen_fotos.FORMATOS_VARIANTE, reason="Pillow sin WebP")
+def test_original_de_respaldo_no_es_inmutable(cliente, original):
+    sin_variante = cliente.get(f"/fotos/{original}", headers={"Accept": "image/webp,*/*"})
+    assert sin_variante.status_code == 200
+    assert sin_variante.headers["cache-control"] == fotos.CACHE_PROVISIONAL
+    assert sin_variante.headers["vary"] == "Accept"
+
+    revalidada = cliente.get(
+        f"/fotos/{original}", headers={"Accept": "image/webp,*/*", "If-None-Match": sin_variante.headers["etag"]}
+    )
+    assert revalidada.status_code == 304
+    assert revalidada.headers["cache-control"] == fotos.CACHE_PROVISIONAL
+
+    # Quien no acepta otro formato recibe siempre el original: ese sí es inmutable
+    sin_negociar = cliente.get(f"/fotos/{original}", headers={"Accept": "image/jpeg"})
+    assert sin_negociar.headers["cache-control"] == fotos.CACHE_INMUTABLE
+
+    variante = os.path.join(fotos.RAIZ, almacen_fotos.ruta_variante(original, "webp"))
+    os.makedirs(os.path.dirname(variante), exist_ok=True)
+    with open(variante, "wb") as archivo:
+        archivo.write(b"web")
+    con_variante = cliente.get(f"/fotos/{original}", headers={"Accept": "image/webp,*/*"})
+    assert con_variante.content == b"web"
+    assert con_variante.headers["cache-control"] == fotos.CACHE_INMUTABLE
+    assert con_variante.headers["etag"] != sin_variante.headers["etag"]
+
+
+def test_huerfana_reciente_no_se_borra(cliente, original):
+    ruta = os.path.join(fotos.RAIZ, original)
+    url = almacen_fotos.url_foto(original)
+    db = SessionLocal()
+    try:
+        # Recién subida (o deduplicada): otro registro puede estar por guardarla
+        assert not almacen_fotos.eliminar_foto_si_huerfana(db, url)
+        assert os.path.exists(ruta)
+
+        viejo = time.time() - config.FOTOS_GRACIA - 60
+        os.utime(ruta, (viejo, viejo))
+        assert almacen_fotos.eliminar_foto_si_huerfana(db, url)
+        assert not os.path.exists(ruta)
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import delete
+
+import almacen_fotos
+from database import SessionLocal
+from models import Foto
+
+FOTO_A = f"cd/cd/{'cd' * 32}.jpg"
+FOTO_B = f"ef/ef/{'ef' * 32}.jpg"
+
+
+@pytest.fixture
+def fotos_registradas(cliente):
+    db = SessionLocal()
+    try:
+        for nombre in (FOTO_A, FOTO_B):
+            db.add(Foto(nombre=nombre, referencias=0, tamano=4, creada=almacen_fotos._ahora()))
+        db.commit()
+        yield db
+    finally:
+        db.execute(delete(Foto).where(Foto.nombre.in_((FOTO_A, FOTO_B))))
+        db.commit()
+        db.close()
+
+
+def _referencias(db):
+    db.expire_all()
+    return {f.nombre: f.referencias for f in db.query(Foto).filter(Foto.nombre.in_((FOTO_A, FOTO_B)))}
+
+
+def test_separa_altas_de_cambios(cliente, crear_trabajador, crear_computador, importar):
+    crear_trabajador("imp-t")
+    crear_computador("IMP-1", nombre="Viejo")
+
+    resultado = importar("computadores", [
+        {"codigo": "IMP-1", "nombre": "Renovado", "marca": "HP", "trabajador_id": "imp-t"},
+        {"codigo": "IMP-2", "nombre": "Primero", "marca": "HP"},
+        {"codigo": "IMP-3", "nombre": "Huérfano", "marca": "HP", "trabajador_id": "no-existe"},
+        "{no es json",
+        {"codigo": "IMP-4", "marca": "HP"},
+        # La última aparición de una clave gana
+        {"codigo": "IMP-2", "nombre": "Último", "marca": "Dell"},
+    ])
+    assert resultado["procesadas"] == 6
+    assert resultado["insertadas"] == 1
+    assert resultado["actualizadas"] == 1
+    assert resultado["con_error"] == 3
+    errores = {e["fila"]: e["errores"] for e in resultado["errores"]}
+    assert errores[3] == ["trabajador_id: no existe 'no-existe'"]
+    assert set(errores) == {3, 4, 5}
+    assert errores[5][0].startswith("nombre:")
+
+    renovado = cliente.get("/computadores/IMP-1").json()
+    assert renovado["nombre"] == "Renovado"
+    assert renovado["trabajador"]["cedula"] == "imp-t"
+    ultimo = cliente.get("/computadores/IMP-2").json()
+    assert (ultimo["nombre"], ultimo["marca"]) == ("Último", "Dell")
+    assert cliente.get("/computadores/IMP-3").status_code == 404
+
+    # En bloques de una fila la repetida ya existe al llegar: se actualiza
+    otra = importar("computadores", [
+        {"codigo": "IMP-5", "nombre": "Uno", "marca": "HP"},
+        {"codigo": "IMP-5", "nombre": "Dos", "marca": "HP"},
+    ], chunk=1)
+    assert (otra["insertadas"], otra["actualizadas"]) == (1, 1)
+    assert cliente.get("/computadores/IMP-5").json()["nombre"] == "Dos"
+
+
+DETALLE = {"procesador": "i5", "ram": "8 GB", "almacenamiento": "256 GB", "sistema_operativo": "Windows"}
+
+
+def test_detalles_requieren_su_computador(cliente, crear_computador, importar):
+    crear_computador("IMP-D1")
+
+    resultado = importar("detalles", [
+        dict(DETALLE, codigo_computador="IMP-D1"),
+        dict(DETALLE, codigo_computador="IMP-D9"),
+    ])
+    assert (resultado["insertadas"], resultado["con_error"]) == (1, 1)
+    assert resultado["errores"] == [{"fila": 2, "errores": ["codigo_computador: no existe 'IMP-D9'"]}]
+
+    cambio = importar("detalles", [dict(DETALLE, codigo_computador="IMP-D1", procesador="Ryzen")])
+    assert (cambio["insertadas"], cambio["actualizadas"]) == (0, 1)
+    assert cliente.get("/detalles/IMP-D1").json()["procesador"] == "Ryzen"
+
+
+def test_ajusta_referencias_de_fotos(cliente, importar, fotos_registradas):
+    a, b = almacen_fotos.url_foto(FOTO_A), almacen_fotos.url_foto(FOTO_B)
+
+    importar("computadores", [
+        {"codigo": "IMP-F1", "nombre": "Uno", "marca": "HP", "foto": a},
+        {"codigo": "IMP-F2", "nombre": "Dos", "marca": "HP", "foto": a},
+    ])
+    assert _referencias(fotos_registradas) == {FOTO_A: 2, FOTO_B: 0}
+
+    # Cambiar de foto, conservarla y quitarla en el mismo bloque
+    importar("computadores", [
+        {"codigo": "IMP-F1", "nombre": "Uno", "marca": "HP", "foto": b},
+        {"codigo": "IMP-F2", "nombre": "Dos", "marca": "HP", "foto": a},
+        {"codigo": "IMP-F3", "nombre": "Tres", "marca": "HP", "foto": b},
+    ])
+    assert _referencias(fotos_registradas) == {FOTO_A: 1, FOTO_B: 2}
+
+    importar("computadores", [{"codigo": "IMP-F2", "nombre": "Dos", "marca": "HP"}])
+    assert _referencias(fotos_registradas) == {FOTO_A: 0, FOTO_B: 2}
@@ -0,0 +1,51 @@
+ITEM = {"computador_id": "LOTE-1", "fecha": "2025-03-01", "hora": "08:00:00", "tipo": "preventivo", "estado": "pendiente"}
+
+
+def test_lote_devuelve_version(cliente, crear_computador):
+    crear_computador("LOTE-1")
+
+    creados = cliente.post("/mantenimientos/batch", json={"items": [ITEM, dict(ITEM, fecha="2025-04-01")]})
+    assert creados.status_code == 200, creados.text
+    creados = creados.json()
+    assert all(m["version"] for m in creados)
+
+    primero, segundo = creados
+    actualizados = cliente.patch("/mantenimientos/batch", json={"items": [
+        {"id": primero["id"], "estado": "hecho"},
+        {"id": segundo["id"]},
+    ]})
+    assert actualizados.status_code == 200, actualizados.text
+    cambiado, intacto = actualizados.json()
+    assert cambiado["version"] > primero["version"]
+    assert intacto["version"] == segundo["version"]
+
+    # La versión del lote es la misma que devuelve el listado
+    listado = {m["id"]: m["version"] for m in cliente.get("/mantenimientos/").json()}
+    assert listado[primero["id"]] == cambiado["version"]
+    assert listado[segundo["id"]] == segundo["version"]
+
+
+def test_lote_devuelve_el_computador(cliente, crear_trabajador, crear_computador):
+    crear_trabajador("lote-t", nombre="Luz")
+    crear_computador("LOTE-2", nombre="Portátil", trabajador_id="lote-t")
+    crear_computador("LOTE-3", nombre="Torre")
+
+    creados = cliente.post("/mantenimientos/batch", json={"items": [
+        dict(ITEM, computador_id="LOTE-2"), dict(ITEM, computador_id="LOTE-3"),
+    ]})
+    assert creados.status_code == 200, creados.text
+    portatil, torre = creados.json()
+    assert portatil["computador"]["nombre"] == "Portátil"
+    assert portatil["computador"]["trabajador"]["nombre"] == "Luz"
+    assert torre["computador"]["nombre"] == "Torre"
+
+    actualizados = cliente.patch("/mantenimientos/batch", json={"items": [
+        {"id": torre["id"], "computador_id": "LOTE-2"},
+        {"id": portatil["id"], "estado": "hecho"},
+    ]})
+    assert actualizados.status_code == 200, actualizados.text
+    movido, hecho = actualizados.json()
+    assert movido["id"] == torre["id"]
+    assert movido["computador"]["codigo"] == "LOTE-2"
+    assert hecho["estado"] == "hecho"
+    assert hecho["computador"]["trabajador"]["nombre"] == "Luz"
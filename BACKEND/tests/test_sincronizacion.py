@@ -0,0 +1,57 @@
+import versionado
+from database import SessionLocal
+from models import Computador
+
+
+def test_asignaciones_since(cliente, crear_trabajador, crear_usuario):
+    crear_trabajador("sync-1")
+    crear_trabajador("sync-2")
+    crear_usuario("sync-a")
+    crear_usuario("sync-b")
+
+    inicial = cliente.get("/asignar-usuario/?since=0").json()
+    primera = cliente.post("/asignar-usuario/", json={"usuario_id": "sync-a", "trabajador_id": "sync-1"}).json()
+    segunda = cliente.post("/asignar-usuario/", json={"usuario_id": "sync-b", "trabajador_id": "sync-2"}).json()
+
+    cambios = cliente.get(f"/asignar-usuario/?since={inicial['version']}").json()
+    assert {a["id"] for a in cambios["items"]} == {primera["id"], segunda["id"]}
+    assert cambios["eliminados"] == []
+
+    assert cliente.delete(f"/asignar-usuario/{primera['id']}").status_code == 204
+    borrados = cliente.get(f"/asignar-usuario/?since={cambios['version']}").json()
+    assert borrados["items"] == []
+    assert borrados["eliminados"] == [str(primera["id"])]
+    assert borrados["version"] > cambios["version"]
+
+    # Sin since: el listado completo de siempre
+    completo = cliente.get("/asignar-usuario/").json()
+    assert segunda["id"] in {a["id"] for a in completo}
+
+
+def test_contador_se_toma_al_confirmar(cliente, crear_computador):
+    creado = crear_computador("VER-1")
+    db = SessionLocal()
+    try:
+        antes = versionado.estado(db)[0]
+        assert creado["version"] == antes
+
+        # Un If-Match vencido no llega a tomar el contador
+        viejo = cliente.patch("/computadores/VER-1", json={"nombre": "X"}, headers={"If-Match": '"0"'})
+        assert viejo.status_code == 412
+        assert versionado.estado(db)[0] == antes
+
+        # Mientras la transacción escribe, la versión es provisional
+        db.get(Computador, "VER-1").nombre = "Z"
+        db.flush()
+        assert versionado.estado(db)[0] == antes
+        db.commit()
+        assert versionado.estado(db)[0] == antes + 1
+        assert db.get(Computador, "VER-1").version == antes + 1
+    finally:
+        db.close()
+
+    cambio = cliente.patch("/computadores/VER-1", json={"nombre": "Y"}, headers={"If-Match": f'"{antes + 1}"'})
+    assert cambio.status_code == 200, cambio.text
+    assert cambio.json()["version"] == antes + 2
+    assert cambio.headers["etag"] == f'"{antes + 2}"'
+    assert cliente.get("/computadores/VER-1").json()["version"] == antes + 2
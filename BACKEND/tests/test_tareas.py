@@ -0,0 +1,79 @@
+import json
+import time
+from datetime import timedelta
+
+from sqlalchemy import update
+
+import config
+import tareas
+from database import SessionLocal
+from models import EstadoTareaEnum, Tarea
+
+
+def _tarea_en_curso(hace: float) -> int:
+    db = SessionLocal()
+    try:
+        ahora = tareas._ahora()
+        tarea = Tarea(
+            tipo="prueba", datos=json.dumps({}), estado=EstadoTareaEnum.en_curso, intentos=1, max_intentos=3,
+            creada=ahora, actualizada=ahora - timedelta(seconds=hace), disponible_desde=ahora,
+        )
+        db.add(tarea)
+        db.commit()
+        return tarea.id
+    finally:
+        db.close()
+
+
+def _tarea(id: int) -> Tarea:
+    db = SessionLocal()
+    try:
+        return db.get(Tarea, id)
+    finally:
+        db.close()
+
+
+def test_latido_evita_reencolar_tareas_largas(cliente, monkeypatch):
+    monkeypatch.setattr(config, "TAREAS_LATIDO", 0.05)
+    viva = _tarea_en_curso(hace=config.TAREAS_TIMEOUT * 2)
+    caida = _tarea_en_curso(hace=config.TAREAS_TIMEOUT * 2)
+
+    with tareas.latido(viva, 1):
+        time.sleep(0.3)
+        tareas.mantener()
+
+    # La que late sigue en curso; la que nadie renueva vuelve a la cola
+    assert _tarea(viva).estado == EstadoTareaEnum.en_curso
+    assert _tarea(caida).estado == EstadoTareaEnum.pendiente
+
+
+def test_latido_no_renueva_una_tarea_reclamada_por_otro(cliente, monkeypatch):
+    monkeypatch.setattr(config, "TAREAS_LATIDO", 0.05)
+    id = _tarea_en_curso(hace=config.TAREAS_TIMEOUT * 2)
+    antes = _tarea(id).actualizada
+
+    # El reclamo vigente es el intento 1: el latido de un intento anterior no la toca
+    with tareas.latido(id, intentos=0):
+        time.sleep(0.2)
+    assert _tarea(id).actualizada == antes
+
+
+def test_finalizar_no_pisa_el_reclamo_de_otro_worker(cliente):
+    id = _tarea_en_curso(hace=0)
+    db = SessionLocal()
+    try:
+        # Otro worker la reclamó de nuevo (intento 2) tras perderse el latido del intento 1
+        db.execute(update(Tarea).where(Tarea.id == id).values(intentos=2))
+        db.commit()
+        assert not tareas.finalizar(db, id, 1, estado=EstadoTareaEnum.hecha, resultado=json.dumps({"ok": True}))
+    finally:
+        db.close()
+    tarea = _tarea(id)
+    assert (tarea.estado, tarea.intentos, tarea.resultado) == (EstadoTareaEnum.en_curso, 2, None)
+
+    db = SessionLocal()
+    try:
+        assert tareas.finalizar(db, id, 2, estado=EstadoTareaEnum.hecha, resultado=json.dumps({"ok": True}))
+    finally:
+        db.close()
+    assert _tarea(id).estado == EstadoTareaEnum.hecha
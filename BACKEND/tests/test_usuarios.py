@@ -0,0 +1,23 @@
+import threading
+
+import seguridad
+
+
+def test_registrar_usa_pool_kdf(cliente, monkeypatch):
+    hilos = []
+    original = seguridad.hash_password
+
+    def hash_registrado(password, *args, **kwargs):
+        hilos.append(threading.current_thread().name)
+        return original(password, *args, **kwargs)
+
+    monkeypatch.setattr(seguridad, "hash_password", hash_registrado)
+    respuesta = cliente.post("/usuarios/registrar", json={"username": "kdf-1", "password": "clave", "rol": "normal"})
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["username"] == "kdf-1"
+    assert hilos and all(h.startswith("kdf") for h in hilos)
+
+    repetido = cliente.post("/usuarios/registrar", json={"username": "kdf-1", "password": "clave", "rol": "normal"})
+    assert repetido.status_code == 400
+
+    assert cliente.post("/usuarios/login", json={"username": "kdf-1", "password": "clave"}).status_code == 200
@@ -0,0 +1,323 @@
+import enum
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy import inspect as inspeccionar
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+import config
+from models import (
+    AsignarUsuario,
+    ContadorVersion,
+    Computador,
+    Detalle,
+    Eliminado,
+    Mantenimiento,
+    PermisoSalida,
+    Trabajador,
+    Usuario,
+)
+
+# 🔁 Versiones de fila para la sincronización incremental (?since=)
+#
+# Cada transacción que escribe en una tabla sincronizable toma el siguiente
+# número del contador "filas" y lo guarda en la columna `version` de las filas
+# que crea o modifica. El UPDATE del contador bloquea esa fila hasta el commit,
+# así que las versiones quedan en el orden en que se confirman las
+# transacciones: quien leyó hasta la versión N no se pierde una escritura que
+# confirme después con un número menor. Los borrados dejan una lápida en
+# `eliminados` con la misma versión.
+#
+# Para que ese bloqueo no serialice transacciones enteras (importaciones por
+# bloques, borrados por lotes), mientras la transacción escribe usa una versión
+# provisional negativa, única y nunca visible para otros (sin confirmar), y
+# recién en before_commit toma el contador y la reemplaza en las tablas que
+# tocó: el bloqueo dura ese último paso. Una escritura condicional rechazada
+# (404 / 412) no llega a tomarlo.
+
+ENTIDADES = {
+    Trabajador: "trabajadores",
+    Computador: "computadores",
+    Detalle: "detalle",
+    Mantenimiento: "mantenimientos",
+    PermisoSalida: "permisos",
+    AsignarUsuario: "asignar_usuario",
+}
+
+# Hijos que borra la base (ON DELETE CASCADE) sin que el ORM los vea (passive_deletes)
+CASCADAS = {
+    Computador: ((Detalle, Detalle.codigo_computador),
+                 (Mantenimiento, Mantenimiento.computador_id),
+                 (PermisoSalida, PermisoSalida.codigo_computador)),
+    Trabajador: ((PermisoSalida, PermisoSalida.cedula_trabajador),
+                 (AsignarUsuario, AsignarUsuario.trabajador_id)),
+    Usuario: ((AsignarUsuario, AsignarUsuario.usuario_id),),
+}
+# Filas que la base deja sin asignar (ON DELETE SET NULL): cambian sin pasar por el ORM
+DESASIGNADAS = {
+    Trabajador: ((Computador, Computador.trabajador_id),),
+}
+
+_contador = ContadorVersion.__table__
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def siguiente(db: Session) -> int:
+    """Versión provisional de la transacción en curso (negativa hasta el commit)."""
+    version = db.info.get("version_filas")
+    if version is None:
+        version = db.info["version_filas"] = -(secrets.randbits(62) + 1)
+    return version
+
+
+def _tocada(db: Session, modelo, lapida=False):
+    db.info.setdefault("lapidas" if lapida else "versionadas", set()).add(modelo)
+
+
+def _tomar_contador(db: Session) -> int:
+    conexion = db.connection()
+    fila = conexion.execute(
+        update(_contador).where(_contador.c.nombre == "filas").values(valor=_contador.c.valor + 1)
+    )
+    if fila.rowcount == 0:
+        # Base creada con create_all (la migración ya deja la fila)
+        conexion.execute(insert(_contador).values(nombre="filas", valor=1))
+    return conexion.execute(select(_contador.c.valor).where(_contador.c.nombre == "filas")).scalar_one()
+
+
+@event.listens_for(Session, "before_commit")
+def _confirmar_version(db):
+    # before_flush puede asignar todavía la versión provisional
+    db.flush()
+    provisional = db.info.pop("version_filas", None)
+    if provisional is None:
+        return
+    version = _tomar_contador(db)
+    conexion = db.connection()
+    for modelo in db.info.pop("versionadas", ()):
+        conexion.execute(update(modelo.__table__).where(modelo.version == provisional).values(version=version))
+    for modelo in db.info.pop("lapidas", ()):
+        conexion.execute(
+            update(Eliminado.__table__)
+            .where(Eliminado.entidad == ENTIDADES[modelo], Eliminado.version == provisional)
+            .values(version=version)
+        )
+    for obj in list(db.identity_map.values()):
+        if type(obj) in ENTIDADES and obj.__dict__.get("version") == provisional:
+            set_committed_value(obj, "version", version)
+    db.info["version_confirmada"] = (provisional, version)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _olvidar_version(db, transaccion):
+    if transaccion.parent is None:
+        for clave in ("version_filas", "versionadas", "lapidas"):
+            db.info.pop(clave, None)
+
+
+def confirmar(db: Session, *filas: dict):
+    """Commit; las `filas` (dicts de RETURNING o de version_masiva) reciben la versión definitiva."""
+    db.commit()
+    provisional, version = db.info.pop("version_confirmada", (None, None))
+    for fila in filas:
+        if provisional is not None and fila.get("version") == provisional:
+            fila["version"] = version
+
+
+def version_masiva(db: Session, modelo) -> dict:
+    """Columnas extra para un INSERT/UPDATE masivo que no pasa por before_flush."""
+    if modelo not in ENTIDADES:
+        return {}
+    _tocada(db, modelo)
+    return {"version": siguiente(db)}
+
+
+def registrar_eliminados(db: Session, modelo, claves):
+    """Lápidas de filas borradas fuera del ORM (borrados por lotes, cascadas)."""
+    if modelo not in ENTIDADES or not claves:
+        return
+    version = siguiente(db)
+    _tocada(db, modelo, lapida=True)
+    ahora = _ahora()
+    db.connection().execute(
+        insert(Eliminado.__table__),
+        [{"entidad": ENTIDADES[modelo], "clave": str(c), "version": version, "creado": ahora} for c in claves],
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _versionar(db, contexto, instancias):
+    # Toda escritura por el ORM pasa por aquí; las masivas usan version_masiva /
+    # registrar_eliminados
+    escritas = [
+        obj for obj in db.new
+        if type(obj) in ENTIDADES
+    ] + [
+        obj for obj in db.dirty
+        if type(obj) in ENTIDADES and db.is_modified(obj, include_collections=False)
+    ]
+    borradas = [obj for obj in db.deleted if type(obj) in ENTIDADES or type(obj) in CASCADAS]
+    if not escritas and not borradas:
+        return
+
+    version = siguiente(db)
+    for obj in escritas:
+        obj.version = version
+        _tocada(db, type(obj))
+
+    conexion = db.connection()
+    lapidas = {}
+    for obj in borradas:
+        modelo = type(obj)
+        clave = inspeccionar(obj).identity[0]
+        if modelo in ENTIDADES:
+            lapidas.setdefault(modelo, set()).add(str(clave))
+        for hijo, columna in CASCADAS.get(modelo, ()):
+            pk = hijo.__mapper__.primary_key[0]
+            lapidas.setdefault(hijo, set()).update(
+                str(c) for c in conexion.execute(select(pk).where(columna == clave)).scalars()
+            )
+        for afectado, columna in DESASIGNADAS.get(modelo, ()):
+            conexion.execute(update(afectado).where(columna == clave).values(version=version))
+            _tocada(db, afectado)
+    for modelo, claves in lapidas.items():
+        registrar_eliminados(db, modelo, claves)
+
+
+# ======== ESCRITURAS CONDICIONALES (If-Match) ========
+
+def etag(version) -> str:
+    return f'"{version}"'
+
+
+def versiones_if_match(valor):
+    """Versiones que acepta un If-Match ("12", W/"12" o una lista); None sin cabecera o con *."""
+    if valor is None or valor.strip() == "*":
+        return None
+    versiones = []
+    for etiqueta in valor.split(","):
+        etiqueta = etiqueta.strip()
+        etiqueta = etiqueta[2:] if etiqueta.startswith("W/") else etiqueta
+        try:
+            versiones.append(int(etiqueta.strip('"')))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="If-Match no válido")
+    return versiones
+
+
+def _texto(fila) -> dict:
+    return {k: v.value if isinstance(v, enum.Enum) else v for k, v in fila.items()}
+
+
+def _conflicto(version):
+    raise HTTPException(
+        status_code=412,
+        detail="El registro cambió desde que se leyó: vuelva a cargarlo",
+        headers={"ETag": etag(version)},
+    )
+
+
+def actualizar_condicional(db: Session, modelo, condiciones, cambios: dict, versiones=None,
+                           previas=(), no_encontrado="Registro no encontrado"):
+    """UPDATE ... WHERE condiciones [AND version IN versiones] en una sola sentencia.
+
+    Con UPDATE ... RETURNING (SQLite, PostgreSQL) la fila nueva vuelve en la misma
+    sentencia; en MySQL se relee. `previas` son columnas cuyo valor anterior
+    necesita quien llama (contadores, fotos): solo se leen si el cambio las
+    toca, y entonces el UPDATE se condiciona a la versión leída. Devuelve
+    (anteriores, fila) con los enums como texto; 404 / 412 si no aplica.
+    """
+    tabla = modelo.__table__
+    nulos = [c for c, v in cambios.items() if v is None and not tabla.c[c].nullable]
+    if nulos:
+        raise HTTPException(status_code=400, detail=f"{', '.join(nulos)} no puede ser nulo")
+
+    anteriores = {}
+    tocadas = [c for c in previas if c in cambios]
+    if tocadas:
+        fila = db.execute(select(*(tabla.c[c] for c in tocadas), tabla.c.version).where(*condiciones)).first()
+        if fila is None:
+            raise HTTPException(status_code=404, detail=no_encontrado)
+        if versiones is not None and fila.version not in versiones:
+            _conflicto(fila.version)
+        anteriores = _texto(fila._mapping)
+        versiones = [fila.version]
+
+    # Versión provisional: el contador se toma en el commit, solo si el UPDATE aplicó
+    consulta = update(tabla).where(*condiciones).values(**cambios, version=siguiente(db))
+    if versiones is not None:
+        consulta = consulta.where(tabla.c.version.in_(versiones))
+    if db.get_bind().dialect.update_returning:
+        fila = db.execute(consulta.returning(*tabla.c)).first()
+    else:
+        fila = db.execute(select(tabla).where(*condiciones)).first() if db.execute(consulta).rowcount else None
+    if fila is None:
+        actual = db.scalar(select(tabla.c.version).where(*condiciones))
+        if actual is None:
+            raise HTTPException(status_code=404, detail=no_encontrado)
+        _conflicto(actual)
+    _tocada(db, modelo)
+    return anteriores, _texto(fila._mapping)
+
+
+# ======== CONSULTAS ?since= ========
+
+def estado(db: Session) -> tuple:
+    """(versión confirmada actual, versión hasta la que se purgaron lápidas)."""
+    valores = dict(db.execute(select(_contador.c.nombre, _contador.c.valor)).all())
+    return valores.get("filas", 0), valores.get("lapidas", 0)
+
+
+def delta(db: Session, query, modelo, since: int) -> dict:
+    """Filas de `query` escritas después de `since` + claves borradas desde entonces.
+
+    La versión se lee primero: lo que se confirme mientras tanto puede venir
+    repetido en la siguiente llamada, pero nunca se pierde.
+    """
+    version, purgadas = estado(db)
+    # since=0 es una carga inicial: no tiene borrados que perderse
+    if 0 < since < purgadas:
+        raise HTTPException(
+            status_code=410,
+            detail="La versión pedida es anterior a los borrados que se conservan: sincronice desde cero",
+        )
+    filas = query.filter(modelo.version > since).order_by(modelo.version).all()
+    lapidas = db.execute(
+        select(Eliminado.clave, Eliminado.version)
+        .where(Eliminado.entidad == ENTIDADES[modelo], Eliminado.version > since)
+        .order_by(Eliminado.version)
+    ).all()
+    # Una clave borrada y vuelta a crear solo viaja como fila
+    pk = modelo.__mapper__.primary_key[0].key
+    vigentes = {str(getattr(f, pk)): f.version for f in filas}
+    eliminados = dict.fromkeys(c for c, v in lapidas if vigentes.get(c, -1) < v)
+    return {
+        "version": version,
+        "items": filas,
+        "eliminados": list(eliminados),
+    }
+
+
+def purgar_lapidas(db: Session) -> int:
+    """Borra lápidas más viejas que SYNC_RETENCION; quien pida desde antes recibe 410."""
+    limite = _ahora() - timedelta(seconds=config.SYNC_RETENCION)
+    hasta = db.scalar(select(func.max(Eliminado.version)).where(Eliminado.creado < limite))
+    if hasta is None:
+        return 0
+    conexion = db.connection()
+    actualizada = conexion.execute(
+        update(_contador).where(_contador.c.nombre == "lapidas").values(valor=hasta)
+    ).rowcount
+    if not actualizada:
+        conexion.execute(insert(_contador).values(nombre="lapidas", valor=hasta))
+    borradas = conexion.execute(
+        Eliminado.__table__.delete().where(Eliminado.__table__.c.version <= hasta)
+    ).rowcount
+    db.commit()
+    return borradas
@@ -2,6 +2,33 @@
 import { createApp } from 'vue'
 import App from './App.vue'
 import router from './router/index'
+import axios from 'axios'
+
+// Enviar el token de sesión en cada petición
+axios.interceptors.request.use((config) => {
+  const usuario = JSON.parse(localStorage.getItem("usuario")) || null
+  if (usuario?.access_token) config.headers.Authorization = `Bearer ${usuario.access_token}`
+  return config
+})
+
+// Si el access token expiró, se renueva una vez con el refresh token
+axios.interceptors.response.use(
+  (res) => res,
+  async (error) => {
+    const original = error.config
+    const usuario = JSON.parse(localStorage.getItem("usuario")) || null
+    if (error.response?.status === 401 && usuario?.refresh_token && !original._reintento
+        && !original.url.endsWith("/usuarios/refresh")) {
+      original._reintento = true
+      const { data } = await axios.post("http://192.168.1.233:8000/usuarios/refresh", {
+        refresh_token: usuario.refresh_token,
+      })
+      localStorage.setItem("usuario", JSON.stringify(data))
+      return axios(original)
+    }
+    return Promise.reject(error)
+  }
+)
 
 const app = createApp(App)
 app.use(router)